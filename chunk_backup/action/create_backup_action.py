@@ -1,18 +1,32 @@
-from typing import Optional
+from typing import Optional, Callable
 from chunk_backup.action import Action
 from chunk_backup.types.backup_info import BackupInfo
-from chunk_backup.exceptions import StaticMore, DynamicMore
+from chunk_backup.exceptions import StaticMore, DynamicMore, BackupInterrupted
 from chunk_backup.utils.backup_utils import BackupFolderManager as Manager
 from chunk_backup.utils.region.region import Region
 from chunk_backup.utils.mcdr_utils import broadcast_message as broadcast
+from chunk_backup.utils.progress import ProgressReporter
 
 
 class CreateBackupAction(Action):
-    def __init__(self, backup_info: BackupInfo, manager: Optional[Manager] = None, is_overwrite=False):
+    def __init__(
+            self, backup_info: BackupInfo, manager: Optional[Manager] = None, is_overwrite=False,
+            progress: Optional[ProgressReporter] = None, before_verify: Optional[Callable[[], bool]] = None
+    ):
+        """
+        :param before_verify: 不为 None 时边运行边复制：先在自动保存开启时复制，再调用 before_verify
+            （关闭自动保存并等待保存完成，返回 False 表示放弃本次备份），最后只重新复制有变化的部分
+        """
         super().__init__()
         self.backup_info = backup_info
         self.manager = manager
         self.is_overwrite = is_overwrite
+        self.progress = progress
+        self.before_verify = before_verify
+        self.recopied: Optional[int] = None  # 最终校验时重新复制的文件与区域文件数
+
+    def is_interruptable(self) -> bool:
+        return True
 
     def run(self):
         backup_info = self.backup_info
@@ -30,7 +44,27 @@ class CreateBackupAction(Action):
 
         try:
 
-            Region.export_regions(manager, backup_info, is_overwrite=self.is_overwrite)
+            fingerprints = {} if self.before_verify is not None else None
+            Region.export_regions(
+                manager, backup_info, is_overwrite=self.is_overwrite,
+                interrupt_event=self.is_interrupted, progress=self.progress, fingerprints=fingerprints
+            )
+
+            if fingerprints is not None:
+                if not self.before_verify():
+                    raise BackupInterrupted()
+                self.recopied = Region.verify_regions(
+                    manager, backup_info, fingerprints, is_overwrite=self.is_overwrite, interrupt_event=self.is_interrupted
+                )
+
+        except BackupInterrupted:
+            # 中断后丢弃不完整的槽位，并让剩余槽位重新连续编号
+            if self.is_overwrite:
+                manager.remove_slot(manager.storage_root / manager.config.overwrite_storage)
+            else:
+                manager.remove_slot()
+                manager.organize_region_folder(only_sort=True)
+            raise
 
         except Exception:
             manager.remove_slot()
@@ -1,6 +1,6 @@
 import datetime
-import shutil
 import traceback
+from typing import Optional
 
 from chunk_backup.action import Action
 from chunk_backup.action.create_backup_action import CreateBackupAction
@@ -10,15 +10,18 @@ from chunk_backup.types.backup_info import BackupInfo
 from chunk_backup.utils.backup_utils import PlayerDataFolderManager as data_manager, BackupFolderManager
 from chunk_backup.utils.mcdr_utils import tr, broadcast_message as broadcast
 from chunk_backup.utils.region.region import Region
+from chunk_backup.utils.progress import ProgressReporter
 from chunk_backup.utils.timer import Timer
 
 
 class RestoreBackupAction(Action):
 
-    def __init__(self, manager: BackupFolderManager, backup_info: BackupInfo):
+    def __init__(self, manager: BackupFolderManager, backup_info: BackupInfo, progress: Optional[ProgressReporter] = None):
         super().__init__()
         self.manager = manager
         self.backup_info = backup_info
+        self.progress = progress
+        self.restore_time: Optional[float] = None  # 回档本身的耗时（秒），不含回档前备份
 
     # -------------------------------------------------
 
@@ -47,15 +50,16 @@ class RestoreBackupAction(Action):
                 )
 
                 action.run()
+                # backup_info 载入自被回档的槽位，其清单不属于回档前备份
+                backup_info.player_files = None
                 if backup_info.player_data:
                     try:
                         uuid_dict = {}
                         for k, v in backup_info.player_data.items():
                             uuid_dict[k] = v["uuid"]
                         _data = data_manager(list(uuid_dict.values()), is_static=self.manager.is_static)
-                        _data.backup_player_data(is_overwrite=True)
+                        backup_info.player_files = _data.backup_player_data(is_overwrite=True)
                     except Exception:
-                        shutil.rmtree(_data.storage_root / self.config.overwrite_storage / "players", ignore_errors=True)
                         broadcast(tr("task.backup_create.backup_player_data_error", error=traceback.format_exc()))
                         backup_info.player_data = None
 
@@ -110,7 +114,10 @@ class RestoreBackupAction(Action):
 
         try:
 
-            Region.restore_regions(manager, backup_info)
+            if self.progress is not None:
+                # 进度只统计回档本身，不含前面的预备份
+                self.progress.restart()
+            Region.restore_regions(manager, backup_info, progress=self.progress)
 
         except FatalError as e:
 
@@ -126,6 +133,7 @@ class RestoreBackupAction(Action):
             ) from e
 
         cost_restore = timer.get_and_restart()
+        self.restore_time = cost_restore
 
         # -------------------------------------------------
         # 日志
@@ -4,20 +4,13 @@ from typing import Callable
 from mcdreforged.api.types import PluginServerInterface, CommandSource, InfoCommandSource
 from mcdreforged.api.command import CommandContext, Literal, Text, GreedyText, Integer, CountingLiteral, SimpleCommandBuilder
 from mcdreforged.api.rtext import RColor
-from chunk_backup.command.nodes import Position2D, IntegerList, IntegerRangeList
+from chunk_backup.command.nodes import Position2D, IntegerList, IntegerRangeList, PolygonPoints
 from chunk_backup.config.config import Config
-from chunk_backup.task.backup.create_backup_task import CreateBackupTask
-from chunk_backup.task.backup.delete_backup_task import DeleteBackupTask
-from chunk_backup.task.backup.list_backup_task import ListBackupTask
-from chunk_backup.task.backup.list_log_task import ListLogTask
-from chunk_backup.task.backup.restore_backup_task import RestoreBackupTask
-from chunk_backup.task.backup.show_backup_task import ShowBackupTask
-from chunk_backup.task.backup.show_log_task import ShowLogTask
 from chunk_backup.task.general.show_help_task import ShowHelpTask
+from chunk_backup.task.general.show_status_task import ShowStatusTask
 from chunk_backup.task.general.show_welcome_task import ShowWelcomeTask
 from chunk_backup.task_manager import TaskManager
 from chunk_backup.task_queue import TaskQueue
-from chunk_backup.utils.backup_utils import DimensionChecker, BackupFolderManager as Manager
 from chunk_backup.utils.mcdr_utils import tr, reply_message, mkcmd
 
 
@@ -40,6 +33,7 @@ class CommandManager:
         self.__state = CommandManagerState.DISABLED
 
     # =============================== Command Callback ===============================
+    # 备份相关的任务类会引入区域引擎、日志等较重的模块，在回调中首次使用时才导入，以加快插件加载与重载
 
     def cmd_welcome(self, source: CommandSource, _: CommandContext):
         self.task_manager.add_task(ShowWelcomeTask(source))
@@ -53,15 +47,12 @@ class CommandManager:
         self.task_manager.add_task(ShowHelpTask(source, what))
 
     def cmd_make(self, source: InfoCommandSource, context: CommandContext):
+        from chunk_backup.task.backup.create_backup_task import CreateBackupTask
+        from chunk_backup.utils.backup_utils import DimensionChecker
         if not source.is_player and "radius" in context:
             reply_message(source, tr("task.backup_create.only_player"))
             return
 
-        current = self.task_manager.worker_heavy.task_queue.peek_first_unfinished_item()
-        if current is not TaskQueue.NONE:
-            reply_message(source, tr("task._many", tr(f"task.{current.task.id}.name").to_plain_text()))
-            return
-
         checker = DimensionChecker.create(source, self.config.backup.dimension)
 
         if not checker:
@@ -86,10 +77,8 @@ class CommandManager:
         self.task_manager.add_task(CreateBackupTask(source, context))
 
     def cmd_del(self, source: InfoCommandSource, context: CommandContext):
-        current = self.task_manager.worker_heavy.task_queue.peek_first_unfinished_item()
-        if current is not TaskQueue.NONE:
-            reply_message(source, tr("task._many", tr(f"task.{current.task.id}.name").to_plain_text()))
-            return
+        from chunk_backup.task.backup.delete_backup_task import DeleteBackupTask
+        from chunk_backup.utils.backup_utils import BackupFolderManager as Manager
 
         manager = Manager(is_static=True if context.get("static_count") else False)
         all_slots = manager.get_all_slot_name(integer=True)
@@ -120,15 +109,19 @@ class CommandManager:
         self.task_manager.add_task(DeleteBackupTask(source, context, manager))
 
     def cmd_list(self, source: CommandSource, context: CommandContext):
+        from chunk_backup.task.backup.list_backup_task import ListBackupTask
         self.task_manager.add_task(ListBackupTask(source, context))
 
     def cmd_show(self, source: CommandSource, context: CommandContext):
+        from chunk_backup.task.backup.show_backup_task import ShowBackupTask
         self.task_manager.add_task(ShowBackupTask(source, context))
 
     def cmd_list_log(self, source: CommandSource, context: CommandContext):
+        from chunk_backup.task.backup.list_log_task import ListLogTask
         self.task_manager.add_task(ListLogTask(source, context))
 
     def cmd_show_log(self, source: CommandSource, context: CommandContext):
+        from chunk_backup.task.backup.show_log_task import ShowLogTask
         self.task_manager.add_task(ShowLogTask(source, context))
 
     def cmd_restore(self, source: InfoCommandSource, context: CommandContext):
@@ -136,10 +129,7 @@ class CommandManager:
         self.cmd_back(source, context)
 
     def cmd_back(self, source: InfoCommandSource, context: CommandContext):
-        current = self.task_manager.worker_heavy.task_queue.peek_first_unfinished_item()
-        if current is not TaskQueue.NONE:
-            reply_message(source, tr("task._many", tr(f"task.{current.task.id}.name").to_plain_text()))
-            return
+        from chunk_backup.task.backup.restore_backup_task import RestoreBackupTask
         self.task_manager.add_task(RestoreBackupTask(source, context))
 
     def cmd_confirm(self, source: CommandSource, _: CommandContext):
@@ -148,6 +138,11 @@ class CommandManager:
     def cmd_abort(self, source: CommandSource, _: CommandContext):
         self.task_manager.do_abort(source)
 
+    def cmd_status(self, source: CommandSource, _: CommandContext):
+        task_queue = self.task_manager.worker_heavy.task_queue
+        running = [holder.task for holder in task_queue.current_items()]
+        self.task_manager.add_task(ShowStatusTask(source, running, task_queue.qsize()))
+
     def cmd_reload(self, source: CommandSource, _: CommandContext):
         current = self.task_manager.worker_heavy.task_queue.peek_first_unfinished_item()
         if current is not TaskQueue.NONE:
@@ -202,6 +197,7 @@ class CommandManager:
         # operations
         builder.command('confirm', self.cmd_confirm)
         builder.command('abort', self.cmd_abort)
+        builder.command('status', self.cmd_status)
 
         builder.command('reload', self.cmd_reload)
 
@@ -221,6 +217,11 @@ class CommandManager:
             node = create_subcommand('make')
             arg_radius = Integer('radius').at_min(0).runs(self.cmd_make)
 
+            # 圆形选区标志，解析后回到半径节点继续
+            circle_flag = CountingLiteral(['--circle', '-r'], 'circle_count')
+            circle_flag.runs(self.cmd_make)
+            circle_flag.redirects(arg_radius)
+
             # 静态标志
             static_flag = CountingLiteral(['--static', '-s'], 'static_count')
             static_flag.runs(self.cmd_make)
@@ -230,12 +231,35 @@ class CommandManager:
             # 注释（无静态）
             arg_comment_no_static = GreedyText('comment').runs(self.cmd_make)
 
+            arg_radius.then(circle_flag)
             arg_radius.then(static_flag)
             arg_radius.then(arg_comment_no_static)
 
             node.then(arg_radius)
             return node
 
+        def make_polymake_cmd() -> Literal:
+            node = create_subcommand('polymake')
+            arg_points = PolygonPoints('polygon')
+            literal_in = Literal('in')
+            arg_dim = Integer('dimension')
+
+            node.then(arg_points.then(literal_in.then(arg_dim)))
+
+            arg_dim.runs(self.cmd_make)
+
+            static_flag = CountingLiteral(['--static', '-s'], 'static_count')
+            static_flag.runs(self.cmd_make)
+            arg_comment_after_static = GreedyText('comment').runs(self.cmd_make)
+            static_flag.then(arg_comment_after_static)
+
+            arg_comment_no_static = GreedyText('comment').runs(self.cmd_make)
+
+            arg_dim.then(static_flag)
+            arg_dim.then(arg_comment_no_static)
+
+            return node
+
         def make_pmake_cmd() -> Literal:
             node = create_subcommand('pmake')
             arg_crood1 = Position2D('crood_1')
@@ -364,6 +388,7 @@ class CommandManager:
             node.then(list_node.runs(self.cmd_list_log).then(arg_page.redirects(node)))
             list_node.then(Literal(['-p', '--per-page']).then(Integer("per_page").at_min(1).redirects(list_node)))  # 修正拼写
             node.then(show_node.runs(self.cmd_show_log).then(arg_name.runs(self.cmd_show_log)))
+            node.then(Literal("find").then(GreedyText("query").runs(self.cmd_list_log)))
             return node
 
         def make_back_cmd() -> Literal:
@@ -437,6 +462,7 @@ class CommandManager:
         # 将所有子命令挂载到根节点
         root.then(make_make_cmd())
         root.then(make_pmake_cmd())
+        root.then(make_polymake_cmd())
         root.then(make_dmake_cmd())
         root.then(make_list_cmd())
         root.then(make_show_cmd())
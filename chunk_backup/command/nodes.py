@@ -44,6 +44,13 @@ class TrailingComma(CommandSyntaxError):
         super().__init__('Trailing comma at the end', char_read)
 
 
+class IncompletePolygon(CommandSyntaxError):
+    """多边形顶点数量不足 3 个时抛出"""
+
+    def __init__(self, char_read: int):
+        super().__init__('Incomplete polygon, expected at least 3 points', char_read)
+
+
 # --- 二维坐标节点 (x, z) ---
 class Position2D(ArgumentNode):
     """
@@ -366,4 +373,46 @@ class IntegerRangeList(ArgumentNode):
                 seen.add(v)
                 unique.append(v)
         unique.sort()
-        return ParseResult(unique, len(text))
\ No newline at end of file
+        return ParseResult(unique, len(text))
+
+
+class PolygonPoints(ArgumentNode):
+    """
+    解析多边形顶点列表，格式为 x1,z1;x2,z2;x3,z3（世界坐标，可为小数）。
+    - 顶点之间用分号 ';' 或中文分号 '；' 分隔，坐标之间用英文逗号 ',' 或中文逗号 '，' 分隔。
+    - 遇到空格时结束解析，空格作为命令参数分隔符。
+    - 至少需要 3 个顶点。
+    """
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.point_delimiters = {';', '；'}
+        self.coord_delimiters = {',', '，'}
+
+    def parse(self, text: str) -> ParseResult:
+        end = text.find(' ')
+        if end == -1:
+            end = len(text)
+        if end == 0:
+            raise IncompletePolygon(0)
+
+        points = []
+        start = 0
+        body = text[:end]
+        for ch in self.point_delimiters:
+            body = body.replace(ch, ';')
+        for ch in self.coord_delimiters:
+            body = body.replace(ch, ',')
+
+        for part in body.split(';'):
+            coords = part.split(',')
+            if len(coords) != 2:
+                raise InvalidCoordinate(start + 1)
+            try:
+                points.append((float(coords[0]), float(coords[1])))
+            except ValueError:
+                raise InvalidCoordinate(start + 1)
+            start += len(part) + 1
+
+        if len(points) < 3:
+            raise IncompletePolygon(end)
+        return ParseResult(points, end)
@@ -1,4 +1,5 @@
 from typing import Optional
+from chunk_backup.types.units import ByteCount
 from chunk_backup.utils.mc_version import is_version_ge_26_1
 from mcdreforged.api.utils import Serializable
 
@@ -8,7 +9,9 @@ class BackupConfig(Serializable):
     player_data: Optional[dict] = None
     max_dynamic_slot: int = 10
     max_static_slot: int = 50
-    max_chunk_length: int = 320
+    max_chunk_length: int = 320  # 小于等于 0 时不限制边长
+    max_backup_size: Optional[ByteCount] = None  # 按区块选择时，预估备份大小的上限，None 为不限制
+    trim_regions: bool = True  # 备份整个区域文件时只写入仍在使用的扇区，丢弃服务器重新分配区块后留下的空闲扇区
 
     @staticmethod
     def _build_dimension_structure(version_tag: str) -> dict:
@@ -16,6 +16,7 @@ class CommandPermissions(Serializable):
     rename: int = 2
     reload: int = 3
     show: int = 0
+    status: int = 0
 
     def get(self, literal: str) -> int:
         if literal.startswith('_'):
@@ -47,3 +48,4 @@ class CommandConfig(Serializable):
     permission: CommandPermissions = CommandPermissions()
     confirm_time_wait: Duration = Duration('60s')
     restore_countdown_sec: int = 10
+    progress_interval: Duration = Duration('10s')  # 备份/回档进度广播间隔，<=0 不广播
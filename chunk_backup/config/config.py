@@ -1,8 +1,12 @@
 import functools
 from typing import Optional
 from chunk_backup.config.command_config import CommandConfig
+from chunk_backup.config.log_config import LogConfig
 from chunk_backup.config.server_config import ServerConfig
 from chunk_backup.config.backup_config import BackupConfig
+from chunk_backup.config.scheduled_backup_config import ScheduledBackupConfig
+from chunk_backup.config.scrub_config import ScrubConfig
+from chunk_backup.config.io_limit_config import IoLimitConfig
 from mcdreforged.api.utils import Serializable
 
 
@@ -14,13 +18,20 @@ class Config(Serializable):
     static_storage: str = 'static_storage'
     dynamic_storage: str = 'dynamic_storage'
     overwrite_storage: str = 'overwrite'
+    player_store: str = 'player_store'  # 各槽位共享的玩家数据仓库（按内容哈希去重）
     max_workers: int = 4
+    region_workers: str = 'thread'  # 按区块导出的执行方式：'thread' 线程池，'process' 进程池（仅支持 fork 的系统），'auto' 计算量大时自动使用进程池；后两者需手动开启
+    max_heavy_tasks: int = 2  # 可同时执行的重任务数量，资源互不冲突的任务才会同时执行
     config_version: Optional[str] = None  # 从文件读取的版本号
     minecraft_version: Optional[str] = None
 
     command: CommandConfig = CommandConfig()
+    log: LogConfig = LogConfig()
     server: ServerConfig = ServerConfig()
     backup: BackupConfig = BackupConfig()
+    scheduled_backup: ScheduledBackupConfig = ScheduledBackupConfig()
+    scrub: ScrubConfig = ScrubConfig()
+    io_limit: IoLimitConfig = IoLimitConfig()
 
     def upgrade_version(self, plugin_version: str) -> bool:
         """将配置文件版本更新为当前插件版本，返回 True 表示需要保存"""
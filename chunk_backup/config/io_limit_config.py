@@ -0,0 +1,7 @@
+from mcdreforged.api.utils import Serializable
+
+
+class IoLimitConfig(Serializable):
+    mode: str = 'off'  # 'off' 不限速，'fixed' 始终限速，'adaptive' 只在服务器运行时限速，服务器关闭时（如回档）全速
+    rate: float = 32.0  # 备份、回档读写区域文件的速度上限（读取与写入合计，MB/s），<=0 不限制
+    background: bool = True  # 服务器运行时以 idle I/O 调度类与较低的 CPU 优先级复制，并将复制的文件移出页缓存
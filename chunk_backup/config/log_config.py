@@ -0,0 +1,7 @@
+from mcdreforged.api.utils import Serializable
+from chunk_backup.types.units import Duration
+
+
+class LogConfig(Serializable):
+    max_count: int = 100  # 最多保留的日志条数，<=0 不限制
+    max_age: Duration = Duration('30d')  # 超过该时长的日志会被清理，<=0 不限制
@@ -0,0 +1,24 @@
+from typing import List, Optional
+from mcdreforged.api.utils import Serializable
+from chunk_backup.types.units import Duration
+
+
+class ScheduledBackupJob(Serializable):
+    enabled: bool = True
+    mode: str = 'dmake'  # 'dmake' 备份整个维度，'pmake' 备份两个坐标之间的区块
+    dimensions: List[int] = [0]  # 维度数字 id，pmake 模式只使用第一个
+    crood_1: Optional[List[float]] = None  # pmake 模式的两个坐标 [x, z]
+    crood_2: Optional[List[float]] = None
+    interval: Duration = Duration('1h')
+    jitter: Duration = Duration('5m')  # 每次执行时间在间隔基础上随机推后 0~jitter
+    static: bool = False
+    comment: str = ''
+
+
+class ScheduledBackupConfig(Serializable):
+    enabled: bool = False
+    jobs: List[ScheduledBackupJob] = [ScheduledBackupJob()]
+    max_players: int = -1  # 在线玩家数超过该值时推迟执行，小于 0 为不限制
+    defer_interval: Duration = Duration('1m')  # 推迟后再次检查的间隔
+    max_defer: Duration = Duration('30m')  # 推迟超过该时长后跳过本次执行
+    skip_unchanged: bool = True  # 区域文件自上次定时备份后没有修改时跳过
@@ -0,0 +1,8 @@
+from mcdreforged.api.utils import Serializable
+from chunk_backup.types.units import Duration
+
+
+class ScrubConfig(Serializable):
+    enabled: bool = True  # 在后台按校验和重新校验备份槽位
+    rate: float = 8.0  # 校验时的读取速度上限（MB/s），<=0 不限制
+    interval: Duration = Duration('7d')  # 同一槽位两次校验的间隔
@@ -10,17 +10,21 @@ class MinecraftServerCommands(Serializable):
     save_all_worlds: str = 'save-all flush'
     auto_save_off: str = 'save-off'
     auto_save_on: str = 'save-on'
+    list_players: str = 'list'
 
 
 class ServerConfig(Serializable):
     turn_off_auto_save: bool = True
+    live_copy: bool = False  # 自动保存开启时先行复制，只在最后校验时短暂关闭自动保存
     commands: MinecraftServerCommands = MinecraftServerCommands()
     data_getter_regex: Dict[str, re.Pattern] = {
         "crood_getter": re.compile('^{name} has the following entity data: \\[(?P<x>-?\\d*\\.?\\d+(?:[eE][-+]?\\d+)?)d, (?P<y>-?\\d*\\.?\\d+(?:[eE][-+]?\\d+)?)d, (?P<z>-?\\d*\\.?\\d+(?:[eE][-+]?\\d+)?)d\\]$'),
-        "dimension_getter": re.compile('^{name} has the following entity data: \"(?P<dimension>[^\"]+)\"$')
+        "dimension_getter": re.compile('^{name} has the following entity data: \"(?P<dimension>[^\"]+)\"$'),
+        "online_players_getter": re.compile('^There are (?P<count>\\d+) of a max of \\d+ players online')
     }
     saved_world_regex: List[re.Pattern] = [
         re.compile('Saved the game'),
         re.compile('Saved the world'),
     ]
     save_world_max_wait: Duration = Duration('10min')
+    save_quiet_period: Duration = Duration('0s')  # 保存指令发出后选中的区域文件有过变化、且在此时长内没有再变化即视为保存完成，<=0 时只依赖 saved_world_regex
@@ -7,6 +7,7 @@ BACKUP_META_FILE_NAME = '.chunk_backup.meta.json'
 INSTANCE_ID = uuid.uuid4().hex[:4]
 PLUGIN_ID = 'chunk_backup'
 DEFAULT_COMMAND_PERMISSION_LEVEL = 1
+STARTUP_BUDGET_SEC = 0.5  # on_load 同步部分（读取配置到启动初始化线程）的耗时预算，超出时输出警告
 
 # links
 DOCUMENTATION_URL = 'https://github.com/Passion-Never-Dissipate/Chunk_BackUp'
@@ -0,0 +1,217 @@
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Set, TYPE_CHECKING
+from chunk_backup.config.config import Config
+from chunk_backup.config.scheduled_backup_config import ScheduledBackupJob
+from chunk_backup.mcdr_globals import server
+from chunk_backup.task import TaskPriority
+from chunk_backup.types.operator import Operator, ChunkBackupOperatorNames
+from chunk_backup.types.point import Point2D
+from chunk_backup.utils import misc_utils
+from chunk_backup.utils.mcdr_utils import tr
+
+if TYPE_CHECKING:
+    from chunk_backup.task_manager import TaskManager
+    from chunk_backup.utils.backup_utils import DimensionChecker
+
+
+class _JobState:
+    def __init__(self, index: int, job: ScheduledBackupJob):
+        self.index = index
+        self.job = job
+        self.next_run = 0.0
+        self.deferred_since: Optional[float] = None
+        self.last_backup_time: Optional[float] = None
+        self.schedule_next()
+
+    def schedule_next(self):
+        jitter = max(0.0, self.job.jitter.value)
+        self.next_run = time.time() + self.job.interval.value + random.uniform(0, jitter)
+        self.deferred_since = None
+
+
+class CrontabManager:
+    """
+    定时备份管理器，按配置的间隔通过 TaskManager 提交动态 dmake / pmake 备份。
+    - 有其他重任务在执行或在线玩家过多时推迟执行，推迟过久则跳过本次
+    - 区域文件自上次定时备份后没有修改时跳过本次
+    """
+
+    def __init__(self, task_manager: 'TaskManager'):
+        self.task_manager = task_manager
+        self.config = Config.get().scheduled_backup
+        self.logger = server.logger
+        self.__stop_event = threading.Event()
+        self.__players: Set[str] = set()
+        self.__players_lock = threading.Lock()
+        self.__jobs = [_JobState(i, job) for i, job in enumerate(self.config.jobs) if job.enabled and job.interval.value > 0]
+        self.__thread = threading.Thread(target=self.__loop, name=misc_utils.make_thread_name('crontab'), daemon=True)
+
+    def start(self):
+        if not self.config.enabled or len(self.__jobs) == 0:
+            return
+        self.__thread.start()
+
+    def shutdown(self):
+        self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    # ================================== Events ==================================
+
+    def on_player_joined(self, player: str):
+        with self.__players_lock:
+            self.__players.add(player)
+
+    def on_player_left(self, player: str):
+        with self.__players_lock:
+            self.__players.discard(player)
+
+    def on_server_stopped(self):
+        with self.__players_lock:
+            self.__players.clear()
+
+    # ================================== Loop ==================================
+
+    def __loop(self):
+        self.logger.info('Scheduled backup started with %d job(s)', len(self.__jobs))
+        while True:
+            timeout = max(0.0, min(state.next_run for state in self.__jobs) - time.time())
+            if self.__stop_event.wait(timeout):
+                break
+            for state in self.__jobs:
+                if state.next_run > time.time():
+                    continue
+                try:
+                    self.__run_job(state)
+                except Exception:
+                    self.logger.exception('Scheduled backup job #%d failed to start', state.index + 1)
+                    state.schedule_next()
+        self.logger.info('Scheduled backup stopped')
+
+    def __get_defer_reason(self) -> Optional[str]:
+        if self.task_manager.worker_heavy.task_queue.unfinished_size() > 0:
+            return 'another heavy task is running'
+        if self.config.max_players >= 0 and (player_count := self.__get_player_count()) > self.config.max_players:
+            return f'{player_count} players online'
+        # 插件无法获取 TPS，负载仅以重任务与在线人数判断
+        return None
+
+    def __get_player_count(self) -> int:
+        """
+        在线玩家数，优先向服务端查询（插件重载后加入/离开事件记录的玩家为空）。
+        未配置 list 指令或查询失败时退回到按加入/离开事件记录的玩家数
+        """
+        if not server.is_server_running():
+            return 0
+        from chunk_backup.utils.serverdata_getter import ServerDataGetter
+        count = ServerDataGetter().get_online_player_count()
+        if count is not None:
+            return count
+        with self.__players_lock:
+            return len(self.__players)
+
+    def __run_job(self, state: _JobState):
+        reason = self.__get_defer_reason()
+        if reason is not None:
+            now = time.time()
+            if state.deferred_since is None:
+                state.deferred_since = now
+            if now - state.deferred_since < self.config.max_defer.value:
+                self.logger.info('Scheduled backup job #%d deferred: %s', state.index + 1, reason)
+                state.next_run = now + max(1.0, self.config.defer_interval.value)
+                return
+            self.logger.info('Scheduled backup job #%d deferred for too long (%s), skipped this run', state.index + 1, reason)
+            state.schedule_next()
+            return
+
+        state.schedule_next()
+
+        # 到点执行时才导入备份任务，避免拖慢插件加载
+        from chunk_backup.task.backup.create_backup_task import CreateBackupTask
+        from chunk_backup.utils.backup_utils import DimensionChecker
+
+        source = server.get_plugin_command_source()
+        checker = DimensionChecker.create(source, Config.get().backup.dimension)
+        if not checker:
+            return
+        context = self.__build_context(state.job, checker)
+        if context is None:
+            return
+
+        if self.config.skip_unchanged and state.last_backup_time is not None and not self.__has_changes(context, state.last_backup_time):
+            self.logger.info('Scheduled backup job #%d skipped, no region file changed since the last run', state.index + 1)
+            return
+
+        submit_time = time.time()
+
+        def callback(ret, err):
+            if err is None and ret is not None:
+                state.last_backup_time = submit_time
+
+        task = CreateBackupTask(
+            source, context,
+            operator=Operator.cb(ChunkBackupOperatorNames.scheduled_backup),
+            priority=TaskPriority.scheduled,
+            deadline=state.next_run,
+            coalesce_key=('scheduled_backup', state.index),
+        )
+        self.logger.info('Scheduled backup job #%d triggered: %s', state.index + 1, context["command"])
+        self.task_manager.add_task(task, callback)
+
+    # ================================== Utils ==================================
+
+    def __build_context(self, job: ScheduledBackupJob, checker: 'DimensionChecker') -> Optional[dict]:
+        prefix = Config.get().command.prefix
+        ids = list(job.dimensions) if job.mode == 'dmake' else list(job.dimensions[:1])
+        known_ids = checker.get_integer_ids()
+        if len(ids) == 0 or any(i not in known_ids for i in ids):
+            self.logger.warning('Scheduled backup job with mode %s has invalid dimensions %s', job.mode, ids)
+            return None
+
+        context = {
+            "dimension": [checker.get_by_id(i) for i in ids],
+            "comment": job.comment or tr("other.ui.scheduled_comment").to_plain_text(),
+        }
+        if job.static:
+            context["static_count"] = 1
+
+        if job.mode == 'dmake':
+            context["dimensions"] = ids
+            command = f'{prefix} dmake {",".join(map(str, ids))}'
+        elif job.mode == 'pmake' and job.crood_1 and job.crood_2:
+            context["crood_1"] = list(job.crood_1)
+            context["crood_2"] = list(job.crood_2)
+            command = f'{prefix} pmake {job.crood_1[0]} {job.crood_1[1]} {job.crood_2[0]} {job.crood_2[1]} in {ids[0]}'
+        else:
+            self.logger.warning('Scheduled backup job has invalid mode %s or missing coordinates', job.mode)
+            return None
+
+        context["command"] = command + (' -s' if job.static else '') + f' {context["comment"]}'
+        return context
+
+    @staticmethod
+    def __has_changes(context: dict, since: float) -> bool:
+        """判断所选维度的区域文件是否在 since 之后被修改过，pmake 只检查选区涉及的区域文件"""
+        config = Config.get()
+        region_files = None
+        if "crood_1" in context:
+            points = Point2D(*context["crood_1"]) + Point2D(*context["crood_2"])
+            region_files = set(points.to_chunk_selector(ignore_size_limit=True).to_index().keys())
+
+        for dimension in context["dimension"]:
+            info = config.backup.dimension[dimension]
+            for folder in info["region_folder"]:
+                path = Path(config.server_root) / info["world_name"] / folder
+                if not path.is_dir():
+                    continue
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if region_files is not None and entry.name.endswith('.mca') and entry.name not in region_files:
+                            continue
+                        if entry.is_file() and entry.stat().st_mtime > since:
+                            return True
+        return False
@@ -1,18 +1,23 @@
 import contextlib
 import functools
+import sys
 import threading
 import time
 from typing import Optional
 from mcdreforged.api.types import PluginServerInterface, Info
-from chunk_backup import mcdr_globals
+from chunk_backup import constants, mcdr_globals
 from chunk_backup.config.config import Config, set_config_instance
 from chunk_backup.config.backup_config import BackupConfig
 from chunk_backup.task_manager import TaskManager
 from chunk_backup.command.commands import CommandManager
+from chunk_backup.crontab.crontab_manager import CrontabManager
+from chunk_backup.scrub.scrub_manager import ScrubManager
 
 config: Optional[Config] = None
 task_manager: Optional[TaskManager] = None
 command_manager: Optional[CommandManager] = None
+crontab_manager: Optional[CrontabManager] = None
+scrub_manager: Optional[ScrubManager] = None
 mcdr_globals.load()
 init_thread: Optional[threading.Thread] = None
 
@@ -41,6 +46,14 @@ def _try_upgrade_config(server: PluginServerInterface, cfg: Config, from_startup
     return modified
 
 
+def _report_startup_cost(server: PluginServerInterface, elapsed: float):
+    budget = constants.STARTUP_BUDGET_SEC
+    if elapsed > budget:
+        server.logger.warning(f'Plugin load took {elapsed:.3f}s, exceeding the startup budget of {budget}s')
+    else:
+        server.logger.debug(f'Plugin load took {elapsed:.3f}s (budget {budget}s)')
+
+
 def on_load(server: PluginServerInterface, old):
     @contextlib.contextmanager
     def handle_init_error():
@@ -52,12 +65,16 @@ def on_load(server: PluginServerInterface, old):
             raise
 
     def init():
+        init_start = time.perf_counter()
         with handle_init_error():
             task_manager.start()
             command_manager.construct_command_tree()
-        server.logger.debug(f'{mcdr_globals.metadata.name} init done')
+            crontab_manager.start()
+            scrub_manager.start()
+        server.logger.debug(f'{mcdr_globals.metadata.name} init done in {time.perf_counter() - init_start:.3f}s')
 
-    global config, task_manager, command_manager
+    load_start = time.perf_counter()
+    global config, task_manager, command_manager, crontab_manager, scrub_manager
     with handle_init_error():
         # ---------- 1. 加载配置文件 ----------
         config = server.load_config_simple(target_class=Config, failure_policy='raise', echo_in_console=False)
@@ -69,6 +86,8 @@ def on_load(server: PluginServerInterface, old):
         # ---------- 3. 初始化管理器 ----------
         task_manager = TaskManager()
         command_manager = CommandManager(server, task_manager)
+        crontab_manager = CrontabManager(task_manager)
+        scrub_manager = ScrubManager(task_manager)
 
         # ---------- 4. 注册命令和帮助 ----------
         command_manager.register_command_node()
@@ -83,6 +102,7 @@ def on_load(server: PluginServerInterface, old):
         global init_thread
         init_thread = threading.Thread(target=init, name="CB@init", daemon=True)
         init_thread.start()
+        _report_startup_cost(server, time.perf_counter() - load_start)
         init_thread_start_ts = time.time()
         init_thread.join(timeout=2)
         if init_thread.is_alive():
@@ -102,6 +122,18 @@ def on_server_startup(server: PluginServerInterface):
 def on_server_stop(server: PluginServerInterface, server_return_code: int):
     if task_manager:
         task_manager.on_server_stopped()
+    if crontab_manager:
+        crontab_manager.on_server_stopped()
+
+
+def on_player_joined(server: PluginServerInterface, player: str, info: Info):
+    if crontab_manager:
+        crontab_manager.on_player_joined(player)
+
+
+def on_player_left(server: PluginServerInterface, player: str):
+    if crontab_manager:
+        crontab_manager.on_player_left(player)
 
 
 def on_info(server: PluginServerInterface, info: Info):
@@ -127,18 +159,28 @@ def on_unload(server: PluginServerInterface):
     global task_manager
 
     def shutdown():
-        global task_manager
+        global task_manager, crontab_manager, scrub_manager
         try:
             if init_thread is not None:
                 init_thread.join()
             if command_manager is not None:
                 command_manager.close_the_door()
-            """if crontab_manager is not None:"""
-            """	crontab_manager.shutdown()"""
-            """	crontab_manager = None"""
+            if crontab_manager is not None:
+                crontab_manager.shutdown()
+                crontab_manager = None
+            if scrub_manager is not None:
+                scrub_manager.shutdown()
+                scrub_manager = None
             if task_manager is not None:
                 task_manager.shutdown()
                 task_manager = None
+            if 'chunk_backup.utils.serverdata_getter' in sys.modules:
+                # 只有用到过查询层时才需要关闭其线程池
+                from chunk_backup.utils.serverdata_getter import ServerDataGetter
+                ServerDataGetter.shutdown()
+            if 'chunk_backup.utils.json_parser' in sys.modules:
+                from chunk_backup.utils.json_parser import Message
+                Message.clear_template_cache()
 
         finally:
             shutdown_event.set()
@@ -33,6 +33,11 @@ class DynamicMore(ChunkBackupError):
         self.msg = tr("task.create_backup.dynamic_more", max_slot=max_slot, current_slot=current_slot)
 
 
+class BackupInterrupted(ChunkBackupError):
+    """备份过程中收到中断请求时抛出"""
+    pass
+
+
 class FatalError(ChunkBackupError):
     def __init__(self, on_done=False, need_start=False, pre_backup=False, restore=False, pre_restore=False, mismatch=False, causes=None):
         super().__init__("Fatal error")
@@ -0,0 +1,245 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class JournalEntry:
+    name: str
+    task: str
+    date: str
+    operator: str
+    segment: int       # 开始记录所在的日志段编号
+    offset: int        # 开始记录在日志段中的字节偏移
+    status: Dict[str, bool] = field(default_factory=dict)
+    timestamp: Optional[float] = None  # 由 date 解析出的时间戳，无法解析时为 None
+
+    @property
+    def success(self) -> bool:
+        return bool(self.status.get("task_done", False))
+
+
+class LogJournal:
+    """
+    只追加的 JSONL 任务日志。
+    每个任务写入一条开始记录（op=begin），结束时再追加一条状态记录（op=end），不改写已有内容。
+    日志按大小滚动为多个日志段 journal.<n>.jsonl，内存中维护按时间排序的条目索引（任务、日期、操作者、状态、偏移），
+    列表与条件查询不需要读取文件。同一日志目录在进程内共享一个实例。
+    保留策略：最多 max_count 条，且不早于 max_age 秒之前，两者 <=0 时分别不限制。
+    """
+    SEGMENT_PATTERN = re.compile(r'^journal\.(\d+)\.jsonl$')
+    LEGACY_PATTERN = re.compile(r'^(.+)_(\d{8}_\d{6}_\d{6})\.json$')
+    STATUS_KEYS = ("task_done", "pre_backup_done", "pre_restore_done")
+    MAX_SEGMENT_SIZE = 256 * 1024
+    DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+    __instances: Dict[Path, 'LogJournal'] = {}
+    __instances_lock = threading.Lock()
+
+    def __init__(self, log_storage: Path, max_count: int, max_age: float):
+        self.log_storage = log_storage
+        self.max_count = max_count
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.__entries: List[JournalEntry] = []  # 旧 → 新
+        self.__by_name: Dict[str, JournalEntry] = {}
+        self.__segment = 0
+        self.log_storage.mkdir(parents=True, exist_ok=True)
+        self.__load()
+        self.__migrate_legacy()
+
+    @classmethod
+    def get(cls, log_storage: Path, max_count: int, max_age: float) -> 'LogJournal':
+        key = log_storage.resolve()
+        with cls.__instances_lock:
+            journal = cls.__instances.get(key)
+            if journal is None:
+                journal = cls.__instances[key] = cls(log_storage, max_count, max_age)
+            elif (journal.max_count, journal.max_age) != (max_count, max_age):
+                # 配置重载后按新的保留策略清理
+                with journal.lock:
+                    journal.max_count, journal.max_age = max_count, max_age
+                    journal.__trim()
+            return journal
+
+    # ================================== 读取 ==================================
+
+    def __segment_path(self, segment: int) -> Path:
+        return self.log_storage / f"journal.{segment}.jsonl"
+
+    def __list_segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.log_storage):
+            if m := self.SEGMENT_PATTERN.match(name):
+                segments.append(int(m.group(1)))
+        return sorted(segments)
+
+    def __load(self):
+        """
+        顺序扫描所有日志段重建索引，末尾不完整的行（写入中途崩溃）直接跳过。
+        最新的日志段之后还会继续追加，其末尾不完整的行会被截掉，否则下一条记录会接在这一行后面而无法解析
+        """
+        segments = self.__list_segments()
+        for segment in segments:
+            path = self.__segment_path(segment)
+            with open(path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    line_offset, offset = offset, offset + len(line)
+                    if not line.endswith(b"\n"):
+                        offset = line_offset
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict):
+                        self.__apply(record, segment, line_offset)
+            if segment == segments[-1] and offset < path.stat().st_size:
+                os.truncate(path, offset)
+        self.__segment = segments[-1] if segments else 1
+        self.__trim()
+
+    def __apply(self, record: dict, segment: int, offset: int):
+        op, name = record.get("op"), record.get("name")
+        if op == "begin" and name not in self.__by_name:
+            entry = JournalEntry(
+                name=name, task=record.get("task", ""), date=record.get("date", ""),
+                operator=record.get("operator", ""), segment=segment, offset=offset,
+                status={k: record[k] for k in self.STATUS_KEYS if k in record},
+                timestamp=self.__parse_date(record.get("date", ""))
+            )
+            self.__entries.append(entry)
+            self.__by_name[name] = entry
+        elif op == "end" and (entry := self.__by_name.get(name)) is not None:
+            entry.status = {k: record[k] for k in self.STATUS_KEYS if k in record}
+
+    @classmethod
+    def __parse_date(cls, date: str) -> Optional[float]:
+        try:
+            return datetime.strptime(date, cls.DATE_FORMAT).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def normalize_name(cls, name: str) -> str:
+        """兼容旧版日志文件名（带 .json 后缀）"""
+        return name[:-len(".json")] if name.endswith(".json") else name
+
+    def get_entry(self, name: str) -> Optional[JournalEntry]:
+        with self.lock:
+            return self.__by_name.get(self.normalize_name(name))
+
+    def entries(self) -> List[JournalEntry]:
+        """返回全部条目的副本，旧 → 新"""
+        with self.lock:
+            return list(self.__entries)
+
+    def count(self) -> int:
+        with self.lock:
+            return len(self.__entries)
+
+    def page(self, start: int, end: int) -> List[JournalEntry]:
+        """从新到旧第 start 到第 end 个条目（从 1 开始，包含两端）"""
+        with self.lock:
+            total = len(self.__entries)
+            lo, hi = max(total - end, 0), max(total - start + 1, 0)
+            return list(reversed(self.__entries[lo:hi]))
+
+    def read(self, name: str) -> Optional[dict]:
+        """读取条目的完整内容：开始记录叠加最新的状态记录"""
+        with self.lock:
+            entry = self.__by_name.get(self.normalize_name(name))
+            if entry is None:
+                return None
+            try:
+                with open(self.__segment_path(entry.segment), 'rb') as f:
+                    f.seek(entry.offset)
+                    record = json.loads(f.readline())
+            except (OSError, ValueError):
+                return None
+            status = dict(entry.status)
+        for key in ("op", "name") + self.STATUS_KEYS:
+            record.pop(key, None)
+        record.update(status)
+        return record
+
+    # ================================== 写入 ==================================
+
+    def __append(self, record: dict) -> Tuple[int, int]:
+        """以一次写入追加一行记录，返回 (日志段编号, 偏移)；当前日志段超过大小上限时先滚动"""
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        path = self.__segment_path(self.__segment)
+        if path.exists() and path.stat().st_size + len(data) > self.MAX_SEGMENT_SIZE:
+            self.__segment += 1
+            path = self.__segment_path(self.__segment)
+        with open(path, 'ab') as f:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(data)
+        return self.__segment, offset
+
+    def begin(self, name: str, data: dict) -> JournalEntry:
+        with self.lock:
+            record = {"op": "begin", "name": name, **data}
+            segment, offset = self.__append(record)
+            self.__apply(record, segment, offset)
+            self.__trim()
+            return self.__by_name.get(name)
+
+    def end(self, name: str, status: Dict[str, bool]):
+        with self.lock:
+            record = {"op": "end", "name": name, **{k: status[k] for k in self.STATUS_KEYS if k in status}}
+            self.__append(record)
+            self.__apply(record, 0, 0)
+
+    def __trim(self):
+        """按保留策略丢弃最旧的条目，删除不再包含任何保留条目的旧日志段"""
+        drop = 0
+        if 0 < self.max_count < len(self.__entries):
+            drop = len(self.__entries) - self.max_count
+        if self.max_age > 0:
+            cutoff = time.time() - self.max_age
+            # 条目按时间顺序追加，从最旧处向后找到第一条未过期（或无法判断时间）的即可
+            while drop < len(self.__entries):
+                timestamp = self.__entries[drop].timestamp
+                if timestamp is None or timestamp >= cutoff:
+                    break
+                drop += 1
+        if drop <= 0:
+            return
+        for entry in self.__entries[:drop]:
+            self.__by_name.pop(entry.name, None)
+        del self.__entries[:drop]
+        oldest = self.__entries[0].segment if self.__entries else self.__segment
+        for segment in self.__list_segments():
+            if segment < oldest:
+                self.__segment_path(segment).unlink(missing_ok=True)
+
+    # ================================== 迁移 ==================================
+
+    def __migrate_legacy(self):
+        """将旧版每个任务一个 JSON 文件的日志按时间顺序导入日志段，导入后删除旧文件"""
+        legacy = []
+        for path in self.log_storage.glob("*.json"):
+            if m := self.LEGACY_PATTERN.match(path.name):
+                legacy.append((m.group(2), path))
+        if not legacy:
+            return
+        legacy.sort(key=lambda item: item[0])
+        with self.lock:
+            for _, path in legacy:
+                name = self.normalize_name(path.name)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = None
+                if isinstance(data, dict) and name not in self.__by_name:
+                    self.begin(name, data)
+                path.unlink(missing_ok=True)
@@ -1,4 +1,8 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
 from mcdreforged.api.utils import Serializable
+from chunk_backup.types.units import Duration
 
 
 class LogTask(Serializable):
@@ -10,7 +14,7 @@ class LogTask(Serializable):
 
     def serialize(self) -> dict:
         data = super().serialize()
-        if self.task == "backup_restore":
+        if self.task == "restore_backup":
             if hasattr(self, "pre_backup_done"):
                 data["pre_backup_done"] = self.pre_backup_done
 
@@ -18,3 +22,73 @@ class LogTask(Serializable):
                 data["pre_restore_done"] = self.pre_restore_done
 
         return data
+
+
+@dataclass
+class LogQuery:
+    """
+    日志查询条件，各条件之间为“且”关系，为 None 的条件不参与筛选。
+    文本形式为以空格分隔的 key=value，如 task=restore_backup operator=Steve status=failed since=2d
+    """
+    task: Optional[str] = None
+    operator: Optional[str] = None
+    success: Optional[bool] = None
+    since: Optional[float] = None  # 只匹配该时间戳之后的日志
+    until: Optional[float] = None  # 只匹配该时间戳之前的日志
+
+    TASK_ALIASES = {
+        "make": "create_backup",
+        "back": "restore_backup",
+        "restore": "restore_backup",
+        "del": "delete_backup",
+    }
+    STATUS_VALUES = {
+        "success": True,
+        "ok": True,
+        "failed": False,
+        "fail": False,
+    }
+
+    @classmethod
+    def parse(cls, text: str) -> 'LogQuery':
+        """
+        解析查询文本，since/until 为距今的时长（如 2d、12h）。
+        :raise ValueError: 某个条件无法解析时抛出，参数为该条件原文
+        """
+        query = cls()
+        now = time.time()
+        for token in text.split():
+            key, sep, value = token.partition("=")
+            key = key.lower()
+            if not sep or not value:
+                raise ValueError(token)
+            try:
+                if key == "task":
+                    query.task = cls.TASK_ALIASES.get(value.lower(), value.lower())
+                elif key == "operator":
+                    query.operator = value
+                elif key == "status":
+                    query.success = cls.STATUS_VALUES[value.lower()]
+                elif key == "since":
+                    query.since = now - Duration(value).value
+                elif key == "until":
+                    query.until = now - Duration(value).value
+                else:
+                    raise ValueError(token)
+            except (KeyError, ValueError):
+                raise ValueError(token) from None
+        return query
+
+    def match(self, entry) -> bool:
+        """:param entry: LogJournal 中的 JournalEntry"""
+        if self.task is not None and entry.task != self.task:
+            return False
+        if self.operator is not None and entry.operator.lower() != self.operator.lower():
+            return False
+        if self.success is not None and entry.success != self.success:
+            return False
+        if self.since is not None and (entry.timestamp is None or entry.timestamp < self.since):
+            return False
+        if self.until is not None and (entry.timestamp is None or entry.timestamp > self.until):
+            return False
+        return True
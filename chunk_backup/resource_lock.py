@@ -0,0 +1,110 @@
+import collections
+import dataclasses
+import threading
+from pathlib import Path
+from typing import FrozenSet, Hashable, Iterable, Sequence
+
+
+@dataclasses.dataclass(frozen=True)
+class ResourceRequest:
+    """
+    一个重任务需要的资源：shared 中的资源可与其他任务共享（只读），exclusive 中的资源需独占（写入）
+    """
+    shared: FrozenSet[Hashable] = frozenset()
+    exclusive: FrozenSet[Hashable] = frozenset()
+
+    @classmethod
+    def of(cls, shared: Iterable[Hashable] = (), exclusive: Iterable[Hashable] = ()) -> 'ResourceRequest':
+        exclusive = frozenset(exclusive)
+        return cls(frozenset(shared) - exclusive, exclusive)
+
+    @classmethod
+    def world(cls) -> 'ResourceRequest':
+        """独占整个世界，与其他任何资源都冲突"""
+        return cls(exclusive=frozenset([ResourceLockManager.WORLD]))
+
+    def is_empty(self) -> bool:
+        return not self.shared and not self.exclusive
+
+    def conflicts_with(self, other: 'ResourceRequest') -> bool:
+        if self.is_empty() or other.is_empty():
+            return False
+        if ResourceLockManager.WORLD in self.exclusive or ResourceLockManager.WORLD in other.exclusive:
+            return True
+        return bool(
+            self.exclusive & (other.shared | other.exclusive)
+            or self.shared & other.exclusive
+        )
+
+
+class ResourceLockManager:
+    """
+    重任务资源锁管理器，互不冲突的重任务可以同时执行。
+    资源键为元组：
+    - ("region", 区域文件夹路径)：备份时共享，回档时随世界锁一同独占
+    - ("storage", 槽位存储路径)：写入槽位（备份、删除）时独占
+    - WORLD：整个世界的独占锁（回档），与其他任何资源都冲突
+    """
+    WORLD = ("world",)
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__shared = collections.Counter()
+        self.__exclusive = set()
+        self.__held = 0
+
+    @staticmethod
+    def region_key(world_name: str, folder: str) -> tuple:
+        return "region", f"{world_name}/{folder}"
+
+    @staticmethod
+    def storage_key(storage: str) -> tuple:
+        return "storage", str(Path(storage))
+
+    def __is_available(self, request: ResourceRequest) -> bool:
+        if self.WORLD in self.__exclusive:
+            return False
+        if self.WORLD in request.exclusive:
+            return self.__held == 0
+        for key in request.exclusive:
+            if key in self.__exclusive or self.__shared[key] > 0:
+                return False
+        for key in request.shared:
+            if key in self.__exclusive:
+                return False
+        return True
+
+    def try_acquire(self, request: ResourceRequest) -> bool:
+        """一次性获取请求中的全部资源，任一资源不可用时不获取任何资源并返回 False"""
+        with self.__lock:
+            if not self.__is_available(request):
+                return False
+            for key in request.shared:
+                self.__shared[key] += 1
+            self.__exclusive.update(request.exclusive)
+            self.__held += 1
+            return True
+
+    def release(self, request: ResourceRequest):
+        with self.__lock:
+            for key in request.shared:
+                self.__shared[key] -= 1
+                if self.__shared[key] <= 0:
+                    del self.__shared[key]
+            self.__exclusive.difference_update(request.exclusive)
+            self.__held -= 1
+
+    def pick(self, requests: Sequence[ResourceRequest], waiting: Iterable[ResourceRequest] = ()) -> int:
+        """
+        按顺序选出第一个可以立即获取资源的请求并获取，返回其下标，没有则返回 -1。
+        与排在前面、尚在等待的请求冲突的请求不会被选出，避免回档等独占任务被饿死。
+        waiting 为排在所有请求之前、由调用方自行获取的请求（如暂时释放后等待重新获取的资源）
+        """
+        waiting = list(waiting)
+        for i, request in enumerate(requests):
+            if any(request.conflicts_with(w) for w in waiting):
+                continue
+            if self.try_acquire(request):
+                return i
+            waiting.append(request)
+        return -1
@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, TYPE_CHECKING
+from chunk_backup.config.config import Config
+from chunk_backup.mcdr_globals import server
+from chunk_backup.resource_lock import ResourceLockManager, ResourceRequest
+from chunk_backup.utils import io_utils, misc_utils
+from chunk_backup.utils.integrity import Checksum, ScrubResult
+
+if TYPE_CHECKING:
+    from chunk_backup.task_manager import TaskManager
+
+_T = TypeVar('_T')
+
+
+class _SlotChanged(Exception):
+    """校验期间槽位被改写（新备份、删除或轮换）或插件正在卸载，放弃本次校验"""
+
+
+class ScrubManager:
+    """
+    备份完整性后台校验，按备份时记录在 index.json 中的校验和重新读取各槽位的文件，结果写入槽位的 scrub.json，在 list / show 中展示。
+    - 只在没有重任务执行或排队时运行，每校验一个文件共享持有一次槽位存储的资源锁，备份、删除与回档最多等待一个文件
+    - 读取速度限制为 scrub.rate MB/s
+    - 从未校验过的槽位优先，其余槽位距上次校验超过 scrub.interval 后再次校验
+    - 每隔 GC_INTERVAL 清理一次玩家数据仓库中不再被引用的对象（槽位轮换删除旧槽位时不清理）
+    """
+    CHECK_INTERVAL = 60  # 查找待校验槽位的间隔（秒）
+    PAUSE_INTERVAL = 5   # 有重任务时等待的间隔（秒）
+    GC_INTERVAL = 24 * 3600  # 清理玩家数据仓库的间隔（秒）
+
+    def __init__(self, task_manager: 'TaskManager'):
+        self.task_manager = task_manager
+        self.config = Config.get()
+        self.logger = server.logger
+        self.__stop_event = threading.Event()
+        self.__next_read = 0.0
+        self.__last_gc = time.monotonic()
+        self.__thread = threading.Thread(target=self.__loop, name=misc_utils.make_thread_name('scrub'), daemon=True)
+
+    def start(self):
+        if not self.config.scrub.enabled:
+            return
+        self.__thread.start()
+
+    def shutdown(self):
+        self.__stop_event.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    # ================================== Loop ==================================
+
+    def __loop(self):
+        self.logger.info('Backup integrity scrubber started')
+        io_utils.lower_thread_priority(always=True)
+        while not self.__stop_event.wait(self.CHECK_INTERVAL):
+            if self.task_manager.is_heavy_busy():
+                continue
+            try:
+                self.__collect_garbage()
+                target = self.__next_slot()
+                if target is not None:
+                    self.__scrub_slot(*target)
+            except _SlotChanged:
+                continue
+            except Exception:
+                self.logger.exception('Backup integrity scrub failed')
+        self.logger.info('Backup integrity scrubber stopped')
+
+    def __collect_garbage(self):
+        """距上次清理超过 GC_INTERVAL 时清理玩家数据仓库，新写入的对象受 PlayerDataStore.GC_GRACE 保护"""
+        if time.monotonic() - self.__last_gc < self.GC_INTERVAL:
+            return
+        from chunk_backup.utils.player_store import PlayerDataStore
+        self.__last_gc = time.monotonic()
+        PlayerDataStore().collect_garbage()
+
+    @staticmethod
+    def __read_backup_date(slot: Path) -> Optional[str]:
+        try:
+            with open(slot / "info.json", 'r', encoding='utf-8') as f:
+                return json.load(f).get("date")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def __next_slot(self) -> Optional[Tuple[str, Path, str]]:
+        """选出最需要校验的槽位，返回 (存储目录, 槽位路径, 备份日期)，没有需要校验的槽位时返回 None"""
+        from chunk_backup.utils.backup_utils import BackupFolderManager
+
+        now = time.time()
+        best, best_key = None, None
+        for is_static in (False, True):
+            manager = BackupFolderManager(is_static=is_static)
+            for name in manager.get_all_slot_name():
+                slot = manager.storage_root / manager.region_storage / name
+                date = self.__read_backup_date(slot)
+                if date is None:
+                    continue
+                result = ScrubResult.load(slot, date)
+                if result is None:
+                    key = 0.0
+                elif now - result.timestamp >= self.config.scrub.interval.value:
+                    key = result.timestamp
+                else:
+                    continue
+                if best_key is None or key < best_key:
+                    best, best_key = (str(manager.region_storage), slot, date), key
+        return best
+
+    # ================================== Scrub ==================================
+
+    def __locked(self, request: ResourceRequest, slot: Path, date: str, func: Callable[[], _T]) -> _T:
+        """在没有重任务时获取槽位存储的共享资源锁执行 func，槽位已不是原来的备份时抛出 _SlotChanged"""
+        while True:
+            if self.__stop_event.is_set():
+                raise _SlotChanged()
+            if not self.task_manager.is_heavy_busy() and self.task_manager.try_acquire_resources(request):
+                break
+            self.__stop_event.wait(self.PAUSE_INTERVAL)
+        try:
+            if self.__read_backup_date(slot) != date:
+                raise _SlotChanged()
+            return func()
+        finally:
+            self.task_manager.release_resources(request)
+
+    def __throttle(self, size: int):
+        """按 scrub.rate 限制读取速度，插件卸载时中止校验"""
+        if self.__stop_event.is_set():
+            raise _SlotChanged()
+        rate = self.config.scrub.rate * 1024 * 1024
+        if rate <= 0:
+            return
+        now = time.monotonic()
+        self.__next_read = max(self.__next_read, now) + size / rate
+        if self.__next_read > now:
+            self.__stop_event.wait(self.__next_read - now)
+
+    @staticmethod
+    def __collect_files(slot: Path, result: ScrubResult) -> List[Tuple[str, Path, str, Optional[Dict[str, str]]]]:
+        """
+        列出槽位中所有有校验和的文件：(显示路径, 文件路径, 摘要, 区块校验和)。
+        区域文件夹的索引没有校验和时计入 result.unverifiable
+        """
+        from chunk_backup.utils.player_store import PlayerDataStore
+
+        files = []
+        for index_path in sorted(slot.rglob(Checksum.INDEX_FILE)):
+            folder = index_path.parent
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                result.bad_files[Checksum.relative(index_path, slot)] = "mismatch"
+                continue
+            if not isinstance(index.get("files"), dict):
+                result.unverifiable += 1
+                continue
+            chunks = index.get("chunks", {})
+            for rel, digest in index["files"].items():
+                path = folder / rel
+                files.append((Checksum.relative(path, slot), path, digest, chunks.get(rel)))
+
+        # 玩家数据按内容哈希保存在仓库中，对象的哈希即其校验和
+        try:
+            with open(slot / "info.json", 'r', encoding='utf-8') as f:
+                manifest = json.load(f).get(PlayerDataStore.MANIFEST_KEY) or {}
+        except (OSError, ValueError, AttributeError):
+            manifest = {}
+        store = PlayerDataStore()
+        for uuid_files in manifest.values():
+            for rel, digest in uuid_files.items():
+                files.append((rel, store.object_path(digest), digest, None))
+        return files
+
+    def __verify_file(self, result: ScrubResult, label: str, path: Path, digest: str, chunks: Optional[Dict[str, str]]):
+        from chunk_backup.utils.region.chunk import Chunk
+
+        result.checked += 1
+        if not path.is_file():
+            result.bad_files[label] = "missing"
+            return
+        if Checksum.file_digest(path, on_read=self.__throttle) == digest:
+            return
+        result.bad_files[label] = "mismatch"
+        if chunks:
+            result.bad_chunks[label] = Chunk.find_damaged_chunks(path, chunks)
+
+    def __scrub_slot(self, storage: str, slot: Path, date: str):
+        request = ResourceRequest.of(shared=[ResourceLockManager.storage_key(storage)])
+        result = ScrubResult(backup_date=date, time='')
+        start = time.monotonic()
+
+        files = self.__locked(request, slot, date, lambda: self.__collect_files(slot, result))
+        for label, path, digest, chunks in files:
+            self.__locked(request, slot, date, lambda: self.__verify_file(result, label, path, digest, chunks))
+
+        result.time = time.strftime(ScrubResult.DATE_FORMAT)
+        self.__locked(request, slot, date, lambda: result.save(slot))
+
+        elapsed = time.monotonic() - start
+        if result.ok:
+            self.logger.info('Integrity scrub of %s passed: %d file(s) verified in %.1fs', slot, result.checked, elapsed)
+        else:
+            self.logger.warning('Integrity scrub of %s found %d damaged file(s): %s', slot, len(result.bad_files),
+                                ', '.join(f'{name} ({reason})' for name, reason in result.bad_files.items()))
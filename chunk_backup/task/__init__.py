@@ -1,6 +1,6 @@
 import enum
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Union
+from typing import Generic, TypeVar, Union, Optional, Hashable
 
 from mcdreforged.api.all import CommandSource, InfoCommandSource, RTextBase, RColor
 from chunk_backup.utils import mcdr_utils
@@ -16,6 +16,13 @@ class TaskEvent(enum.Enum):
     operation_aborted = enum.auto()
 
 
+class TaskPriority(enum.IntEnum):
+    """任务在队列中的优先级，数值越大越先执行"""
+    scheduled = 0   # 定时任务等例行工作
+    normal = 1
+    urgent = 2      # 回档等需要尽快执行的操作
+
+
 class Task(Generic[_T], mcdr_utils.TranslationContext, ABC):
     def __init__(self, source: Union[CommandSource, InfoCommandSource]):
         super().__init__(f'task.{self.id}')
@@ -29,6 +36,17 @@ class Task(Generic[_T], mcdr_utils.TranslationContext, ABC):
     def is_abort_able(self) -> bool:
         return False
 
+    def get_priority(self) -> TaskPriority:
+        return TaskPriority.normal
+
+    def get_deadline(self) -> Optional[float]:
+        """最晚开始时间（time.time() 时间戳），超过后仍在排队的任务会被跳过，None 为不限"""
+        return None
+
+    def get_coalesce_key(self) -> Optional[Hashable]:
+        """排队中 key 相同的任务会被合并为一个，None 为不合并"""
+        return None
+
     @property
     @abstractmethod
     def id(self) -> str:
@@ -1,40 +1,55 @@
 import contextlib
 import threading
 import datetime
-import shutil
 import traceback
-import candy_tools as ct
 
-from typing import Optional
+from typing import Optional, Hashable
 from collections import defaultdict
 from mcdreforged.api.types import InfoCommandSource
 from mcdreforged.api.rtext import RColor
+from chunk_backup import constants
 from chunk_backup.action.create_backup_action import CreateBackupAction
+from chunk_backup.resource_lock import ResourceLockManager, ResourceRequest
 from chunk_backup.task.basic_task import HeavyTask
-from chunk_backup.task import TaskEvent
+from chunk_backup.task import TaskEvent, TaskPriority
+from chunk_backup.task.task_utils import format_cost_estimate, format_byte_count
 from chunk_backup.types.backup_info import BackupInfo
 from chunk_backup.types.operator import Operator
 from chunk_backup.utils.mcdr_utils import tr
 from chunk_backup.utils.serverdata_getter import ServerDataGetter
 from chunk_backup.types.point import Point2D
-from chunk_backup.utils.backup_utils import PlayerDataFolderManager
+from chunk_backup.utils.backup_utils import PlayerDataFolderManager, BackupFolderManager
 from chunk_backup.utils.region.chunk_selector import ChunkSelector
+from chunk_backup.utils.region.region import Region
+from chunk_backup.utils.save_watcher import WorldSaveWatcher
+from chunk_backup.utils.throughput import ThroughputHistory
 from chunk_backup.log.log_manager import LogManager
 from chunk_backup.log.log_info import LogTask
-from chunk_backup.exceptions import MaxChunkLength, MaxChunkRadius
+from chunk_backup.exceptions import MaxChunkLength, MaxChunkRadius, BackupInterrupted
 from chunk_backup.utils.timer import Timer
 
 
 class CreateBackupTask(HeavyTask[Optional[int]]):
+    # 多个备份任务同时执行时，save-off 只在第一个任务开始时执行，save-on 在最后一个任务结束时执行
+    __autosave_lock = threading.Lock()
+    __autosave_users = 0
+    __autosave_applied = False
 
     def __init__(
         self,
         source: InfoCommandSource,
         context: dict,
         operator: Optional[Operator] = None,
+        *,
+        priority: TaskPriority = TaskPriority.normal,
+        deadline: Optional[float] = None,
+        coalesce_key: Optional[Hashable] = None,
     ):
         super().__init__(source)
         self.context = context
+        self.priority = priority
+        self.deadline = deadline
+        self.coalesce_key = coalesce_key
         self.operator = Operator.of(source) if operator is None else operator
         self.is_static = True if context.get("static_count") else False
         self.world_saved_done = threading.Event()
@@ -45,7 +60,48 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
         return "create_backup"
 
     def is_abort_able(self) -> bool:
-        return self.__waiting_world_save
+        return self.__waiting_world_save or super().is_abort_able()
+
+    def get_priority(self) -> TaskPriority:
+        return self.priority
+
+    def get_deadline(self) -> Optional[float]:
+        return self.deadline
+
+    def get_coalesce_key(self) -> Optional[Hashable]:
+        return self.coalesce_key
+
+    def get_resource_request(self) -> ResourceRequest:
+        """共享读取所选维度的区域文件夹，独占写入目标槽位存储"""
+        dimension_config = self.config.backup.dimension or {}
+        dimensions = self.context.get("dimension")
+        if not isinstance(dimensions, list):
+            # radius 模式在执行前无法得知玩家所在维度
+            dimensions = list(dimension_config.keys())
+
+        shared = []
+        for dimension in dimensions:
+            info = dimension_config.get(dimension)
+            if info is None:
+                continue
+            for folder in info["region_folder"]:
+                shared.append(ResourceLockManager.region_key(info["world_name"], folder))
+
+        storage = self.config.static_storage if self.is_static else self.config.dynamic_storage
+        return ResourceRequest.of(shared=shared, exclusive=[ResourceLockManager.storage_key(storage)])
+
+    def __get_operator_text(self) -> str:
+        if self.operator.is_player():
+            return self.operator.name
+        if self.operator.type == constants.PLUGIN_ID:
+            return tr("other.operator.plugin").to_plain_text()
+        return tr("other.operator.console").to_plain_text()
+
+    def __get_command_text(self) -> str:
+        # 定时备份等由插件发起的任务没有对应的聊天信息，使用 context 中记录的等效指令
+        if isinstance(self.source, InfoCommandSource):
+            return self.source.get_info().content
+        return self.context.get("command", "")
 
     # -------------------------------------------------
 
@@ -55,26 +111,77 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
         cmd_auto_save_off = self.config.server.commands.auto_save_off
         cmd_auto_save_on = self.config.server.commands.auto_save_on
 
-        applied_auto_save_off = False
-
-        if (
-            self.server.is_server_running()
-            and self.config.server.turn_off_auto_save
-            and len(cmd_auto_save_off) > 0
-        ):
-            self.server.execute(cmd_auto_save_off)
-            applied_auto_save_off = True
+        cls = CreateBackupTask
+        with cls.__autosave_lock:
+            cls.__autosave_users += 1
+            if (
+                cls.__autosave_users == 1
+                and self.server.is_server_running()
+                and self.config.server.turn_off_auto_save
+                and len(cmd_auto_save_off) > 0
+            ):
+                self.server.execute(cmd_auto_save_off)
+                cls.__autosave_applied = True
 
         try:
             yield
 
         finally:
-            if (
-                applied_auto_save_off
-                and self.server.is_server_running()
-                and len(cmd_auto_save_on) > 0
-            ):
-                self.server.execute(cmd_auto_save_on)
+            with cls.__autosave_lock:
+                cls.__autosave_users -= 1
+                if cls.__autosave_users == 0 and cls.__autosave_applied:
+                    cls.__autosave_applied = False
+                    if self.server.is_server_running() and len(cmd_auto_save_on) > 0:
+                        self.server.execute(cmd_auto_save_on)
+
+    def __save_world(self, backup_info: BackupInfo) -> bool:
+        """
+        执行保存世界指令并等待保存完成，失败时广播原因并返回 False。
+        匹配到 saved_world_regex 或选中的区域文件持续一段时间没有变化，两者先到者视为保存完成。
+        """
+        if self.server.is_server_running():
+
+            self.world_saved_done.clear()
+            quiet_period = self.config.server.save_quiet_period.value
+            watcher = None
+            if quiet_period > 0:
+                watcher = WorldSaveWatcher(
+                    Region.get_watch_paths(BackupFolderManager(is_static=self.is_static), backup_info),
+                    self.world_saved_done.set, quiet_period
+                )
+                watcher.start()
+
+            if len(cmd_save_all_worlds := self.config.server.commands.save_all_worlds) > 0:
+                self.server.execute(cmd_save_all_worlds)
+
+            if len(self.config.server.saved_world_regex) > 0 or watcher is not None:
+
+                self.__waiting_world_save = True
+
+                try:
+                    wait_world_saved_done_ok = self.world_saved_done.wait(
+                        timeout=self.config.server.save_world_max_wait.value)
+                finally:
+                    if watcher is not None:
+                        watcher.stop()
+
+                self.__waiting_world_save = False
+
+                if self.aborted_event.is_set():
+
+                    self.broadcast(self.get_aborted_text())
+
+                    return False
+                if not wait_world_saved_done_ok:
+
+                    self.broadcast(self.tr('abort.save_wait_time_out').set_color(RColor.red))
+                    return False
+
+        if self.plugin_unloaded_event.is_set():
+            self.broadcast(self.tr('abort.unloaded').set_color(RColor.red))
+            return False
+
+        return True
 
     # -------------------------------------------------
 
@@ -117,7 +224,31 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
 
             try:
                 sel = points.to_chunk_selector(
-                    max_chunk_size=self.config.backup.max_chunk_length
+                    max_chunk_size=self.config.backup.max_chunk_length,
+                    ignore_size_limit=self.config.backup.max_chunk_length <= 0
+                )
+
+            except MaxChunkLength as e:
+
+                self.reply_tr(
+                    "max_chunk_length",
+                    default=e.max_chunk_size,
+                    height=e.height,
+                    width=e.width,
+                )
+
+                return None
+
+            for dim in backup_info.dimension:
+                selector[dim].append(sel)
+
+        elif "polygon" in ctx:
+
+            try:
+                sel = ChunkSelector.from_polygon(
+                    ctx["polygon"],
+                    max_chunk_size=self.config.backup.max_chunk_length,
+                    ignore_size_limit=self.config.backup.max_chunk_length <= 0
                 )
 
             except MaxChunkLength as e:
@@ -142,6 +273,8 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
                 sel = point.to_chunk_selector(
                     ctx["radius"],
                     max_chunk_size=self.config.backup.max_chunk_length,
+                    ignore_size_limit=self.config.backup.max_chunk_length <= 0,
+                    circle=bool(ctx.get("circle_count"))
                 )
 
             except MaxChunkRadius as e:
@@ -172,10 +305,11 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
         backup_info.is_static = self.is_static
 
         backup_info.selector = selector
-        if ct.query_carpet():
+        data_getter = ServerDataGetter()
+        if data_getter.query_carpet():
             region_dict = ChunkSelector.to_block_rectangles_dict(selector)
             origion_dimension = list(selector.keys())
-            player_data = ct.get_players_data_in_regions(region_dict, origion_dimension)
+            player_data = data_getter.get_players_data_in_regions(region_dict, origion_dimension)
             if not player_data:
                 if player_data is None:
                     self.broadcast(self.tr("no_carpet", self.tr("name").to_plain_text()))
@@ -195,12 +329,14 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
         else:
             backup_info.type = "chunk"
 
-            rect = selector[backup_info.dimension[0]][0]._rectangles[0]
+            sel = selector[backup_info.dimension[0]][0]
 
-            backup_info.top_left = {"x": rect[0], "z": rect[3]}
-            backup_info.top_right = {"x": rect[2], "z": rect[3]}
-            backup_info.bottom_left = {"x": rect[0], "z": rect[1]}
-            backup_info.bottom_right = {"x": rect[2], "z": rect[1]}
+            # 圆形/多边形选区的四角坐标为其外接矩形
+            backup_info.top_left = {"x": sel.min_x, "z": sel.max_z}
+            backup_info.top_right = {"x": sel.max_x, "z": sel.max_z}
+            backup_info.bottom_left = {"x": sel.min_x, "z": sel.min_z}
+            backup_info.bottom_right = {"x": sel.max_x, "z": sel.min_z}
+            backup_info.shape = sel.to_shape()
 
         # -------------------------------------------------
         # metadata
@@ -210,13 +346,9 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
             "comment", self.tr("no_comment").to_plain_text()
         )
 
-        backup_info.operator = (
-            self.operator.name
-            if self.operator.is_player()
-            else tr("other.operator.console").to_plain_text()
-        )
+        backup_info.operator = self.__get_operator_text()
 
-        backup_info.command = self.source.get_info().content
+        backup_info.command = self.__get_command_text()
 
         backup_info.version_created = self.config.config_version
         backup_info.minecraft_version = self.config.minecraft_version
@@ -230,86 +362,104 @@ class CreateBackupTask(HeavyTask[Optional[int]]):
         if backup_info is None:
             return None
 
+        # 只读取区域文件头预估开销，按区块选择时可按大小限制
+        estimate = Region.estimate_regions(BackupFolderManager(is_static=self.is_static), backup_info)
+        estimate.duration = ThroughputHistory().estimate_duration(self.id, estimate.total_bytes)
+        max_backup_size = self.config.backup.max_backup_size
+        if backup_info.type == "chunk" and max_backup_size is not None and estimate.total_bytes > max_backup_size.value:
+            self.reply_tr(
+                "max_backup_size",
+                size=format_byte_count(estimate.total_bytes),
+                limit=format_byte_count(max_backup_size.value)
+            )
+            return None
+
         self.broadcast(self.tr("start"))
+        if backup_info.type == "chunk":
+            chunk_count = sum(ChunkSelector.count_chunks(sels) for sels in backup_info.selector.values())
+            self.broadcast(self.tr("chunk_count", total=chunk_count))
+        self.broadcast(format_cost_estimate(estimate))
 
         with contextlib.ExitStack() as exit_stack:
-            exit_stack.enter_context(self.__autosave_disabler())
+            # 边运行边复制时先在自动保存开启的情况下复制，只在最终校验前关闭自动保存并保存世界
+            live_copy = self.config.server.live_copy and self.server.is_server_running()
+            save_failed = False
+            verify_wait = 0.0
+
+            def before_verify() -> bool:
+                nonlocal save_failed, verify_wait
+                wait_timer = Timer()
+                exit_stack.enter_context(self.__autosave_disabler())
+                save_failed = not self.__save_world(backup_info)
+                verify_wait = wait_timer.get_elapsed()
+                return not save_failed
 
             timer = Timer()
-            if self.server.is_server_running():
-
-                if len(cmd_save_all_worlds := self.config.server.commands.save_all_worlds) > 0:
-                    self.server.execute(cmd_save_all_worlds)
-
-                if len(self.config.server.saved_world_regex) > 0:
-
-                    self.__waiting_world_save = True
-
-                    wait_world_saved_done_ok = self.world_saved_done.wait(
-                        timeout=self.config.server.save_world_max_wait.value)
-
-                    self.__waiting_world_save = False
-
-                    if self.aborted_event.is_set():
-
-                        self.broadcast(self.get_aborted_text())
-
-                        return None
-                    if not wait_world_saved_done_ok:
-
-                        self.broadcast(self.tr('abort.save_wait_time_out').set_color(RColor.red))
-                        return None
-
-            if self.plugin_unloaded_event.is_set():
-                self.broadcast(self.tr('abort.unloaded').set_color(RColor.red))
-                return None
+            if not live_copy:
+                exit_stack.enter_context(self.__autosave_disabler())
+                if not self.__save_world(backup_info):
+                    return None
 
             cost_save_wait = timer.get_and_restart()
 
             log_task = LogTask()
             log_task.task = self.id
-            log_task.operator = self.operator.name if self.operator.is_player() else tr("other.operator.console").to_plain_text()
-            log_task.command = self.source.get_info().content
+            log_task.operator = self.__get_operator_text()
+            log_task.command = self.__get_command_text()
 
-            with LogManager().task_logger(log_task):
-                action = CreateBackupAction(
-                    backup_info
-                )
+            try:
+                with LogManager().task_logger(log_task):
+                    action = CreateBackupAction(
+                        backup_info,
+                        progress=self.create_progress(estimate, ThroughputHistory().get_speed(self.id)),
+                        before_verify=before_verify if live_copy else None
+                    )
 
-                action.run()
-                backup_info.date = datetime.datetime.now().strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
+                    self.run_action(action)
+                    # 速度只按复制阶段计算，不含之后的玩家数据备份与写入备份信息，也不含校验前等待保存的时间
+                    cost_copy = timer.get_elapsed() - verify_wait
+                    if action.recopied is not None:
+                        self.broadcast(self.tr("live_copy_verified", action.recopied))
+                    backup_info.date = datetime.datetime.now().strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    )
 
-                if backup_info.player_data:
-                    try:
-                        uuid_dict = {}
-                        for k, v in backup_info.player_data.items():
-                            uuid_dict[k] = v["uuid"]
-                        _data = PlayerDataFolderManager(list(uuid_dict.values()), is_static=self.is_static)
-                        _data.backup_player_data()
-                        backup_info.uuid_dict = uuid_dict
-                    except Exception:
-                        shutil.rmtree(_data.storage_root / _data.region_storage / _data.backup_slot / "players", ignore_errors=True)
-                        self.broadcast(self.tr("backup_player_data_error", error=traceback.format_exc()))
-
-                backup_info.save_json()
-
-                cost_create = timer.get_elapsed()
-                cost_total = cost_save_wait + cost_create
-
-                self.broadcast(
-                    self.tr(
-                        'date', date=backup_info.date,
-                        comment=self.context.get("comment", self.tr('no_comment').to_plain_text())
+                    if backup_info.player_data:
+                        try:
+                            uuid_dict = {}
+                            for k, v in backup_info.player_data.items():
+                                uuid_dict[k] = v["uuid"]
+                            _data = PlayerDataFolderManager(list(uuid_dict.values()), is_static=self.is_static)
+                            backup_info.player_files = _data.backup_player_data()
+                            backup_info.uuid_dict = uuid_dict
+                        except Exception:
+                            backup_info.player_files = None
+                            self.broadcast(self.tr("backup_player_data_error", error=traceback.format_exc()))
+
+                    backup_info.save_json()
+
+                    cost_create = timer.get_elapsed()
+                    cost_total = cost_save_wait + cost_create
+                    ThroughputHistory().record(self.id, backup_info.total_size, cost_copy)
+
+                    self.broadcast(
+                        self.tr(
+                            'date', date=backup_info.date,
+                            comment=self.context.get("comment", self.tr('no_comment').to_plain_text())
+                        )
                     )
-                )
-                if backup_info.uuid_dict:
-                    self.broadcast(self.tr("player_data_completed", total=len(backup_info.uuid_dict), type=self.tr("name").to_plain_text()))
+                    if backup_info.uuid_dict:
+                        self.broadcast(self.tr("player_data_completed", total=len(backup_info.uuid_dict), type=self.tr("name").to_plain_text()))
 
-                self.broadcast(
-                    self.tr('completed', round(cost_total, 2))
-                )
+                    self.broadcast(
+                        self.tr('completed', round(cost_total, 2))
+                    )
+
+            except BackupInterrupted:
+                # 未完成的槽位已由 action 移入回收站，日志中该任务记为未完成；保存失败的原因已单独提示
+                if not save_failed:
+                    self.broadcast(self.get_aborted_text())
+                return None
 
         return backup_info.total_size
 
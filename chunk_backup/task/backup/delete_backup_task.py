@@ -4,8 +4,10 @@ from typing import Optional
 
 from mcdreforged.api.types import InfoCommandSource
 from chunk_backup.utils.backup_utils import BackupFolderManager as Manager
+from chunk_backup.resource_lock import ResourceLockManager, ResourceRequest
 from chunk_backup.task.basic_task import HeavyTask
 from chunk_backup.utils.mcdr_utils import tr
+from chunk_backup.utils.player_store import PlayerDataStore
 from chunk_backup.log.log_manager import LogTask
 from chunk_backup.log.log_manager import LogManager
 from chunk_backup.types.operator import Operator
@@ -27,6 +29,9 @@ class DeleteBackupTask(HeavyTask[None]):
     def is_abort_able(self) -> bool:
         return True
 
+    def get_resource_request(self) -> ResourceRequest:
+        return ResourceRequest.of(exclusive=[ResourceLockManager.storage_key(self.manager.region_storage)])
+
     def run(self):
         if not self.wait_confirm(self.tr('name').to_plain_text()):
             return
@@ -54,4 +59,7 @@ class DeleteBackupTask(HeavyTask[None]):
                 for future in as_completed(future_to_path):
                     future.result()  # 触发异常（如果有）
 
+            # 删除的槽位可能是某些玩家数据对象的最后引用
+            PlayerDataStore().collect_garbage()
+
         self.reply_tr("completed", amount=len(self.slots))
@@ -9,6 +9,7 @@ from chunk_backup.log.log_manager import LogManager
 from chunk_backup.types.backup_info import BackupInfo
 from chunk_backup.types.units import ByteCount
 from chunk_backup.utils.backup_utils import BackupFolderManager as manager
+from chunk_backup.utils.integrity import ScrubResult
 from chunk_backup.utils.mcdr_utils import tr
 
 
@@ -76,13 +77,18 @@ class ListBackupTask(ImmediateTask[None]):
                 cmd_back = f"{prefix} back {slot_integer}{is_static}"
                 cmd_del = f"{prefix} del {slot_integer}{is_static}"
 
-                content.append(
-                    self.get_json_obj(
-                        "single_slot", dimension=dimension, operator=operator, command=command,
-                        size=size, date=date, name=name, comment=comment, slot=slot_integer,
-                        cmd_show=cmd_show, cmd_back=cmd_back, cmd_del=cmd_del
-                    )
+                line = self.get_json_obj(
+                    "single_slot", dimension=dimension, operator=operator, command=command,
+                    size=size, date=date, name=name, comment=comment, slot=slot_integer,
+                    cmd_show=cmd_show, cmd_back=cmd_back, cmd_del=cmd_del
                 )
+                # 后台完整性校验结果，尚未校验时不显示
+                if scrub := ScrubResult.load(slot, backup_info.date):
+                    if not scrub.ok:
+                        line = self.merge_rtext_lists(line, self.get_json_obj("integrity.damaged", time=scrub.time, count=len(scrub.bad_files)), separator=" ")
+                    elif scrub.checked > 0:
+                        line = self.merge_rtext_lists(line, self.get_json_obj("integrity.ok", time=scrub.time, checked=scrub.checked), separator=" ")
+                content.append(line)
             except Exception:
                 slot_display = self.get_json_obj("other.ui.slot_display", slot=slot.name.replace("slot", ""), without_id=True)
                 info_empty = self.get_json_obj("other.ui.info_empty", without_id=True)
@@ -131,9 +137,8 @@ class ListBackupTask(ImmediateTask[None]):
             log_manager = LogManager()
             if log := log_manager.get_latest_log_by_task("restore_backup"):
                 try:
-                    with open(log, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    cmd = f"{self.config.command.prefix} log show {log.name}"
+                    data = log_manager.read_log(log)
+                    cmd = f"{self.config.command.prefix} log show {log}"
                     content.append(
                         self.get_json_obj(
                             "other.ui.latest_restore", without_id=True, cmd=cmd,
@@ -1,9 +1,9 @@
-import json
 import math
-from typing import Union
+from typing import Union, Optional
 
 from mcdreforged.api.types import CommandSource
 from mcdreforged.api.rtext import RTextBase
+from chunk_backup.log.log_info import LogQuery
 from chunk_backup.log.log_manager import LogManager
 from chunk_backup.task.basic_task import ImmediateTask
 from chunk_backup.utils.mcdr_utils import tr
@@ -16,6 +16,7 @@ class ListLogTask(ImmediateTask[None]):
         self.manager = LogManager()
         self.per_page = context.get("per_page", 10)
         self.page = context.get("page", 1)
+        self.query_text: Optional[str] = context.get("query")  # log find 的查询条件，None 为列出全部
 
     @property
     def id(self) -> str:
@@ -24,32 +25,61 @@ class ListLogTask(ImmediateTask[None]):
     def reply(self, msg: Union[str, RTextBase], *, with_prefix: bool = False):
         super().reply(msg, with_prefix=with_prefix)
 
+    def __parse_query(self) -> Optional[LogQuery]:
+        """解析查询条件，page=<页数> 作为翻页参数单独取出；解析失败时回复并返回 None"""
+        tokens = []
+        for token in self.query_text.split():
+            key, _, value = token.partition("=")
+            if key.lower() != "page":
+                tokens.append(token)
+                continue
+            if not value.isdigit() or int(value) < 1:
+                self.reply_tr("bad_query", token, with_prefix=True)
+                return None
+            self.page = int(value)
+        self.query_text = " ".join(tokens)
+        try:
+            return LogQuery.parse(self.query_text)
+        except ValueError as e:
+            self.reply_tr("bad_query", e.args[0] if e.args else self.query_text, with_prefix=True)
+            return None
+
     def run(self):
+        query = None
+        if self.query_text is not None:
+            query = self.__parse_query()
+            if query is None:
+                return
         per_page = self.per_page
         page = self.page
-        total_logs = self.manager.count_log_files()
+        total_logs = self.manager.count_log_files() if query is None else self.manager.count_logs(query)
         total_pages = math.ceil(total_logs / per_page)
         if page > total_pages:
             if not total_logs:
+                if query is not None:
+                    self.reply_tr("no_match", with_prefix=True)
+                    return
                 self.reply(tr("other.ui.log_empty"), with_prefix=True)
                 return
             self.reply(tr("other.ui.out_of_index"), with_prefix=True)
             return
         start = self.per_page * (self.page - 1) + 1
         end = min(total_logs, self.per_page * self.page)
-        range_logs = self.manager.get_log_files(start, end)
-        content = [self.get_json_obj("title")]
+        if query is None:
+            range_logs = self.manager.get_log_files(start, end)
+            content = [self.get_json_obj("title")]
+        else:
+            range_logs = self.manager.find_logs(query, start, end)
+            content = [self.get_json_obj("find_title", self.query_text)]
         if not range_logs:
             content.append(self.get_json_obj("other.ui.log_empty", without_id=True))
             self.reply(self.merge_rtext_lists(content))
             return
         base_cmd = f"{self.config.command.prefix} log show"
         for log in range_logs:
-            log_file = self.manager.log_storage / log
-            cmd = base_cmd + log
+            cmd = f"{base_cmd} {log}"
             try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    info = json.load(f)
+                info = self.manager.read_log(log)
 
                 task = info["task"]
                 success = info["task_done"]
@@ -72,11 +102,16 @@ class ListLogTask(ImmediateTask[None]):
             return
 
         page_components = []
-        base_cmd = f"{self.config.command.prefix} log list"
+        if query is None:
+            base_cmd = f"{self.config.command.prefix} log list"
+            page_cmd = "{base} {page}"
+        else:
+            base_cmd = f"{self.config.command.prefix} log find {self.query_text}".rstrip()
+            page_cmd = "{base} page={page}"
 
         # 上一页
         if self.page > 1:
-            prev_cmd = f"{base_cmd} {self.page - 1}"
+            prev_cmd = page_cmd.format(base=base_cmd, page=self.page - 1)
             prev_text = self.get_json_obj(
                 "other.ui.prev", without_id=True,
                 current=self.page, prev=self.page - 1, cmd=prev_cmd
@@ -85,7 +120,7 @@ class ListLogTask(ImmediateTask[None]):
 
         # 下一页
         if self.page < total_pages:
-            next_cmd = f"{base_cmd} {self.page + 1}"
+            next_cmd = page_cmd.format(base=base_cmd, page=self.page + 1)
             next_text = self.get_json_obj(
                 "other.ui.next", without_id=True,
                 current=self.page, next=self.page + 1, cmd=next_cmd
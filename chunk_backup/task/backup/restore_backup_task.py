@@ -1,21 +1,25 @@
 import json
 import traceback
-import candy_tools as ct
 
 from collections import defaultdict
 from typing import Union
 from mcdreforged.api.types import CommandSource
 from mcdreforged.api.rtext import RTextBase
+from chunk_backup.task import TaskPriority
 from chunk_backup.task.basic_task import HeavyTask
+from chunk_backup.task.task_utils import format_cost_estimate
 from chunk_backup.exceptions import FatalError
 from chunk_backup.types.operator import Operator
 from chunk_backup.action.restore_backup_action import RestoreBackupAction
 from chunk_backup.types.backup_info import BackupInfo
+from chunk_backup.utils.serverdata_getter import ServerDataGetter
 from chunk_backup.utils.backup_utils import PlayerDataFolderManager as data_manager, BackupFolderManager as Manager, DimensionChecker
 from chunk_backup.utils.mcdr_utils import tr
 from chunk_backup.log.log_manager import LogTask
 from chunk_backup.log.log_manager import LogManager
 from chunk_backup.utils.region.chunk_selector import ChunkSelector
+from chunk_backup.utils.region.region import Region
+from chunk_backup.utils.throughput import ThroughputHistory
 
 
 class RestoreBackupTask(HeavyTask[None]):
@@ -39,9 +43,21 @@ class RestoreBackupTask(HeavyTask[None]):
     def is_abort_able(self) -> bool:
         return super().is_abort_able() or self.__can_abort
 
+    def get_priority(self) -> TaskPriority:
+        return TaskPriority.urgent
+
     def reply(self, msg: Union[str, RTextBase], *, with_prefix: bool = False):
         super().reply(msg, with_prefix=with_prefix)
 
+    @staticmethod
+    def __build_chunk_selector(info) -> ChunkSelector:
+        """按备份记录还原选区，圆形/多边形选区通过 shape 还原，其余通过四角坐标还原"""
+        if info.shape:
+            return ChunkSelector.from_shape(info.shape, ignore_size_limit=True)
+        top_left = (info.top_left["x"], info.top_left["z"])
+        bottom_right = (info.bottom_right["x"], info.bottom_right["z"])
+        return ChunkSelector.from_chunk_coords(top_left, bottom_right, ignore_size_limit=True)
+
     def __countdown_and_stop_server(self) -> bool:
         for countdown in range(max(0, self.config.command.restore_countdown_sec), 0, -1):
             self.broadcast(self.get_json_obj("countdown", sec=countdown, prefix=self.config.command.prefix, slot=self.manager.backup_slot.replace("slot", "")))
@@ -92,9 +108,7 @@ class RestoreBackupTask(HeavyTask[None]):
             if hasattr(backup_info, "player_position"):
                 backup_info.player_position = None
             backup_info.selector = defaultdict(list)
-            top_left = (backup_info.top_left["x"], backup_info.top_left["z"])
-            bottom_right = (backup_info.bottom_right["x"], backup_info.bottom_right["z"])
-            selector = ChunkSelector.from_chunk_coords(top_left, bottom_right, ignore_size_limit=True)
+            selector = self.__build_chunk_selector(backup_info)
             for dim in backup_info.dimension:
                 backup_info.selector[dim].append(selector)
 
@@ -135,9 +149,7 @@ class RestoreBackupTask(HeavyTask[None]):
                             continue
                         if hasattr(sub, "player_position"):
                             sub.player_position = None
-                        top_left = (sub.top_left["x"], sub.top_left["z"])
-                        bottom_right = (sub.bottom_right["x"], sub.bottom_right["z"])
-                        selector = ChunkSelector.from_chunk_coords(top_left, bottom_right, ignore_size_limit=True)
+                        selector = self.__build_chunk_selector(sub)
                         backup_info.selector[dim].append(selector)
 
             backup_info.dimension = list(set(all_dimensions))
@@ -150,15 +162,35 @@ class RestoreBackupTask(HeavyTask[None]):
                 comment=backup_info.comment
             )
         )
+        if backup_info.type != "region":
+            # 仅统计按区块选择的部分，整区域选择不计入
+            chunk_count = sum(ChunkSelector.count_chunks(sels) for sels in backup_info.selector.values() if "all" not in sels)
+            if chunk_count:
+                self.broadcast(self.tr("chunk_count", total=chunk_count))
+
+        # 只读取备份中区域文件头预估开销，与确认提示一起显示
+        estimate = Region.estimate_regions(manager, backup_info, from_backup=True)
+        estimate.duration = ThroughputHistory().estimate_duration(self.id, estimate.total_bytes)
+        self.broadcast(format_cost_estimate(estimate))
 
         if self.need_confirm:
             if not self.wait_confirm(self.tr('name').to_plain_text()):
                 return
+            # 等待确认期间未持有资源锁，槽位可能已被新的备份覆盖
+            try:
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    changed = json.load(f).get("date") != backup_info.date
+            except (OSError, ValueError):
+                changed = True
+            if changed:
+                self.broadcast(self.tr("slot_changed", slot=manager.backup_slot.replace("slot", "")))
+                return
 
-        if ct.query_carpet():
+        data_getter = ServerDataGetter()
+        if data_getter.query_carpet():
             region_dict = ChunkSelector.to_block_rectangles_dict(backup_info.selector)
             origion_dimension = list(backup_info.selector.keys())
-            player_data = ct.get_players_data_in_regions(region_dict, origion_dimension)
+            player_data = data_getter.get_players_data_in_regions(region_dict, origion_dimension)
             if not player_data:
                 if player_data is None:
                     self.broadcast(self.get_json_obj("task.create_backup.no_carpet", self.tr("pre_backup.name").to_plain_text(), without_id=True))
@@ -188,9 +220,11 @@ class RestoreBackupTask(HeavyTask[None]):
         log_task.operator = self.operator.name if self.operator.is_player() else tr("other.operator.console").to_plain_text()
 
         with LogManager().task_logger(log_task):
-            action = RestoreBackupAction(manager, backup_info)
+            action = RestoreBackupAction(manager, backup_info, progress=self.create_progress(estimate, ThroughputHistory().get_speed(self.id)))
             try:
                 action.run()
+                # 预估的数据量只包含回档本身，速度也只按回档阶段的耗时计算
+                ThroughputHistory().record(self.id, estimate.total_bytes, action.restore_time)
                 if hasattr(log_task, "pre_backup_done"):
                     log_task.pre_backup_done = True
 
@@ -7,9 +7,11 @@ from chunk_backup.task.basic_task import ImmediateTask
 from chunk_backup.types.backup_info import BackupInfo
 from chunk_backup.types.units import ByteCount
 from chunk_backup.utils.backup_utils import BackupFolderManager as manager
+from chunk_backup.utils.integrity import ScrubResult
 
 
 class ShowBackupTask(ImmediateTask[None]):
+    MAX_DAMAGED_FILES = 10  # 最多列出的损坏文件数
 
     def __init__(self, source: CommandSource, context: dict):
         super().__init__(source)
@@ -29,6 +31,35 @@ class ShowBackupTask(ImmediateTask[None]):
     def reply(self, msg: Union[str, RTextBase], *, with_prefix: bool = False):
         super().reply(msg, with_prefix=with_prefix)
 
+    def __format_shape(self, shape: dict) -> str:
+        if shape["type"] == "circle":
+            x, z = shape["center"]
+            return self.tr("shape.circle", x=x, z=z, radius=shape["radius"]).to_plain_text()
+        return self.tr("shape.polygon", count=len(shape["points"])).to_plain_text()
+
+    def __integrity_lines(self, slot, backup_info: BackupInfo) -> list:
+        """后台完整性校验的结果：一行概要，损坏时逐个列出损坏的文件"""
+        scrub = ScrubResult.load(slot, backup_info.date)
+        if scrub is None:
+            value = self.tr("integrity.pending").to_plain_text()
+        elif not scrub.ok:
+            value = self.tr("integrity.damaged", time=scrub.time, count=len(scrub.bad_files)).to_plain_text()
+        elif scrub.checked == 0:
+            value = self.tr("integrity.unverifiable").to_plain_text()
+        else:
+            value = self.tr("integrity.ok", time=scrub.time, checked=scrub.checked).to_plain_text()
+        lines = [self.get_json_obj("common.integrity", value)]
+        if scrub is None:
+            return lines
+
+        for file, reason in list(scrub.bad_files.items())[:self.MAX_DAMAGED_FILES]:
+            if chunks := scrub.bad_chunks.get(file):
+                reason_text = self.tr("integrity.reason.chunks", chunks=" ".join(chunks)).to_plain_text()
+            else:
+                reason_text = self.tr(f"integrity.reason.{reason}").to_plain_text()
+            lines.append(self.get_json_obj("integrity.damaged_file", file=file, reason=reason_text))
+        return lines
+
     def _show_uuid_list(self, backup_info: BackupInfo):
         if not backup_info.uuid_dict:
             self.reply(self.tr("no_player_data", self.integer_id), with_prefix=True)
@@ -102,7 +133,8 @@ class ShowBackupTask(ImmediateTask[None]):
 
     def run(self):
         self.manager.backup_slot = self.raw_id
-        info = self.manager.storage_root / (self.overwrite if self.pre_backup else self.manager.region_storage / self.manager.backup_slot) / "info.json"
+        slot = self.manager.storage_root / (self.overwrite if self.pre_backup else self.manager.region_storage / self.manager.backup_slot)
+        info = slot / "info.json"
         try:
             with open(info, 'r', encoding='utf-8') as f:
                 info = json.load(f)
@@ -134,6 +166,10 @@ class ShowBackupTask(ImmediateTask[None]):
                         if key == "player_position" and "player_position" not in info:
                             continue
                         value = ', '.join(f"{k}: {v}" for k, v in info[key].items())
+                    elif key == "shape":
+                        if "shape" not in info:
+                            continue
+                        value = self.__format_shape(info[key])
                     else:
                         value = info.get(key)
                         if not value:
@@ -141,6 +177,8 @@ class ShowBackupTask(ImmediateTask[None]):
                 except Exception:
                     continue
                 content.append(self.get_json_obj(f"common.{key}", value))
+            if not self.pre_backup:
+                content.extend(self.__integrity_lines(slot, backup_info))
 
         else:
             self.reply(self.get_json_obj("other.ui.info_empty", without_id=True), with_prefix=True)
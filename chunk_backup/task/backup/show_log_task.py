@@ -1,4 +1,3 @@
-import json
 from typing import Union
 
 from mcdreforged.api.types import CommandSource
@@ -14,7 +13,7 @@ class ShowLogTask(ImmediateTask[None]):
     def __init__(self, source: CommandSource, context: dict):
         super().__init__(source)
         self.manager = LogManager()
-        self.name = context.get("name", self.manager.get_latest_log().name)
+        self.name = context.get("name", self.manager.get_latest_log())
 
     @property
     def id(self) -> str:
@@ -29,15 +28,14 @@ class ShowLogTask(ImmediateTask[None]):
             self.reply(tr("other.ui.log_empty"), with_prefix=True)
             return
 
-        if not self.manager.is_valid_log_file(self.name):
+        if not self.name or not self.manager.is_valid_log_file(self.name):
             self.reply_tr("no_log", with_prefix=True)
             return
 
         content = [self.get_json_obj("title")]
 
         try:
-            with open(self.manager.log_storage / self.name, 'r', encoding='utf-8') as f:
-                info = json.load(f)
+            info = self.manager.read_log(self.name)
 
             for key, value in info.items():
                 if key == "task":
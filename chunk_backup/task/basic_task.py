@@ -2,14 +2,17 @@ import logging
 import threading
 
 from abc import ABC
-from typing import Union, Optional, TypeVar
+from typing import Union, Optional, TypeVar, Callable, ContextManager
 from mcdreforged.api.types import CommandSource, InfoCommandSource, PermissionLevel
 from mcdreforged.api.rtext import RTextBase
+from chunk_backup.resource_lock import ResourceRequest
 from chunk_backup.task import Task, TaskEvent
-from chunk_backup.task.task_utils import ConfirmHelper
+from chunk_backup.task.task_utils import ConfirmHelper, format_progress
+from chunk_backup.types.cost_estimate import CostEstimate
 from chunk_backup.types.units import Duration
 from chunk_backup.utils import mcdr_utils
 from chunk_backup.utils.mcdr_utils import TranslationContext
+from chunk_backup.utils.progress import ProgressReporter
 
 _S = TypeVar('_S')
 _T = TypeVar('_T')
@@ -127,7 +130,39 @@ class HeavyTask(_BasicTask[_T], ABC):
     """
 	For tasks that require DB access and does some operations on blobs / database
 	"""
-    MAX_ONGOING_TASK = 1
+    MAX_ONGOING_TASK = 5
+
+    def __init__(self, source: Union[CommandSource, InfoCommandSource]):
+        super().__init__(source)
+        self.progress: Optional[ProgressReporter] = None
+        self.__resource_releaser: Optional[Callable[[], ContextManager]] = None
+
+    def get_resource_request(self) -> ResourceRequest:
+        """任务执行期间需要持有的资源，默认独占整个世界"""
+        return ResourceRequest.world()
+
+    def set_resource_releaser(self, releaser: Optional[Callable[[], ContextManager]]):
+        """由执行任务的 worker 在任务开始前设置，releaser() 返回在其中暂时释放任务资源的上下文管理器"""
+        self.__resource_releaser = releaser
+
+    def wait_confirm(self, confirm_target_text: Optional[Union[RTextBase, str]] = None,
+                     time_wait: Optional[Duration] = None) -> bool:
+        """等待确认期间不持有资源锁，其他重任务可以执行，确认后重新获取资源再继续"""
+        if self.__resource_releaser is None:
+            return super().wait_confirm(confirm_target_text, time_wait)
+        with self.__resource_releaser():
+            return super().wait_confirm(confirm_target_text, time_wait)
+
+    def create_progress(self, estimate: CostEstimate, history_speed: Optional[float] = None) -> ProgressReporter:
+        """以预估数据量为总量创建进度汇报器，按配置的间隔广播进度，同时供 status 指令查询"""
+        self.progress = ProgressReporter(
+            bytes_total=estimate.total_bytes,
+            regions_total=estimate.region_count,
+            interval=self.config.command.progress_interval.value,
+            on_report=lambda snapshot: self.broadcast(format_progress(snapshot)),
+            history_speed=history_speed
+        )
+        return self.progress
 
 
 class LightTask(_BasicTask[_T], ABC):
@@ -0,0 +1,31 @@
+from typing import List
+
+from mcdreforged.api.types import CommandSource
+from chunk_backup.task import Task
+from chunk_backup.task.basic_task import ImmediateTask, HeavyTask
+from chunk_backup.task.task_utils import format_progress
+
+
+class ShowStatusTask(ImmediateTask[None]):
+    def __init__(self, source: CommandSource, running: List[Task], queued: int):
+        super().__init__(source)
+        self.running = running
+        self.queued = queued
+
+    @property
+    def id(self) -> str:
+        return 'show_status'
+
+    def run(self) -> None:
+        if not self.running:
+            self.reply_tr('idle')
+
+        for task in self.running:
+            progress = task.progress if isinstance(task, HeavyTask) else None
+            if progress is None:
+                self.reply_tr('running_no_progress', name=task.get_name_text())
+            else:
+                self.reply_tr('running', name=task.get_name_text(), progress=format_progress(progress.snapshot()))
+
+        if self.queued > 0:
+            self.reply_tr('queued', self.queued)
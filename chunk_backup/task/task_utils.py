@@ -2,11 +2,13 @@ import enum
 from typing import Union, Optional
 from mcdreforged.api.types import CommandSource
 from mcdreforged.api.rtext import RTextBase
-from chunk_backup.utils.mcdr_utils import get_json_obj
+from chunk_backup.utils.mcdr_utils import get_json_obj, tr
 from chunk_backup.config.config import Config
 from chunk_backup.task import TaskEvent
-from chunk_backup.types.units import Duration
+from chunk_backup.types.cost_estimate import CostEstimate
+from chunk_backup.types.units import Duration, ByteCount
 from chunk_backup.utils.mcdr_utils import broadcast_message as broadcast
+from chunk_backup.utils.progress import ProgressSnapshot
 from chunk_backup.utils.waitable_value import WaitableValue
 
 
@@ -38,3 +40,33 @@ class ConfirmHelper:
             self.__confirm_result.set(ConfirmResult.cancelled)
         elif event == TaskEvent.operation_confirmed:
             self.__confirm_result.set(ConfirmResult.confirmed)
+
+
+def format_byte_count(size: Union[int, float]) -> str:
+    return ByteCount(size).auto_format().to_str().replace("i", "")
+
+
+def format_cost_estimate(estimate: CostEstimate) -> RTextBase:
+    """将预估结果格式化为一行提示，没有历史速度时不显示预计耗时"""
+    if estimate.duration is None:
+        return tr(
+            "other.ui.estimate_no_history", size=format_byte_count(estimate.total_bytes),
+            chunks=estimate.chunk_count, mcc=estimate.mcc_count
+        )
+    return tr(
+        "other.ui.estimate", size=format_byte_count(estimate.total_bytes),
+        chunks=estimate.chunk_count, mcc=estimate.mcc_count,
+        duration=Duration(round(estimate.duration, 1)).auto_str(ndigits=1)
+    )
+
+
+def format_progress(snapshot: ProgressSnapshot) -> RTextBase:
+    """将进度快照格式化为一行提示，无法预估剩余时间时不显示"""
+    kwargs = dict(
+        percent=round(snapshot.percent, 1),
+        done=format_byte_count(snapshot.bytes_done), total=format_byte_count(snapshot.bytes_total),
+        regions=snapshot.regions_done, regions_total=snapshot.regions_total
+    )
+    if snapshot.eta is None:
+        return tr("other.ui.progress_no_eta", **kwargs)
+    return tr("other.ui.progress", eta=Duration(round(snapshot.eta, 1)).auto_str(ndigits=1), **kwargs)
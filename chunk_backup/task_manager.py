@@ -1,10 +1,14 @@
 import contextlib
 import dataclasses
 import enum
+import functools
 import threading
+import time
 from concurrent import futures
-from typing import Optional, Callable, Any, TypeVar
+from typing import Optional, Callable, Any, TypeVar, Sequence, Dict, Tuple, List
 from chunk_backup.mcdr_globals import server
+from chunk_backup.config.config import Config
+from chunk_backup.resource_lock import ResourceLockManager, ResourceRequest
 from chunk_backup.utils import misc_utils
 from chunk_backup.task_queue import TaskQueue, TaskHolder, TaskCallback
 from chunk_backup.task import TaskEvent, Task
@@ -29,24 +33,51 @@ class _SendEventResult:
 
 
 class _TaskWorker:
-    def __init__(self, name: str, max_ongoing_task: int):
+    WAIT_TIME_REPORT_THRESHOLD = 3  # 排队超过该秒数时提示等待时间
+    REACQUIRE_INTERVAL = 0.5  # 暂时释放资源的任务重新获取资源的重试间隔（秒）
+
+    def __init__(self, name: str, max_ongoing_task: int, thread_count: int = 1, lock_manager: Optional[ResourceLockManager] = None):
         self.name = name
         self.logger = server.logger
         self.max_ongoing_task = max_ongoing_task
-        self.thread = threading.Thread(target=self.__task_loop, name=misc_utils.make_thread_name(f'worker-{name}'), daemon=True)
+        self.lock_manager = lock_manager
+        self.threads = [
+            threading.Thread(
+                target=self.__task_loop,
+                name=misc_utils.make_thread_name(f'worker-{name}' if thread_count == 1 else f'worker-{name}-{i + 1}'),
+                daemon=True
+            )
+            for i in range(max(1, thread_count))
+        ]
         self.stopped = False
-        self.task_queue: TaskQueue[Optional[TaskHolder]] = TaskQueue(max_ongoing_task)
+        self.task_queue: TaskQueue[Optional[TaskHolder]] = TaskQueue(max_ongoing_task, on_expired=self.__on_expired)
+        # 按 id(holder) 缓存等待中任务的资源请求，同时保存 holder 本身，避免 id 被新对象复用时取到旧的请求
+        self.__requests: Dict[int, Tuple[TaskHolder, ResourceRequest]] = {}
+        # 暂时释放资源后等待重新获取的请求，与其冲突的排队任务不会被选出
+        self.__reacquiring: List[ResourceRequest] = []
+        self.__reacquiring_lock = threading.Lock()
+
+    @property
+    def thread(self) -> threading.Thread:
+        return self.threads[0]
 
     def start(self):
-        self.thread.start()
+        for thread in self.threads:
+            thread.start()
 
     def shutdown(self):
         self.stopped = True
-        self.send_event_to_current_task(TaskEvent.plugin_unload)
-        self.task_queue.clear()
-        self.task_queue.put_direct(None)
-        if self.thread.is_alive():
-            self.thread.join(Duration('1h').value)
+        self.send_event_to_current_tasks(TaskEvent.plugin_unload)
+        for holder in self.task_queue.clear():
+            self.__pop_request(holder)
+        for _ in self.threads:
+            self.task_queue.put_direct(None)
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(Duration('1h').value)
+
+    def is_alive(self) -> bool:
+        return any(thread.is_alive() for thread in self.threads)
 
     @classmethod
     def run_task(cls, holder: TaskHolder):
@@ -60,28 +91,120 @@ class _TaskWorker:
 
             holder.on_done(ret, None)
 
+    def __get_request(self, holder: TaskHolder) -> ResourceRequest:
+        entry = self.__requests.get(id(holder))
+        if entry is None or entry[0] is not holder:
+            entry = self.__requests[id(holder)] = (holder, holder.task.get_resource_request())
+        return entry[1]
+
+    def __pop_request(self, holder: Optional[TaskHolder]) -> Optional[ResourceRequest]:
+        """移除任务的资源请求，任务离开队列（开始执行、被挤出、超时、被清除）时调用"""
+        if holder is None:
+            return None
+        entry = self.__requests.get(id(holder))
+        if entry is None or entry[0] is not holder:
+            return None
+        del self.__requests[id(holder)]
+        return entry[1]
+
+    def __pick(self, holders: Sequence[Optional[TaskHolder]]) -> int:
+        """在队列锁内调用，选出第一个资源可用的任务并为其获取资源"""
+        for i, holder in enumerate(holders):
+            if holder is None:
+                return i
+        with self.__reacquiring_lock:
+            reacquiring = list(self.__reacquiring)
+        return self.lock_manager.pick([self.__get_request(holder) for holder in holders], waiting=reacquiring)
+
+    @contextlib.contextmanager
+    def __release_during(self, request: ResourceRequest):
+        """
+        在上下文中暂时释放正在执行的任务持有的资源（如等待确认期间），退出时等待并重新获取。
+        等待重新获取期间与其冲突的排队任务不会被选出，只需等正在执行的任务完成
+        """
+        self.lock_manager.release(request)
+        self.task_queue.wake_up()
+        try:
+            yield
+        finally:
+            with self.__reacquiring_lock:
+                self.__reacquiring.append(request)
+            try:
+                while not self.lock_manager.try_acquire(request):
+                    time.sleep(self.REACQUIRE_INTERVAL)
+            finally:
+                with self.__reacquiring_lock:
+                    self.__reacquiring.remove(request)
+
     def __task_loop(self):
         self.logger.info('Worker %s started', self.name)
         while not self.stopped:
-            holder = self.task_queue.get()
+            holder = self.task_queue.get(self.__pick if self.lock_manager is not None else None)
             with contextlib.ExitStack() as exit_stack:
-                exit_stack.callback(self.task_queue.task_done)
+                exit_stack.callback(self.task_queue.task_done, holder)
+
+                if holder is not None and self.lock_manager is not None:
+                    # 先释放资源再标记任务完成，使等待中的任务能立即被选中
+                    request = self.__pop_request(holder)
+                    exit_stack.callback(self.lock_manager.release, request)
+                    holder.task.set_resource_releaser(functools.partial(self.__release_during, request))
 
                 if holder is None or self.stopped:
                     break
 
+                self.__report_wait_time(holder)
                 self.run_task(holder)
 
         self.logger.info('Worker %s stopped', self.name)
 
+    def __report_wait_time(self, holder: TaskHolder):
+        wait_time = self.task_queue.get_wait_time(holder)
+        if wait_time is None:
+            return
+        self.logger.debug('Task %s waited %.2fs in worker %s', holder.task.id, wait_time, self.name)
+        if wait_time >= self.WAIT_TIME_REPORT_THRESHOLD:
+            reply_message(holder.source, tr('task._base.waited', holder.task_name(), Duration(round(wait_time)).auto_str(ndigits=0)))
+
+    @staticmethod
+    def __cancel_holder(holder: TaskHolder, reason_key: str):
+        reply_message(holder.source, tr(reason_key, holder.task_name()))
+        holder.future.cancel()
+        if holder.callback is not None:
+            holder.callback(None, None)
+
+    def __on_expired(self, holder: Optional[TaskHolder]):
+        self.__pop_request(holder)
+        if holder is not None:
+            self.logger.info('Task %s missed its deadline in worker %s, skipped', holder.task.id, self.name)
+            self.__cancel_holder(holder, 'task._base.expired')
+
     def submit(self, task_holder: TaskHolder):
         source, callback = task_holder.source, task_holder.callback
-        if self.thread.is_alive():
+        if self.is_alive():
+            task = task_holder.task
             try:
-                self.task_queue.put(task_holder)
+                result = self.task_queue.put(
+                    task_holder, priority=task.get_priority(),
+                    deadline=task.get_deadline(), key=task.get_coalesce_key()
+                )
             except TaskQueue.TooManyOngoingTask:
                 current = self.task_queue.peek_first_unfinished_item()
                 reply_message(source, tr("task._many", tr(f"task.{current.task.id}.name").to_plain_text()))
+                return
+
+            if result.coalesced:
+                # 与排队中的相同任务合并，结果沿用已有任务
+                reply_message(source, tr('task._base.coalesced', task_holder.task_name()))
+                misc_utils.chain_future(result.item.future, task_holder.future)
+                if callback is not None:
+                    task_holder.future.add_done_callback(
+                        lambda f: callback(None, None) if f.cancelled() else callback(
+                            f.result() if f.exception() is None else None, f.exception()
+                        )
+                    )
+            elif result.evicted is not None:
+                self.__pop_request(result.evicted)
+                self.__cancel_holder(result.evicted, 'task._base.evicted')
         else:
             source.reply('worker thread is dead, please check logs to see what had happened')
             if callback is not None:
@@ -92,23 +215,42 @@ class _TaskWorker:
             task_checker: Optional[Callable[[TaskHolder], bool]] = None,
             pre_send_callback: Optional[Callable[[TaskHolder], Any]] = None,
     ) -> _SendEventResult:
-        task_holder = self.task_queue.peek_first_unfinished_item()
-        if task_holder not in (None, TaskQueue.NONE):
+        """
+        将事件发送给第一个通过 task_checker 检查的正在执行的任务，没有正在执行的任务时发送给队首任务。
+        所有候选任务都未通过检查时返回 failed，holder 为第一个候选任务。
+        """
+        holders = [h for h in self.task_queue.current_items() if h is not None]
+        if not holders:
+            task_holder = self.task_queue.peek_first_unfinished_item()
+            if task_holder in (None, TaskQueue.NONE):
+                return _SendEventResult(_SendEventStatus.missed, None)
+            holders = [task_holder]
+
+        for task_holder in holders:
             if task_checker is not None and not task_checker(task_holder):
-                return _SendEventResult(_SendEventStatus.failed, None)
+                continue
 
             if pre_send_callback is not None:
                 pre_send_callback(task_holder)
             task_holder.task.on_event(event)
             return _SendEventResult(_SendEventStatus.sent, task_holder)
-        else:
-            return _SendEventResult(_SendEventStatus.missed, None)
+        return _SendEventResult(_SendEventStatus.failed, holders[0])
+
+    def send_event_to_current_tasks(self, event: TaskEvent):
+        """将事件发送给所有正在执行的任务"""
+        for task_holder in self.task_queue.current_items():
+            if task_holder is not None:
+                task_holder.task.on_event(event)
 
 
 class TaskManager:
     def __init__(self):
         self.logger = server.logger
-        self.worker_heavy = _TaskWorker('heavy', HeavyTask.MAX_ONGOING_TASK)
+        self.lock_manager = ResourceLockManager()
+        self.worker_heavy = _TaskWorker(
+            'heavy', HeavyTask.MAX_ONGOING_TASK,
+            thread_count=Config.get().max_heavy_tasks, lock_manager=self.lock_manager
+        )
         self.worker_light = _TaskWorker('light', LightTask.MAX_ONGOING_TASK)
 
     def start(self):
@@ -138,18 +280,17 @@ class TaskManager:
         def pre_send(holder: TaskHolder):
             reply_message(source, tr('command.confirm.sent', holder.task_name()))
 
-        result = self.worker_heavy.send_event_to_current_task(TaskEvent.operation_confirmed, pre_send_callback=pre_send)
-        if result.status == _SendEventStatus.missed:
+        def is_waiting_confirm(holder: TaskHolder) -> bool:
+            return getattr(holder.task, 'is_waiting_confirm', False)
+
+        # 多个重任务同时执行时，确认发送给正在等待确认的任务
+        result = self.worker_heavy.send_event_to_current_task(TaskEvent.operation_confirmed, task_checker=is_waiting_confirm, pre_send_callback=pre_send)
+        if result.status != _SendEventStatus.sent:
             reply_message(source, tr('command.confirm.noop'))
 
     def do_abort(self, source: CommandSource):
         def check_abort_able(holder: TaskHolder) -> bool:
-
-            if not holder.task.is_abort_able():
-                reply_message(source, tr('command.abort.not_abort_able', holder.task_name()))
-                return False
-
-            return True
+            return holder.task.is_abort_able()
 
         def pre_send(holder: TaskHolder):
             reply_message(source, tr('command.abort.sent', holder.task_name()))
@@ -157,9 +298,24 @@ class TaskManager:
         result = self.worker_heavy.send_event_to_current_task(TaskEvent.operation_aborted, task_checker=check_abort_able, pre_send_callback=pre_send)
         if result.status == _SendEventStatus.missed:
             reply_message(source, tr('command.abort.noop'))
+        elif result.status == _SendEventStatus.failed:
+            reply_message(source, tr('command.abort.not_abort_able', result.holder.task_name()))
+
+    def try_acquire_resources(self, request: ResourceRequest) -> bool:
+        """供任务之外的后台操作（如完整性校验）获取重任务资源锁"""
+        return self.lock_manager.try_acquire(request)
+
+    def release_resources(self, request: ResourceRequest):
+        self.lock_manager.release(request)
+        # 等待该资源的重任务只会在队列变化时重新选择，需要主动唤醒
+        self.worker_heavy.task_queue.wake_up()
+
+    def is_heavy_busy(self) -> bool:
+        """是否有重任务正在执行或排队"""
+        return self.worker_heavy.task_queue.unfinished_size() > 0
 
     def on_world_saved(self):
-        self.worker_heavy.send_event_to_current_task(TaskEvent.world_save_done)
+        self.worker_heavy.send_event_to_current_tasks(TaskEvent.world_save_done)
 
     def on_server_stopped(self):
-        self.worker_heavy.send_event_to_current_task(TaskEvent.server_stopped)
+        self.worker_heavy.send_event_to_current_tasks(TaskEvent.server_stopped)
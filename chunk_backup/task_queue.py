@@ -1,10 +1,12 @@
-import collections
+import bisect
 import dataclasses
+import itertools
 import threading
+import time
 import traceback
 from concurrent import futures
 from chunk_backup.exceptions import ChunkBackupError, FatalError
-from typing import Generic, TypeVar, Deque, Union, TYPE_CHECKING, Callable, Optional, Any
+from typing import Generic, TypeVar, Union, TYPE_CHECKING, Callable, Optional, Any, List, Sequence, Dict, Hashable
 from chunk_backup.utils.mcdr_utils import tr, broadcast_message as broadcast
 from mcdreforged.api.types import CommandSource
 from mcdreforged.api.rtext import RTextBase
@@ -55,7 +57,29 @@ class TaskHolder(Generic[_T]):
             self.callback(ret, err)
 
 
+@dataclasses.dataclass
+class _QueueEntry(Generic[_T]):
+    item: _T
+    priority: int
+    seq: int
+    deadline: Optional[float]
+    key: Optional[Hashable]
+    enqueue_time: float
+
+    @property
+    def sort_key(self):
+        # 优先级高的在前，同优先级先进先出
+        return -self.priority, self.seq
+
+
 class TaskQueue(Generic[_T]):
+    """
+    按优先级排序的任务队列：
+    - 优先级高的任务先执行，同优先级按加入顺序执行
+    - 队列已满时，若新任务的优先级高于队列中优先级最低的等待任务，则将其挤出
+    - 带 key 的任务与队列中 key 相同的等待任务合并
+    - 超过 deadline 仍未开始的任务会被跳过
+    """
     class TooManyOngoingTask(ChunkBackupError):
         def __init__(self, current_item: _T):
             self.current_item: _T = current_item
@@ -65,46 +89,125 @@ class TaskQueue(Generic[_T]):
 
     NONE = _NoneItem()
 
-    def __init__(self, max_ongoing_task: int):
-        self.__queue: Deque[_T] = collections.deque()
+    @dataclasses.dataclass(frozen=True)
+    class PutResult(Generic[_T]):
+        item: _T                        # 实际在队列中的任务（合并时为已有任务）
+        coalesced: bool = False
+        evicted: Optional[_T] = None    # 被挤出队列的任务
+
+    def __init__(self, max_ongoing_task: int, on_expired: Optional[Callable[[_T], Any]] = None):
+        self.__queue: List[_QueueEntry[_T]] = []
         self.__unfinished_size = 0
         self.__lock = threading.Lock()
         self.__not_empty = threading.Condition(self.__lock)
         self.__semaphore = threading.Semaphore(max_ongoing_task)
-        self.__current_item = self.NONE
+        self.__current_items: List[_T] = []
+        self.__wait_times: Dict[int, float] = {}
+        self.__seq = itertools.count()
+        self.__on_expired = on_expired
 
-    def put(self, task: _T):
-        if self.__semaphore.acquire(blocking=False):
-            self.put_direct(task)
-        else:
-            raise self.TooManyOngoingTask(self.__current_item)
+    def __make_entry(self, task: _T, priority: int, deadline: Optional[float], key: Optional[Hashable]) -> _QueueEntry[_T]:
+        return _QueueEntry(task, priority, next(self.__seq), deadline, key, time.time())
+
+    def __insert(self, entry: _QueueEntry[_T]):
+        keys = [e.sort_key for e in self.__queue]
+        self.__queue.insert(bisect.bisect_right(keys, entry.sort_key), entry)
+        self.__unfinished_size += 1
+        self.__not_empty.notify_all()
 
-    def put_direct(self, task: _T):
+    def put(self, task: _T, priority: int = 0, deadline: Optional[float] = None, key: Optional[Hashable] = None) -> 'TaskQueue.PutResult[_T]':
         with self.__lock:
-            self.__queue.append(task)
-            self.__unfinished_size += 1
-            self.__not_empty.notify()
-
-    def get(self) -> _T:
-        with self.__not_empty:
-            while len(self.__queue) == 0:
-                self.__not_empty.wait()
-            self.__current_item = item = self.__queue.popleft()
-            return item
-
-    def task_done(self):
+            if key is not None:
+                for entry in self.__queue:
+                    if entry.key == key:
+                        return self.PutResult(entry.item, coalesced=True)
+
+            entry = self.__make_entry(task, priority, deadline, key)
+            if self.__semaphore.acquire(blocking=False):
+                self.__insert(entry)
+                return self.PutResult(task)
+
+            # 队列已满：挤出优先级最低、最晚加入的等待任务，由新任务沿用它占用的名额
+            if len(self.__queue) > 0 and self.__queue[-1].priority < priority:
+                evicted = self.__queue.pop()
+                self.__unfinished_size -= 1
+                self.__insert(entry)
+                return self.PutResult(task, evicted=evicted.item)
+
+            raise self.TooManyOngoingTask(self.__current_items[0] if self.__current_items else self.NONE)
+
+    def put_direct(self, task: _T, priority: int = 0):
+        with self.__lock:
+            self.__insert(self.__make_entry(task, priority, None, None))
+
+    def __drop_expired(self) -> List[_T]:
+        now = time.time()
+        expired = [e for e in self.__queue if e.deadline is not None and e.deadline < now]
+        if expired:
+            self.__queue = [e for e in self.__queue if e not in expired]
+            for _ in expired:
+                self.__semaphore.release()
+            self.__unfinished_size -= len(expired)
+        return [e.item for e in expired]
+
+    def get(self, pick: Optional[Callable[[Sequence[_T]], int]] = None) -> _T:
+        """
+        取出一个任务。pick 用于从当前队列（已按优先级排序）中选出可以执行的任务下标，返回 -1 表示暂时没有，
+        此时会一直等待到有新任务加入或有任务完成后再重新选择。
+        """
+        while True:
+            with self.__not_empty:
+                expired = self.__drop_expired()
+                if not expired:
+                    if len(self.__queue) > 0:
+                        index = 0 if pick is None else pick([e.item for e in self.__queue])
+                        if index >= 0:
+                            entry = self.__queue.pop(index)
+                            self.__current_items.append(entry.item)
+                            self.__wait_times[id(entry.item)] = time.time() - entry.enqueue_time
+                            return entry.item
+                    self.__not_empty.wait(self.__next_deadline_timeout())
+            for item in expired:
+                if self.__on_expired is not None:
+                    self.__on_expired(item)
+
+    def __next_deadline_timeout(self) -> Optional[float]:
+        deadlines = [e.deadline for e in self.__queue if e.deadline is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.time())
+
+    def get_wait_time(self, item: _T) -> Optional[float]:
+        """返回正在执行的任务在队列中等待的秒数"""
+        with self.__lock:
+            return self.__wait_times.get(id(item))
+
+    def task_done(self, item: _T):
         with self.__lock:
             self.__semaphore.release()
             self.__unfinished_size -= 1
-            self.__current_item = self.NONE
+            self.__wait_times.pop(id(item), None)
+            for i, current in enumerate(self.__current_items):
+                if current is item:
+                    del self.__current_items[i]
+                    break
+            # 任务完成后释放了资源，唤醒等待中的线程重新选择任务
+            self.__not_empty.notify_all()
+
+    def wake_up(self):
+        """资源在任务之外被释放时调用，唤醒等待中的线程重新选择任务"""
+        with self.__lock:
+            self.__not_empty.notify_all()
 
-    def clear(self):
+    def clear(self) -> List[_T]:
+        """清空等待中的任务，返回被清除的任务"""
         with self.__lock:
-            n = len(self.__queue)
+            items = [e.item for e in self.__queue]
             self.__queue.clear()
-            for _ in range(n):
+            for _ in items:
                 self.__semaphore.release()
-            self.__unfinished_size -= n
+            self.__unfinished_size -= len(items)
+            return items
 
     def qsize(self) -> int:
         with self.__lock:
@@ -112,10 +215,10 @@ class TaskQueue(Generic[_T]):
 
     def peek_first_unfinished_item(self) -> Union[_T, _NoneItem]:
         with self.__lock:
-            if self.__current_item is not self.NONE:
-                return self.__current_item
+            if len(self.__current_items) > 0:
+                return self.__current_items[0]
             if len(self.__queue) > 0:
-                return self.__queue[0]
+                return self.__queue[0].item
             else:
                 return self.NONE
 
@@ -126,4 +229,8 @@ class TaskQueue(Generic[_T]):
     @property
     def current_item(self) -> Union[_T, _NoneItem]:
         with self.__lock:
-            return self.__current_item
+            return self.__current_items[0] if len(self.__current_items) > 0 else self.NONE
+
+    def current_items(self) -> List[_T]:
+        with self.__lock:
+            return list(self.__current_items)
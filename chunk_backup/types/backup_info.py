@@ -36,8 +36,14 @@ class BackupInfo(Serializable):
     bottom_left: Optional[dict[str, int]] = None
     bottom_right: Optional[dict[str, int]] = None
 
+    # 圆形/多边形选区的形状，矩形选区为 None
+    shape: Optional[dict] = None
+
     uuid_dict: Optional[dict] = None
 
+    # 玩家数据清单 uuid → {相对路径: 哈希}，文件本体在 PlayerDataStore 中；旧版槽位没有该字段
+    player_files: Optional[dict[str, dict[str, str]]] = None
+
     sub_backup: Optional[dict[str, "SubBackupInfo"]] = None
 
     # ===== runtime (不会写入json) =====
@@ -120,6 +126,7 @@ class BackupInfo(Serializable):
                 "top_right",
                 "bottom_left",
                 "bottom_right",
+                "shape",
                 "sub_backup"
             )
 
@@ -139,7 +146,8 @@ class BackupInfo(Serializable):
                 "top_left",
                 "top_right",
                 "bottom_left",
-                "bottom_right"
+                "bottom_right",
+                "shape"
             )
 
     def get_type_key(self):
@@ -148,7 +156,7 @@ class BackupInfo(Serializable):
                     "minecraft_version", "total_size", "uuid_dict"]
         elif self.type == "chunk":
             return ["type", "operator", "date", "dimension", "comment", "command", "player_position", "top_left",
-                    "top_right", "bottom_left", "bottom_right", "version_created", "minecraft_version", "total_size", "uuid_dict"]
+                    "top_right", "bottom_left", "bottom_right", "shape", "version_created", "minecraft_version", "total_size", "uuid_dict"]
         elif self.type == "custom":
             return ["type", "operator", "date", "dimension", "name", "comment", "command", "sub_backup",
                     "version_created", "minecraft_version", "total_size"]
@@ -164,6 +172,12 @@ class BackupInfo(Serializable):
         if data.get("uuid_dict") is None:
             data.pop("uuid_dict", None)
 
+        if data.get("player_files") is None:
+            data.pop("player_files", None)
+
+        if data.get("shape") is None:
+            data.pop("shape", None)
+
         sub = data.get("sub_backup")
 
         if isinstance(sub, dict):
@@ -173,6 +187,9 @@ class BackupInfo(Serializable):
                 if v.get("player_position") is None:
                     v.pop("player_position", None)
 
+                if v.get("shape") is None:
+                    v.pop("shape", None)
+
     # -------------------------------------------------
 
     @staticmethod
@@ -201,6 +218,8 @@ class SubBackupInfo(Serializable):
     bottom_left: Optional[dict[str, int]] = None
     bottom_right: Optional[dict[str, int]] = None
 
+    shape: Optional[dict] = None
+
     # -------------------------------------------------
 
     def serialize(self) -> dict:
@@ -216,7 +235,8 @@ class SubBackupInfo(Serializable):
                 "top_left",
                 "top_right",
                 "bottom_left",
-                "bottom_right"
+                "bottom_right",
+                "shape"
             ]:
                 data.pop(key, None)
 
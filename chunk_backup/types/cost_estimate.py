@@ -0,0 +1,20 @@
+from typing import Optional
+
+from mcdreforged.api.utils import Serializable
+
+
+class CostEstimate(Serializable):
+    """
+    只读取区域文件头得到的开销预估
+    """
+    total_bytes: int = 0
+    chunk_count: int = 0   # 非空区块数
+    mcc_count: int = 0     # 外部区块文件 (.mcc) 数
+    region_count: int = 0  # 需要处理的区域文件数
+    duration: Optional[float] = None  # 预计耗时（秒），没有历史速度时为 None
+
+    def add(self, total_bytes: int, chunk_count: int, mcc_count: int, region_count: int = 0):
+        self.total_bytes += total_bytes
+        self.chunk_count += chunk_count
+        self.mcc_count += mcc_count
+        self.region_count += region_count
@@ -41,9 +41,11 @@ class Point2D:
         else:
             return NotImplemented
 
-    def to_chunk_selector(self, radius, max_chunk_size=None, ignore_size_limit=False):
-        """通过中心点和半径创建 ChunkSelector 对象"""
+    def to_chunk_selector(self, radius, max_chunk_size=None, ignore_size_limit=False, circle=False):
+        """通过中心点和半径创建 ChunkSelector 对象，circle 为 True 时创建圆形选区"""
         max_chunk_size = max_chunk_size if max_chunk_size else Config.get().backup.max_chunk_length
+        if circle:
+            return chunk.from_circle(self, radius, max_chunk_size=max_chunk_size, ignore_size_limit=ignore_size_limit)
         return chunk(self, radius=radius, max_chunk_size=max_chunk_size, ignore_size_limit=ignore_size_limit)
 
 
@@ -1,12 +1,18 @@
+import json
 import re
 import shutil
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from mcdreforged.api.types import CommandSource
 from chunk_backup.exceptions import StaticMore, DynamicMore
 from chunk_backup.config.config import Config
 from chunk_backup.mcdr_globals import server
 from chunk_backup.utils.mcdr_utils import reply_message as reply, tr
+from chunk_backup.utils import io_utils
+from chunk_backup.utils.player_store import PlayerDataStore
 
 
 class DimensionChecker:
@@ -143,6 +149,7 @@ class DimensionChecker:
 class BackupFolderManager:
     # 预编译正则，避免重复编译
     _slot_pattern = re.compile(r'^slot([1-9]\d*)$')
+    TRASH_FOLDER = ".trash"
 
     def __init__(self, is_static=False):
         self.config = Config.get()
@@ -204,11 +211,27 @@ class BackupFolderManager:
         self._rename_to_temp(items, storage_path)
         self._rename_from_temp(items, storage_path, start_from)
 
+    def move_to_trash(self, path: Path):
+        """
+        先将目录原子地重命名到回收站再删除，删除中途失败也不会在存储目录中留下不完整的槽位。
+        回收站中残留的目录会在下次调用时一并清理。
+        槽位轮换会频繁调用，这里不清理玩家数据仓库（需扫描所有槽位），由删除任务与后台校验线程定期清理。
+        """
+        path = Path(path)
+        trash = self.storage_root / self.TRASH_FOLDER
+        trash.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            path.rename(trash / f"{path.name}_{time.time_ns()}")
+        for item in trash.iterdir():
+            if item.is_dir():
+                shutil.rmtree(item, ignore_errors=True)
+            else:
+                item.unlink(missing_ok=True)
+
     def remove_slot(self, path: Path = None):
         if not path:
-            shutil.rmtree(self.storage_root / self.region_storage / "slot1", ignore_errors=True)
-            return
-        shutil.rmtree(Path, ignore_errors=True)
+            path = self.storage_root / self.region_storage / "slot1"
+        self.move_to_trash(path)
 
     def organize_region_folder(self, only_sort=False, is_overwrite=False):
         """
@@ -224,7 +247,7 @@ class BackupFolderManager:
         if is_overwrite:
             overwrite_storage = self.storage_root / self.config.overwrite_storage
             if overwrite_storage.exists():
-                shutil.rmtree(overwrite_storage)
+                self.move_to_trash(overwrite_storage)
 
             overwrite_storage.mkdir(parents=True)
             return
@@ -257,7 +280,7 @@ class BackupFolderManager:
                 # 动态备份：删除最大槽位（列表最后一项）
                 max_num, max_name = items[-1]
                 max_slot_path = _region_storage / max_name
-                shutil.rmtree(max_slot_path)
+                self.move_to_trash(max_slot_path)
                 to_keep = items[:-1]  # 移除最后一项
 
         # 情况3：当前数量大于上限
@@ -344,6 +367,13 @@ class BackupFolderManager:
 
 
 class PlayerDataFolderManager:
+    """
+    玩家数据备份与恢复。
+    新备份保存到内容寻址的 PlayerDataStore，返回的清单由调用方写入槽位 info.json 的 player_files；
+    没有清单的旧槽位仍从槽位内的 players/ 文件夹恢复。
+    """
+    BATCH_SIZE = 32  # 按目录分批并行处理，每批文件数
+
     def __init__(self, uuid: Union[str, list], is_static=None):
         self.config = Config.get()
         self.uuid = uuid if isinstance(uuid, list) else [uuid]
@@ -352,73 +382,147 @@ class PlayerDataFolderManager:
         self.server_root = Path(self.config.server_root)
         self.storage_root = Path(self.config.storage_root)
         self.region_storage = Path(self.config.dynamic_storage) if not self.is_static else Path(self.config.static_storage)
+        self.store = PlayerDataStore()
 
-    def _get_backup_root(self, is_overwrite: bool = False) -> Path:
+    def _get_slot_root(self, is_overwrite: bool = False) -> Path:
         """
-        获取玩家数据备份的根目录。
+        获取槽位目录。
         如果 is_overwrite=True，则使用 overwrite 槽位，否则使用常规槽位（动态/静态）。
         """
         if is_overwrite:
-            return self.storage_root / self.config.overwrite_storage / "players"
+            return self.storage_root / self.config.overwrite_storage
         else:
-            return self.storage_root / self.region_storage / self.backup_slot / "players"
+            return self.storage_root / self.region_storage / self.backup_slot
+
+    def _get_backup_root(self, is_overwrite: bool = False) -> Path:
+        """获取旧版槽位内玩家数据文件夹"""
+        return self._get_slot_root(is_overwrite) / "players"
+
+    def _read_manifest(self, is_overwrite: bool = False) -> Optional[Dict[str, Dict[str, str]]]:
+        """读取槽位 info.json 中的玩家数据清单，旧版槽位或读取失败时返回 None"""
+        try:
+            with open(self._get_slot_root(is_overwrite) / "info.json", 'r', encoding='utf-8') as f:
+                return json.load(f).get(PlayerDataStore.MANIFEST_KEY)
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _get_max_workers(self) -> int:
+        try:
+            return self.config.max_workers if self.config.max_workers > 0 else 4
+        except Exception:
+            return 4
+
+    def _collect_files(self, src_root: Path, missing_key: str) -> List[Tuple[str, str]]:
+        """列出选中玩家在 uuid × 扩展名 × 文件夹 下存在的 (uuid, 相对路径)，源文件不存在时只输出警告"""
+        files = []
+        for uuid in self.uuid:
+            for ext, folders in self.config.backup.player_data.items():
+                for folder in folders:
+                    rel = f"{folder}/{uuid}{ext}"
+                    if (src_root / rel).exists():
+                        files.append((uuid, rel))
+                    else:
+                        server.logger.warning(tr(missing_key, uuid=uuid, path=str(src_root / rel)))
+        return files
+
+    def _run_batches(self, items: list, get_dir: Callable[[Any], Any], handle: Callable[[list], Tuple[int, int]]) -> Tuple[int, int]:
+        """
+        按 get_dir 给出的目录分组，每组切成不超过 BATCH_SIZE 的批次并行交给 handle 处理。
+        handle 返回 (复制数, 去重数)，汇总后返回；任一批次出错时抛出异常，由调用方处理。
+        """
+        by_dir = defaultdict(list)
+        for item in items:
+            by_dir[get_dir(item)].append(item)
 
-    def _ensure_backup_structure(self, backup_root: Path):
-        """确保备份目录存在"""
-        backup_root.mkdir(parents=True, exist_ok=True)
+        batches = []
+        for group in by_dir.values():
+            for i in range(0, len(group), self.BATCH_SIZE):
+                batches.append(group[i:i + self.BATCH_SIZE])
+        if not batches:
+            return 0, 0
 
-    def backup_player_data(self, is_overwrite: bool = False):
+        copied = deduplicated = 0
+        with ThreadPoolExecutor(max_workers=min(self._get_max_workers(), len(batches)), initializer=io_utils.lower_thread_priority) as executor:
+            for future in as_completed([executor.submit(handle, batch) for batch in batches]):
+                c, d = future.result()
+                copied += c
+                deduplicated += d
+        return copied, deduplicated
+
+    def backup_player_data(self, is_overwrite: bool = False) -> Dict[str, Dict[str, str]]:
         """
-        将世界文件夹中指定 UUID 的玩家数据备份到备份槽位。
+        将世界文件夹中指定 UUID 的玩家数据存入玩家数据仓库，仓库中已有相同内容的文件不再写入。
         忽略不存在的文件，仅输出警告。
+        :return: uuid → {相对路径: 哈希} 清单，调用方需写入槽位 info.json 的 player_files
         """
         player_data_cfg = self.config.backup.player_data
         if not player_data_cfg:
             server.logger.warning("No player_data configuration found, skipping backup")
-            return
+            return {}
 
-        world_root = self.server_root
-        backup_root = self._get_backup_root(is_overwrite)
-        self._ensure_backup_structure(backup_root)
+        # 预先建好各玩家的字典，工作线程只写入各自文件对应的键
+        manifest: Dict[str, Dict[str, str]] = {uuid: {} for uuid in self.uuid}
 
-        for uuid in self.uuid:
-            for ext, folders in player_data_cfg.items():
-                for folder in folders:
-                    src = world_root / folder / f"{uuid}{ext}"
-                    if src.exists():
-                        dst = backup_root / folder / f"{uuid}{ext}"
-                        dst.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(src, dst)
-                        server.logger.debug(f"Backed up {src} -> {dst}")
-                    else:
-                        # 文件不存在，忽略并警告
-                        server.logger.warning(tr("other.warn.player_data_not_found", uuid=uuid, path=str(src)))
+        def put_batch(batch: List[Tuple[str, str]]) -> Tuple[int, int]:
+            written = 0
+            for uuid, rel in batch:
+                digest, is_new = self.store.put(self.server_root / rel)
+                manifest[uuid][rel] = digest
+                written += is_new
+            return written, len(batch) - written
+
+        files = self._collect_files(self.server_root, "other.player_data.not_found")
+        copied, deduplicated = self._run_batches(files, lambda item: Path(item[1]).parent, put_batch)
+        server.logger.info(tr("other.player_data.backup_done", copied=copied, deduplicated=deduplicated).to_plain_text())
+        return {uuid: files for uuid, files in manifest.items() if files}
 
-    def restore_player_data(self, is_overwrite: bool = False):
+    def restore_player_data(self, is_overwrite: bool = False) -> Tuple[int, int]:
         """
-        从备份槽位将指定 UUID 的玩家数据恢复到世界文件夹。
+        将槽位中指定 UUID 的玩家数据恢复到世界文件夹，世界中已与备份内容相同的文件不再写入。
+        有清单的槽位从玩家数据仓库恢复，旧版槽位从槽位内的 players/ 文件夹恢复。
         忽略不存在的文件，仅输出警告。
+        :return: (复制数, 去重数)
         """
         player_data_cfg = self.config.backup.player_data
         if not player_data_cfg:
             server.logger.warning("No player_data configuration found, skipping restore")
-            return
+            return 0, 0
 
-        world_root = self.server_root
-        backup_root = self._get_backup_root(is_overwrite)
+        manifest = self._read_manifest(is_overwrite)
+        if manifest is not None:
+            files = [(rel, digest) for uuid in self.uuid for rel, digest in manifest.get(uuid, {}).items()]
 
-        if not backup_root.exists():
-            server.logger.warning(f"Backup root not found: {backup_root}")
-            return
+            def get_batch(batch: List[Tuple[str, str]]) -> Tuple[int, int]:
+                written = 0
+                for rel, digest in batch:
+                    dst = self.server_root / rel
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    written += self.store.get(digest, dst)
+                return written, len(batch) - written
 
-        for uuid in self.uuid:
-            for ext, folders in player_data_cfg.items():
-                for folder in folders:
-                    src = backup_root / folder / f"{uuid}{ext}"
-                    if src.exists():
-                        dst = world_root / folder / f"{uuid}{ext}"
-                        dst.parent.mkdir(parents=True, exist_ok=True)
-                        shutil.copy2(src, dst)
-                        server.logger.debug(f"Restored {src} -> {dst}")
-                    else:
-                        server.logger.warning(tr("task.backup_restore.player_data_not_found_backup", uuid=uuid, path=str(src)))
+            copied, deduplicated = self._run_batches(files, lambda item: Path(item[0]).parent, get_batch)
+        else:
+            backup_root = self._get_backup_root(is_overwrite)
+            if not backup_root.exists():
+                server.logger.warning(f"Backup root not found: {backup_root}")
+                return 0, 0
+
+            def copy_batch(batch: List[Tuple[str, str]]) -> Tuple[int, int]:
+                written = 0
+                for _, rel in batch:
+                    src, dst = backup_root / rel, self.server_root / rel
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    try:
+                        if PlayerDataStore.file_digest(src) == PlayerDataStore.file_digest(dst):
+                            continue
+                    except FileNotFoundError:
+                        pass
+                    shutil.copy2(src, dst)
+                    written += 1
+                return written, len(batch) - written
+
+            files = self._collect_files(backup_root, "task.restore_backup.player_data_not_found")
+            copied, deduplicated = self._run_batches(files, lambda item: Path(item[1]).parent, copy_batch)
+
+        server.logger.info(tr("other.player_data.restore_done", copied=copied, deduplicated=deduplicated).to_plain_text())
+        return copied, deduplicated
@@ -0,0 +1,121 @@
+import dataclasses
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from chunk_backup.utils import io_utils
+
+
+class Checksum:
+    """
+    备份文件校验和（blake2b 十六进制摘要），在复制的同一次读取中计算。
+    区域文件夹的 index.json 中：
+    - files：相对该文件夹的路径 → 文件摘要
+    - chunks：区域文件名 → {"x,z": 区块压缩数据摘要}，只有按区块导出的区域文件才有，用于定位损坏的区块
+    旧版本生成的 index.json 没有这两项，无法校验。
+    """
+    ALGORITHM = "blake2b"
+    BLOCK_SIZE = 1024 * 1024
+    INDEX_FILE = "index.json"
+
+    @staticmethod
+    def hasher():
+        return hashlib.blake2b()
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.blake2b(data).hexdigest()
+
+    @classmethod
+    def copy_file(cls, src, dst) -> str:
+        """同 io_utils.copy_file 复制文件及其元数据（受读取限速），返回复制内容的摘要"""
+        hasher = hashlib.blake2b()
+        io_utils.copy_file(src, dst, hasher=hasher, block_size=cls.BLOCK_SIZE)
+        return hasher.hexdigest()
+
+    @classmethod
+    def file_digest(cls, path, on_read: Optional[Callable[[int], None]] = None) -> str:
+        """计算文件摘要，on_read 在每读取一块后以读取的字节数调用（用于限速）"""
+        hasher = hashlib.blake2b()
+        with open(path, 'rb') as f:
+            while block := f.read(cls.BLOCK_SIZE):
+                hasher.update(block)
+                if on_read is not None:
+                    on_read(len(block))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def relative(path, root) -> str:
+        return Path(os.path.relpath(path, root)).as_posix()
+
+    @classmethod
+    def update_index(cls, folder, changes: Dict[str, Optional[str]]):
+        """
+        按 changes（文件绝对路径 → 新摘要，None 表示文件已删除）更新文件夹 index.json 中的 files。
+        index.json 不存在或没有 files（旧版本备份）时不做处理。
+        """
+        index_path = Path(folder) / cls.INDEX_FILE
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        files = index.get("files")
+        if not isinstance(files, dict) or not changes:
+            return
+        for path, digest in changes.items():
+            rel = cls.relative(path, folder)
+            if digest is None:
+                files.pop(rel, None)
+            else:
+                files[rel] = digest
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+
+
+@dataclasses.dataclass
+class ScrubResult:
+    """
+    一次槽位校验的结果，保存在槽位目录的 scrub.json 中。
+    backup_date 记录被校验的备份日期，与槽位当前 info.json 不一致时结果作废。
+    """
+    backup_date: str
+    time: str
+    checked: int = 0                                                         # 校验的文件数
+    bad_files: Dict[str, str] = dataclasses.field(default_factory=dict)      # 相对槽位的路径 → missing / mismatch
+    bad_chunks: Dict[str, List[str]] = dataclasses.field(default_factory=dict)  # 相对槽位的区域文件路径 → 损坏的区块坐标
+    unverifiable: int = 0                                                    # 没有校验和（旧版本备份）的区域文件夹数
+
+    FILE_NAME = "scrub.json"
+    DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+    @property
+    def ok(self) -> bool:
+        return not self.bad_files
+
+    @property
+    def timestamp(self) -> float:
+        try:
+            return time.mktime(time.strptime(self.time, self.DATE_FORMAT))
+        except ValueError:
+            return 0.0
+
+    @classmethod
+    def load(cls, slot: Path, backup_date: Optional[str] = None) -> Optional['ScrubResult']:
+        """读取槽位的校验结果，不存在、无法读取或不属于槽位当前备份（backup_date 不同）时返回 None"""
+        try:
+            with open(slot / cls.FILE_NAME, 'r', encoding='utf-8') as f:
+                result = cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        if backup_date is not None and result.backup_date != backup_date:
+            return None
+        return result
+
+    def save(self, slot: Path):
+        tmp = slot / (self.FILE_NAME + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(dataclasses.asdict(self), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, slot / self.FILE_NAME)
@@ -0,0 +1,286 @@
+import errno
+import os
+import platform
+import shutil
+import threading
+import time
+from typing import Optional
+from chunk_backup.config.config import Config
+
+
+class IoLimiter:
+    """
+    备份、回档共享的读写速度限制（令牌桶），所有复制、读取、写入区域文件的路径都经过同一个实例，
+    读取与写入的字节都计入（复制一个文件按读写各计一次），多个线程合计不超过上限。
+    限速模式见 IoLimitConfig.mode，配置在每次取令牌时读取，重载配置后立即生效。
+    令牌不足时先记账再等待，一次读取较大的数据块也只会让之后的读取相应地多等待，而不会被拒绝。
+    """
+    BURST_SEC = 0.5             # 桶容量：空闲后允许以不限速的方式读取的数据量（秒）
+    RUNNING_CHECK_INTERVAL = 1.0  # adaptive 模式下查询服务器运行状态的间隔（秒）
+
+    __instance: Optional['IoLimiter'] = None
+    __instance_lock = threading.Lock()
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__tokens = 0.0
+        self.__last = time.monotonic()
+        self.__running = True
+        self.__running_checked = 0.0
+        self.__share = 1
+
+    @classmethod
+    def get(cls) -> 'IoLimiter':
+        with cls.__instance_lock:
+            if cls.__instance is None:
+                cls.__instance = cls()
+            return cls.__instance
+
+    @classmethod
+    def init_worker(cls, share: int, server_running: bool):
+        """
+        进程池 worker 的初始化：替换从父进程复制来的实例（其锁可能在 fork 时正被其他线程持有），
+        速度上限由 share 个 worker 均分，服务器运行状态固定为父进程创建进程池时的状态
+        """
+        limiter = cls()
+        limiter.__share = max(share, 1)
+        limiter.__running, limiter.__running_checked = server_running, float('inf')
+        cls.__instance_lock = threading.Lock()
+        cls.__instance = limiter
+
+    def server_running(self) -> bool:
+        """服务器是否在运行，结果缓存 RUNNING_CHECK_INTERVAL 秒"""
+        with self.__lock:
+            return self.__server_running(time.monotonic())
+
+    def __server_running(self, now: float) -> bool:
+        if now - self.__running_checked >= self.RUNNING_CHECK_INTERVAL:
+            from chunk_backup.mcdr_globals import server
+            self.__running = server.is_server_running()
+            self.__running_checked = now
+        return self.__running
+
+    def current_rate(self) -> Optional[float]:
+        """当前的速度上限（字节/秒），不限速时返回 None"""
+        config = Config.get().io_limit
+        if config.rate <= 0:
+            return None
+        if config.mode == 'fixed':
+            return config.rate * 1024 * 1024 / self.__share
+        if config.mode == 'adaptive':
+            return config.rate * 1024 * 1024 / self.__share if self.server_running() else None
+        return None
+
+    def consume(self, size: int):
+        """读取或写入 size 字节前调用，超出速度上限时阻塞到可以读写为止"""
+        if size <= 0 or (rate := self.current_rate()) is None:
+            return
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__tokens + (now - self.__last) * rate, rate * self.BURST_SEC)
+            self.__last = now
+            self.__tokens -= size
+            wait = -self.__tokens / rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+# ================================== 后台优先级 ==================================
+
+BACKGROUND_NICE = 10
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_SET_SYSCALL = {  # ioprio_set 的系统调用号，glibc 没有提供封装
+    'x86_64': 251, 'amd64': 251,
+    'i386': 289, 'i686': 289,
+    'aarch64': 30, 'arm64': 30,
+    'armv7l': 314, 'armv6l': 314,
+}
+
+
+def background_io() -> bool:
+    """当前的读写是否应让位于服务端：io_limit.background 开启且服务器正在运行"""
+    return Config.get().io_limit.background and IoLimiter.get().server_running()
+
+
+def _set_idle_io_class(tid: int):
+    syscall_nr = IOPRIO_SET_SYSCALL.get(platform.machine().lower())
+    if syscall_nr is None:
+        return
+    import ctypes
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.syscall(syscall_nr, IOPRIO_WHO_PROCESS, tid, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT)
+    except (OSError, AttributeError):
+        pass
+
+
+def lower_thread_priority(always: bool = False):
+    """
+    将当前线程设为 idle I/O 调度类并调高 nice 值，用作 ThreadPoolExecutor 的 initializer。
+    只在 Linux 上生效（两者在 Linux 上都可以按线程设置）；always 为 False 时只在 background_io() 为真时生效。
+    idle I/O 调度类只有 BFQ/CFQ 调度器支持，其他调度器下只有 nice 值生效。
+    """
+    if platform.system() != 'Linux' or not (always or background_io()):
+        return
+    tid = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, max(os.getpriority(os.PRIO_PROCESS, tid), BACKGROUND_NICE))
+    except OSError:
+        pass
+    _set_idle_io_class(tid)
+
+
+# ================================== 页缓存 ==================================
+
+def advise_sequential(file):
+    """提示内核将顺序读取该文件（加大预读）"""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+
+def drop_cache(file, written: bool = False):
+    """
+    读写完成后将文件移出页缓存，避免备份数据挤掉服务端常用的缓存。
+    written 为 True 时不等待落盘：POSIX_FADV_DONTNEED 对脏页只发起异步写回，已干净的页立即丢弃，
+    其余的页由整个目录写完后的 drop_tree_cache 统一丢弃
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        if written:
+            file.flush()
+        os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+
+
+def _syncfs(path: str):
+    """等待 path 所在文件系统的脏页写回（Linux syncfs），不支持时什么也不做"""
+    if platform.system() != 'Linux':
+        return
+    import ctypes
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.syncfs(fd)
+    except (OSError, AttributeError):
+        pass
+    finally:
+        os.close(fd)
+
+
+def drop_tree_cache(root: str):
+    """
+    目录写完后调用：整个文件系统只写回一次，再将目录下的文件移出页缓存。
+    只在 background_io() 为真时生效，与 drop_cache(written=True) 配合使用
+    """
+    if not hasattr(os, 'posix_fadvise') or not os.path.isdir(root) or not background_io():
+        return
+    _syncfs(root)
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            try:
+                fd = os.open(os.path.join(dirpath, name), os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+
+# ================================== 复制 ==================================
+
+def _data_segments(fd: int, size: int):
+    """
+    用 SEEK_DATA/SEEK_HOLE 列出文件中有数据的区段 [(起始, 结束)]，文件系统不支持时返回 None。
+    空洞在读取时全为零，复制时跳过即可保持目标文件稀疏
+    """
+    if not hasattr(os, 'SEEK_DATA'):
+        return None
+    segments = []
+    offset = 0
+    try:
+        while offset < size:
+            try:
+                start = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:  # 之后全是空洞
+                    break
+                raise
+            end = os.lseek(fd, start, os.SEEK_HOLE)
+            segments.append((start, end))
+            offset = end
+    except OSError:
+        return None
+    finally:
+        os.lseek(fd, 0, os.SEEK_SET)
+    return segments
+
+
+def _hash_zeros(hasher, length: int, block_size: int):
+    zeros = bytes(min(length, block_size))
+    while length > 0:
+        n = min(length, block_size)
+        hasher.update(zeros[:n])
+        length -= n
+
+
+def copy_file(src, dst, hasher=None, block_size: int = 1024 * 1024):
+    """
+    同 shutil.copy2 复制文件及其元数据，按块读写并经过 IoLimiter 限速。
+    hasher 不为 None 时以复制的内容更新（用于在同一次读取中计算校验和，空洞按零计算）。
+    源文件是稀疏文件时只复制有数据的区段，目标文件保持稀疏。
+    background_io() 为真时顺序读取源文件，复制完成后将源文件与目标文件移出页缓存
+    """
+    limiter = IoLimiter.get()
+    background = background_io()
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        if background:
+            advise_sequential(fsrc)
+        st = os.fstat(fsrc.fileno())
+        # 已分配的块少于文件大小时才可能有空洞，普通文件不必逐段查询
+        segments = None
+        if getattr(st, 'st_blocks', None) is not None and st.st_blocks * 512 < st.st_size:
+            segments = _data_segments(fsrc.fileno(), st.st_size)
+        sparse = segments is not None
+        if not sparse:
+            segments = [(0, None)]
+        position = 0
+        for start, end in segments:
+            if start > position:
+                # 跳过空洞
+                if hasher is not None:
+                    _hash_zeros(hasher, start - position, block_size)
+                fsrc.seek(start)
+                fdst.seek(start)
+                position = start
+            while end is None or position < end:
+                block = fsrc.read(block_size if end is None else min(block_size, end - position))
+                if not block:
+                    break
+                limiter.consume(len(block))
+                if hasher is not None:
+                    hasher.update(block)
+                limiter.consume(len(block))
+                fdst.write(block)
+                position += len(block)
+        if sparse and position < st.st_size:
+            # 文件末尾的空洞
+            if hasher is not None:
+                _hash_zeros(hasher, st.st_size - position, block_size)
+            fdst.truncate(st.st_size)
+        if background:
+            drop_cache(fsrc)
+            drop_cache(fdst, written=True)
+    shutil.copystat(src, dst)
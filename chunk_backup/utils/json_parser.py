@@ -1,6 +1,6 @@
 import json
 import re
-from typing import Any, List, Optional, Union
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 from mcdreforged.api.rtext import RStyle, RClickAction, RColor, RText, RTextList
 from mcdreforged.minecraft.rtext.click_event import RClickSuggestCommand, RClickRunCommand, RClickOpenUrl
@@ -52,8 +52,26 @@ action_dict = {
 }
 
 
+class CompiledLine(NamedTuple):
+    """
+    预解析的一行消息。
+    kind: blank（空行）/ plain（纯文本）/ pairs（代码与文本段一一对应）/ single（数量不等，按 parse_single_line 的规则组合）
+    segments: (文本片段, 代码片段, 预解析的节点) 的元组。片段为字符串与参数序号交替组成的元组；
+    不含参数的代码在解析时即拆分为节点（代码片段为 None），含参数的代码需代入参数后再拆分（节点为 None）
+    """
+    kind: str
+    segments: Tuple[Tuple[tuple, Optional[tuple], Optional[tuple]], ...]
+    newline: bool
+
+
 class Message:
     INVISIBLE__prefix = '¶†'
+    SLOT_PATTERN = re.compile('\ue000(\\d+)\ue001')
+    # 参数中出现这些内容时代入后的解析结果会与模板不同：格式前缀、占位符字符、str.splitlines 认定的换行符
+    UNSAFE_ARG_PATTERN = re.compile('¶†|[\ue000\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+    TEMPLATE_CACHE_SIZE = 512
+
+    __template_cache: Dict[str, Tuple[CompiledLine, ...]] = {}
 
     @staticmethod
     def apply_styles(obj: RText, style_lst: list) -> None:
@@ -127,7 +145,21 @@ class Message:
             key, value = node.split("=", 1)
             key = key.strip()
             value = Message.parse_value(value)
+        except Exception as e:
+            raise MessageFormatException(f"Failed to parse action node '{node}': {str(e)}")
+        Message.apply_action(node, key, value, obj)
+
+    @staticmethod
+    def apply_action(node: str, key: str, value: Any, obj: RText) -> None:
+        """将已解析的动作应用到RText对象
 
+        Args:
+            node: 动作节点字符串，仅用于报错
+            key: 动作名
+            value: 经 parse_value 解析后的值
+            obj: RText对象
+        """
+        try:
             if key in action_dict:
                 # 创建对应的RClickEvent对象
                 if key in ["sc", "suggest_command"]:
@@ -254,7 +286,56 @@ class Message:
         if isinstance(text, RTextBase):
             text = text.to_plain_text()
 
-        obj_list = RTextList()
+        return cls.render(cls.compile(text, _prefix))
+
+    # ================================== 模板缓存 ==================================
+
+    @classmethod
+    def get_json_str_from_template(cls, translate: Callable[..., RTextBase], *args, **kwargs) -> RTextList:
+        """
+        解析 translate(*args, **kwargs) 得到的文本，结果与 get_json_str 相同。
+        先以占位符代替参数取得模板文本，模板的解析结果按模板文本缓存（语言或语言文件变化时模板文本随之变化），
+        之后只需把参数代入已解析的片段；参数文本会改变解析结果（含 ¶†、换行或为空白）时回退为完整解析。
+        """
+        values = []
+        for value in (*args, *kwargs.values()):
+            value = value.to_plain_text() if isinstance(value, RTextBase) else format(value)  # 与 str.format 一致
+            if not value.strip() or cls.UNSAFE_ARG_PATTERN.search(value):
+                return cls.get_json_str(translate(*args, **kwargs).to_plain_text())
+            values.append(value)
+
+        slots = [f'\ue000{i}\ue001' for i in range(len(values))]
+        template = translate(*slots[:len(args)], **dict(zip(kwargs, slots[len(args):]))).to_plain_text()
+        compiled = cls.__template_cache.get(template)
+        if compiled is None:
+            if len(cls.__template_cache) >= cls.TEMPLATE_CACHE_SIZE:
+                cls.__template_cache.clear()
+            compiled = cls.__template_cache[template] = cls.compile(template)
+        return cls.render(compiled, values)
+
+    @classmethod
+    def clear_template_cache(cls):
+        cls.__template_cache.clear()
+
+    @classmethod
+    def __split_slots(cls, text: str) -> tuple:
+        """将文本拆成字符串与参数序号交替的片段"""
+        if '\ue000' not in text:
+            return (text,)
+        return tuple(int(part) if i % 2 else part for i, part in enumerate(cls.SLOT_PATTERN.split(text)) if i % 2 or part)
+
+    @staticmethod
+    def __fill(parts: tuple, values: Sequence[str]) -> str:
+        if len(parts) == 1 and isinstance(parts[0], str):
+            return parts[0]
+        return ''.join(values[p] if isinstance(p, int) else p for p in parts)
+
+    # ================================== 解析与渲染 ==================================
+
+    @classmethod
+    def compile(cls, text: str, _prefix: str = INVISIBLE__prefix) -> Tuple[CompiledLine, ...]:
+        """将文本逐行解析为 CompiledLine，解析规则与原先的 get_json_str 相同"""
+        compiled = []
         lines = text.splitlines(keepends=True)  # 保持换行符
 
         for line in lines:
@@ -265,7 +346,7 @@ class Message:
             if not line.strip():
                 # 空行
                 if has_newline:
-                    obj_list.append(RText("\n"))
+                    compiled.append(CompiledLine("blank", (), True))
                 continue
 
             # 替换真正的换行符为占位符，防止正则表达式问题
@@ -284,36 +365,85 @@ class Message:
 
             if len(code) == 0:
                 # 纯文本行
-                obj = RText(line)
-                if has_newline:
-                    obj = obj + "\n"
-                obj_list.append(obj)
-            elif len(text_segments) == len(code):
-                # 代码和文本段数量相等
-                for i, (code_line, text_line) in enumerate(zip(code, text_segments)):
-                    obj = RText(text_line)
-
-                    # 处理代码
-                    if code_line:
-                        for node in code_line.split("<>"):
-                            node = node.strip()
-                            if not node:
-                                continue
-
-                            if node in color_and_style_dict:
-                                cls.apply_color_and_style_dict(node, obj, )
-                            elif "=" in node:
-                                cls.apply_action_dict(node, obj, )
-
-                    # 如果是最后一个且需要换行
-                    if i == len(code) - 1 and has_newline:
-                        obj = obj + "\n"
+                compiled.append(CompiledLine("plain", ((cls.__split_slots(line), None, None),), has_newline))
+                continue
+
+            # 代码和文本段数量相等时一一对应，否则按 parse_single_line 的规则组合
+            kind = "pairs" if len(text_segments) == len(code) else "single"
+            segments = []
+            for i, text_line in enumerate(text_segments):
+                code_line = code[i] if i < len(code) else ""
+                if '\ue000' in code_line:
+                    segments.append((cls.__split_slots(text_line), cls.__split_slots(code_line), None))
+                else:
+                    segments.append((cls.__split_slots(text_line), None, cls.__compile_code(code_line) if code_line else None))
+            compiled.append(CompiledLine(kind, tuple(segments), has_newline))
 
+        return tuple(compiled)
+
+    @classmethod
+    def __compile_code(cls, code_line: str) -> tuple:
+        """将不含参数的代码拆分为节点：颜色/样式为 (node,)，动作为 (node, key, value)"""
+        nodes = []
+        for node in code_line.split("<>"):
+            node = node.strip()
+            if not node:
+                continue
+
+            if node in color_and_style_dict:
+                nodes.append((node,))
+            elif "=" in node:
+                key, value = node.split("=", 1)
+                try:
+                    value = cls.parse_value(value)
+                except Exception as e:
+                    raise MessageFormatException(f"Failed to parse action node '{node}': {str(e)}")
+                nodes.append((node, key.strip(), value))
+        return tuple(nodes)
+
+    @classmethod
+    def __apply_code(cls, code_line: str, obj: RText) -> None:
+        for node in code_line.split("<>"):
+            node = node.strip()
+            if not node:
+                continue
+
+            if node in color_and_style_dict:
+                cls.apply_color_and_style_dict(node, obj, )
+            elif "=" in node:
+                cls.apply_action_dict(node, obj, )
+
+    @classmethod
+    def render(cls, compiled: Sequence[CompiledLine], values: Sequence[str] = ()) -> RTextList:
+        """将预解析的行代入参数后生成 RTextList"""
+        obj_list = RTextList()
+        for line in compiled:
+            if line.kind == "blank":
+                obj_list.append(RText("\n"))
+                continue
+
+            objs = []
+            for text_parts, code_parts, nodes in line.segments:
+                obj = RText(cls.__fill(text_parts, values))
+                if code_parts is not None:
+                    cls.__apply_code(cls.__fill(code_parts, values), obj)
+                elif nodes is not None:
+                    for node in nodes:
+                        if len(node) == 1:
+                            cls.apply_color_and_style_dict(node[0], obj)
+                        else:
+                            cls.apply_action(*node, obj)
+                objs.append(obj)
+
+            if line.kind == "pairs":
+                # 如果是最后一个且需要换行
+                if line.newline:
+                    objs[-1] = objs[-1] + "\n"
+                for obj in objs:
                     obj_list.append(obj)
             else:
-                # 其他情况，直接解析整行
-                obj = cls.parse_single_line(line, _prefix, )
-                if has_newline:
+                obj = objs[0] if len(objs) == 1 else RTextList(*objs)
+                if line.newline:
                     obj = obj + "\n"
                 obj_list.append(obj)
 
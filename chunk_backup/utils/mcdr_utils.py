@@ -1,17 +1,23 @@
+import functools
 from abc import ABC
 from typing import Union, Any, Optional
 from chunk_backup import constants
-from chunk_backup.utils.json_parser import Message as msg
 from mcdreforged.api.types import ServerInterface, CommandSource, PlayerCommandSource, ConsoleCommandSource
 from mcdreforged.api.rtext import RText, RTextList, RColor, RAction, RTextBase
 
 
+def _message():
+    """富文本解析器在首次使用时才导入，以加快插件加载"""
+    from chunk_backup.utils.json_parser import Message
+    return Message
+
+
 def tr(key: str, *args, **kwargs) -> RTextBase:
     return ServerInterface.si().rtr(constants.PLUGIN_ID + '.' + key, *args, **kwargs)
 
 
 def get_json_obj(key: str, *args, **kwargs) -> RTextBase:
-    return msg.get_json_str(tr(key, *args, **kwargs).to_plain_text())
+    return _message().get_json_str_from_template(functools.partial(tr, key), *args, **kwargs)
 
 
 class TranslationContext(ABC):
@@ -27,13 +33,13 @@ class TranslationContext(ABC):
     def get_json_obj(self, key: str, *args, **kwargs) -> RTextList:
         without_id = kwargs.pop('without_id', False)
         if not without_id:
-            return msg.get_json_str(self.tr(key, *args, **kwargs).to_plain_text())
+            return _message().get_json_str_from_template(functools.partial(self.tr, key), *args, **kwargs)
         else:
-            return msg.get_json_str(tr(key, *args, **kwargs).to_plain_text())
+            return _message().get_json_str_from_template(functools.partial(tr, key), *args, **kwargs)
 
     @classmethod
     def merge_rtext_lists(cls, *args, separator: Optional[Union[str, RTextBase]] = "\n") -> RTextList:
-        return msg.merge_rtext_lists(*args, separator=separator)
+        return _message().merge_rtext_lists(*args, separator=separator)
 
 
 def mkcmd(s: str) -> str:
@@ -1,3 +1,4 @@
+from concurrent import futures
 from typing import Any, Optional, TypeVar
 
 from chunk_backup import constants
@@ -16,3 +17,16 @@ def represent(obj: Any, *, attrs: Optional[dict] = None) -> str:
 
 def make_thread_name(name: str) -> str:
     return f'CB@{constants.INSTANCE_ID}-{name}'
+
+
+def chain_future(source: 'futures.Future[_T]', target: 'futures.Future[_T]'):
+    """source 完成后将其结果（或异常、取消状态）同步到 target"""
+    def callback(f: 'futures.Future[_T]'):
+        if f.cancelled():
+            target.cancel()
+        elif f.exception() is not None:
+            target.set_exception(f.exception())
+        else:
+            target.set_result(f.result())
+
+    source.add_done_callback(callback)
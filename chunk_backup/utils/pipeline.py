@@ -0,0 +1,124 @@
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from chunk_backup.utils import misc_utils
+
+_DONE = object()
+
+
+class Pipeline:
+    """
+    分阶段的流水线：每个阶段由若干线程处理，相邻阶段之间以有界队列连接。
+    不同的条目可以同时处于不同的阶段（如一个区域在读取时另一个区域在写入），
+    队列已满时上游阶段阻塞等待（背压），同时在内存中的条目数不超过 各阶段线程数 + 各队列容量。
+    每个条目只由每个阶段的一个线程处理，阶段函数返回的值交给下一阶段，最后一个阶段的返回值由 run() 按完成顺序产出。
+    任一阶段抛出异常时整条流水线停止，run() 在调用方线程中重新抛出该异常，failed_item 为出错阶段的输入条目。
+    """
+    QUEUE_SIZE = 2
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, name: str, queue_size: int = QUEUE_SIZE, initializer: Optional[Callable[[], None]] = None):
+        self.name = name
+        self.queue_size = queue_size
+        self.initializer = initializer
+        self.failed_item: Any = None
+        self.__stages: List[Tuple[str, Callable[[Any], Any], int]] = []
+        self.__stop = threading.Event()
+        self.__error: Optional[BaseException] = None
+        self.__error_lock = threading.Lock()
+
+    def add_stage(self, name: str, func: Callable[[Any], Any], workers: int = 1) -> 'Pipeline':
+        self.__stages.append((name, func, max(workers, 1)))
+        return self
+
+    # ================================== 队列 ==================================
+
+    def __put(self, q: queue.Queue, item) -> bool:
+        """放入条目，流水线停止时放弃并返回 False"""
+        while not self.__stop.is_set():
+            try:
+                q.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __get(self, q: queue.Queue):
+        """取出条目，流水线停止时返回 _DONE"""
+        while not self.__stop.is_set():
+            try:
+                return q.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def __fail(self, error: BaseException, item):
+        with self.__error_lock:
+            if self.__error is None:
+                self.__error, self.failed_item = error, item
+        self.__stop.set()
+
+    # ================================== 线程 ==================================
+
+    def __feed(self, items: Iterable, out: queue.Queue, consumers: int):
+        try:
+            for item in items:
+                if not self.__put(out, item):
+                    return
+        except Exception as e:
+            self.__fail(e, None)
+            return
+        for _ in range(consumers):
+            self.__put(out, _DONE)
+
+    def __work(self, func: Callable[[Any], Any], inp: queue.Queue, out: queue.Queue, consumers: int, remaining: List[int], lock: threading.Lock):
+        if self.initializer is not None:
+            self.initializer()
+        while (item := self.__get(inp)) is not _DONE:
+            try:
+                result = func(item)
+            except BaseException as e:
+                self.__fail(e, item)
+                return
+            if not self.__put(out, result):
+                return
+        # 本阶段最后一个结束的线程通知下一阶段的所有线程
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(consumers):
+                self.__put(out, _DONE)
+
+    def run(self, items: Iterable) -> Iterator:
+        """
+        启动流水线处理 items，按完成顺序产出最后一个阶段的结果。
+        调用方提前结束迭代（如收到中断请求）时停止流水线，正在处理的条目完成当前阶段后各线程退出。
+        """
+        if not self.__stages:
+            yield from items
+            return
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.__stages) + 1)]
+        threads = [threading.Thread(
+            target=self.__feed, args=(items, queues[0], self.__stages[0][2]),
+            name=misc_utils.make_thread_name(f'{self.name}-feed'), daemon=True
+        )]
+        for i, (stage_name, func, workers) in enumerate(self.__stages):
+            consumers = self.__stages[i + 1][2] if i + 1 < len(self.__stages) else 1
+            remaining, lock = [workers], threading.Lock()
+            for n in range(workers):
+                threads.append(threading.Thread(
+                    target=self.__work, args=(func, queues[i], queues[i + 1], consumers, remaining, lock),
+                    name=misc_utils.make_thread_name(f'{self.name}-{stage_name}-{n}'), daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+        try:
+            while (result := self.__get(queues[-1])) is not _DONE:
+                yield result
+        finally:
+            self.__stop.set()
+            for thread in threads:
+                thread.join()
+        if self.__error is not None:
+            raise self.__error
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from chunk_backup.config.config import Config
+from chunk_backup.mcdr_globals import server
+
+
+class PlayerDataStore:
+    """
+    内容寻址的玩家数据仓库。
+    文件按内容哈希保存在 storage_root/<player_store>/<哈希前两位>/<哈希>，相同内容只保存一份；
+    各槽位只在 info.json 的 player_files 中记录 uuid → {相对服务端根目录的路径: 哈希} 的清单。
+    不再被任何槽位清单引用的对象由 collect_garbage() 清理。
+    """
+    MANIFEST_KEY = "player_files"
+    GC_GRACE = 3600  # 新写入或复用的对象在此秒数内不会被清理，避免清掉清单尚未写入 info.json 的备份所引用的对象
+
+    __gc_lock = threading.Lock()
+
+    def __init__(self):
+        self.config = Config.get()
+        self.storage_root = Path(self.config.storage_root)
+        self.root = self.storage_root / self.config.player_store
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.blake2b(data).hexdigest()
+
+    @classmethod
+    def file_digest(cls, path: Path) -> str:
+        return cls.digest(path.read_bytes())
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def put(self, src: Path) -> Tuple[str, bool]:
+        """
+        存入文件，返回 (哈希, 是否新写入)。
+        玩家数据文件较小，一次读入内存后计算哈希，保证写入的内容与哈希一致；已存在的对象只刷新修改时间。
+        """
+        data = src.read_bytes()
+        digest = self.digest(data)
+        obj = self.object_path(digest)
+        if obj.exists():
+            os.utime(obj)
+            return digest, False
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = obj.with_name(f"{digest}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, obj)
+        return digest, True
+
+    def get(self, digest: str, dst: Path) -> bool:
+        """
+        将对象写到 dst，dst 已是相同内容时跳过，返回是否写入。
+        :raise FileNotFoundError: 仓库中不存在该对象
+        """
+        obj = self.object_path(digest)
+        if not obj.exists():
+            raise FileNotFoundError(obj)
+        try:
+            if self.file_digest(dst) == digest:
+                return False
+        except FileNotFoundError:
+            pass
+        shutil.copy2(obj, dst)
+        return True
+
+    # ================================== 清理 ==================================
+
+    def __iter_info_files(self):
+        for storage in (self.config.dynamic_storage, self.config.static_storage):
+            yield from (self.storage_root / storage).glob("*/info.json")
+        yield self.storage_root / self.config.overwrite_storage / "info.json"
+
+    def collect_references(self) -> Optional[Set[str]]:
+        """收集所有槽位清单引用的哈希，有 info.json 无法读取时返回 None（此时不应清理）"""
+        refs = set()
+        for info_file in self.__iter_info_files():
+            if not info_file.exists():
+                continue
+            try:
+                with open(info_file, 'r', encoding='utf-8') as f:
+                    manifest: Optional[Dict[str, Dict[str, str]]] = json.load(f).get(self.MANIFEST_KEY)
+            except (OSError, ValueError, AttributeError):
+                server.logger.warning(f"Cannot read {info_file}, skipping player data store cleanup")
+                return None
+            for files in (manifest or {}).values():
+                refs.update(files.values())
+        return refs
+
+    def collect_garbage(self) -> int:
+        """删除不再被引用、且超过保护时间的对象（含中断残留的临时文件），返回删除数量"""
+        if not self.root.exists():
+            return 0
+        with self.__gc_lock:
+            refs = self.collect_references()
+            if refs is None:
+                return 0
+            cutoff = time.time() - self.GC_GRACE
+            removed = 0
+            for directory in self.root.iterdir():
+                if not directory.is_dir():
+                    continue
+                for obj in directory.iterdir():
+                    try:
+                        if obj.name in refs or obj.stat().st_mtime >= cutoff:
+                            continue
+                        obj.unlink()
+                        removed += 1
+                    except FileNotFoundError:
+                        continue
+                try:
+                    directory.rmdir()  # 仅在已清空时成功
+                except OSError:
+                    pass
+            if removed:
+                server.logger.debug(f"Removed {removed} unreferenced player data object(s)")
+            return removed
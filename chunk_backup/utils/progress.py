@@ -0,0 +1,95 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+from chunk_backup.utils.timer import Timer
+
+
+@dataclass(frozen=True)
+class ProgressSnapshot:
+    regions_done: int
+    regions_total: int
+    bytes_done: int
+    bytes_total: int
+    elapsed: float
+    eta: Optional[float]  # 预计剩余秒数，无法预估时为 None
+
+    @property
+    def percent(self) -> float:
+        if self.bytes_total > 0:
+            ratio = self.bytes_done / self.bytes_total
+        elif self.regions_total > 0:
+            ratio = self.regions_done / self.regions_total
+        else:
+            return 0.0
+        return min(ratio, 1.0) * 100
+
+
+class ProgressReporter:
+    """
+    区域引擎的进度统计，各工作线程每完成一个区域/文件调用一次 advance()。
+    距上次汇报超过 interval 秒时调用 on_report，interval <= 0 时不主动汇报。
+    剩余时间优先按本次实测速度计算，实测时间过短时使用历史速度。
+    """
+    MIN_MEASURE_TIME = 2.0
+
+    def __init__(
+            self, bytes_total: int = 0, regions_total: int = 0, interval: float = 0,
+            on_report: Optional[Callable[[ProgressSnapshot], None]] = None,
+            history_speed: Optional[float] = None
+    ):
+        self.__lock = threading.Lock()
+        self.__timer = Timer()
+        self.__last_report = 0.0
+        self.interval = interval
+        self.on_report = on_report
+        self.history_speed = history_speed
+        self.bytes_total = bytes_total
+        self.regions_total = regions_total
+        self.bytes_done = 0
+        self.regions_done = 0
+
+    def restart(self):
+        """重新开始计时与计数，用于总量不变但实际处理从稍后才开始的情况"""
+        with self.__lock:
+            self.__timer.restart()
+            self.__last_report = 0.0
+            self.bytes_done = 0
+            self.regions_done = 0
+
+    def advance(self, regions: int = 0, size: int = 0):
+        with self.__lock:
+            self.regions_done += regions
+            self.bytes_done += size
+            elapsed = self.__timer.get_elapsed()
+            if self.on_report is None or self.interval <= 0 or elapsed - self.__last_report < self.interval:
+                return
+            self.__last_report = elapsed
+            snapshot = self.__snapshot(elapsed)
+        self.on_report(snapshot)
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self.__lock:
+            return self.__snapshot(self.__timer.get_elapsed())
+
+    def __snapshot(self, elapsed: float) -> ProgressSnapshot:
+        return ProgressSnapshot(
+            regions_done=min(self.regions_done, self.regions_total) if self.regions_total > 0 else self.regions_done,
+            regions_total=self.regions_total,
+            bytes_done=self.bytes_done,
+            bytes_total=self.bytes_total,
+            elapsed=elapsed,
+            eta=self.__get_eta(elapsed)
+        )
+
+    def __get_eta(self, elapsed: float) -> Optional[float]:
+        if self.bytes_total > 0:
+            remaining = max(self.bytes_total - self.bytes_done, 0)
+            if elapsed >= self.MIN_MEASURE_TIME and self.bytes_done > 0:
+                speed = self.bytes_done / elapsed
+            else:
+                speed = self.history_speed
+            return remaining / speed if speed else None
+        # 没有预估数据量时按区域数推算
+        if self.regions_total > 0 and self.regions_done > 0:
+            return elapsed * max(self.regions_total - self.regions_done, 0) / self.regions_done
+        return None
@@ -1,139 +1,523 @@
 import os
 import struct
 import shutil
+import contextlib
+import multiprocessing
 import json
 import traceback
+import dataclasses
 import concurrent.futures
 from pathlib import Path
 from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from chunk_backup.utils.mcdr_utils import tr
 from chunk_backup.config.config import Config
 from chunk_backup.mcdr_globals import server
-from chunk_backup.exceptions import FatalError
+from chunk_backup.exceptions import FatalError, BackupInterrupted
+from chunk_backup.utils import io_utils
+from chunk_backup.utils.integrity import Checksum
+from chunk_backup.utils.pipeline import Pipeline
 from chunk_backup.utils.region.chunk_selector import ChunkSelector
 
 
+class RegionImage(NamedTuple):
+    """_build_region_file 在内存中组装好的区域文件"""
+    header: bytes
+    data_sectors: bytes
+    external_files: Dict[str, bytes]  # 外部区块文件名 → 内容
+    files: Dict[str, str]             # 区域文件与外部区块文件名 → 校验和
+    chunks: Dict[str, str]            # "x,z" → 区块压缩数据的校验和
+
+
+@dataclasses.dataclass
+class _ExportJob:
+    """导出流水线中的一个区域文件，由各阶段依次填充"""
+    region_file: str
+    data: dict
+    externals: List[Tuple[int, int]] = dataclasses.field(default_factory=list)
+    size: int = 0
+    files: Dict[str, str] = dataclasses.field(default_factory=dict)
+    chunks: Dict[str, str] = dataclasses.field(default_factory=dict)
+    fingerprint: Optional[bytes] = None
+    chunks_data: Optional[dict] = None   # 读取阶段 → 转换阶段
+    image: Optional[RegionImage] = None  # 转换阶段 → 写入阶段
+
+
+@dataclasses.dataclass
+class _MergeJob:
+    """回档流水线中的一个区域文件"""
+    region_file: str
+    chunk_list: Any  # 整个区域被选中时为区域文件名，否则为矩形列表
+    chunks: Optional[list] = None  # 读取阶段之后为 (x, z, 区块数据)，转换阶段之后为 (x, z, 打包的扇区数据或 None)
+    size: int = 0
+
+
 class Chunk:
     OVER_SIZE_THRESHOLD = 1020 * 1024  # 1020 KiB
+    SECTOR_SIZE = 4096
+    HEADER_SIZE = 2 * SECTOR_SIZE  # 位置表 + 时间戳表
+    LIVE_COPY_MAX_RETRY = 5
+    PROCESS_POOL_MIN_REGIONS = 4  # region_workers 为 auto 时，按区块导出的区域文件少于此数不启动进程池
+
+    @classmethod
+    def _read_location_table(cls, region_path):
+        """读取区域文件头部的位置表，返回 1024 个条目（高 24 位为扇区偏移，低 8 位为扇区数），文件不完整时返回 None"""
+        try:
+            with open(region_path, 'rb') as f:
+                header = f.read(cls.SECTOR_SIZE)
+        except OSError:
+            return None
+        if len(header) < cls.SECTOR_SIZE:
+            return None
+        return struct.unpack('>1024I', header)
+
+    @classmethod
+    def _read_header(cls, file_obj) -> bytes:
+        """读取区域文件头（位置表与时间戳表），用于判断复制期间区块是否被服务器改写"""
+        file_obj.seek(0)
+        return file_obj.read(cls.HEADER_SIZE)
+
+    @classmethod
+    def _header_entry(cls, header, chunk_x, chunk_z):
+        """返回区块在文件头中的 (位置, 时间戳) 原始字节，文件头不完整时缺失部分为空"""
+        index = 4 * ((chunk_x % 32) + (chunk_z % 32) * 32)
+        return header[index:index + 4], header[cls.SECTOR_SIZE + index:cls.SECTOR_SIZE + index + 4]
+
+    @classmethod
+    def _read_chunks(cls, input_path, src_f, coords, chunks_data):
+        for chunk_x, chunk_z in coords:
+            chunks_data[(chunk_x % 32, chunk_z % 32)] = cls._read_chunk_data(input_path, chunk_x, chunk_z, file_obj=src_f)
+
+    @classmethod
+    def _read_chunks_stable(cls, input_path, src_f, coords, chunks_data):
+        """
+        在服务器可能同时写入时读取区块：读取前后各取一次文件头，位置或时间戳变化的区块重新读取，直到文件头稳定。
+        返回稳定时的文件头，重试次数用尽仍不稳定时返回 None（由最终校验重新导出）
+        """
+        before = cls._read_header(src_f)
+        cls._read_chunks(input_path, src_f, coords, chunks_data)
+        for _ in range(cls.LIVE_COPY_MAX_RETRY):
+            after = cls._read_header(src_f)
+            changed = [(x, z) for x, z in coords if cls._header_entry(before, x, z) != cls._header_entry(after, x, z)]
+            if not changed:
+                return after
+            cls._read_chunks(input_path, src_f, changed, chunks_data)
+            before = after
+        return None
+
+    @classmethod
+    def _index_rectangles(cls, data):
+        """ChunkSelector.to_index() 中单个区域的条目对应的矩形列表，整区域条目展开为覆盖整个区域的矩形"""
+        rectangles = data["rectangles"]
+        if isinstance(rectangles, str):
+            rx, rz = cls._parse_region_filename(rectangles)
+            return [(rx * 32, rz * 32, rx * 32 + 31, rz * 32 + 31)]
+        return list(rectangles)
+
+    @classmethod
+    def _is_whole_region(cls, data):
+        """ChunkSelector.to_index() 中单个区域的条目是否选中了整个区域（按区域掩码判断）"""
+        mask = 0
+        for rect in cls._index_rectangles(data):
+            mask |= ChunkSelector._rect_mask(rect)
+        return mask == ChunkSelector.FULL_REGION_MASK
+
+    @classmethod
+    def _index_chunks(cls, data):
+        """将 ChunkSelector.to_index() 中单个区域的条目展开为区块坐标列表"""
+        return [
+            (x, z)
+            for (min_x, min_z, max_x, max_z) in cls._index_rectangles(data)
+            for x in range(min_x, max_x + 1)
+            for z in range(min_z, max_z + 1)
+        ]
+
+    @classmethod
+    def _region_changed(cls, input_path, coords, fingerprint) -> bool:
+        """与复制时记录的文件头比较，判断选中的区块在复制之后是否被改写"""
+        if fingerprint is None:
+            return True
+        try:
+            with open(input_path, 'rb') as f:
+                header = cls._read_header(f)
+        except OSError:
+            return True
+        return any(cls._header_entry(header, x, z) != cls._header_entry(fingerprint, x, z) for x, z in coords)
+
+    @classmethod
+    def reexport_changed_regions(cls, input_region_dir, output_dir, selector, fingerprints, interrupt_event=None):
+        """
+        边运行边复制后的最终校验：与复制时记录的文件头比较，只重新导出选中区块在复制后被改写过的区域文件。
+        返回重新导出的区域文件数
+        """
+        selectors = selector if isinstance(selector, list) else [selector]
+        if not any(sel._rectangles for sel in selectors):
+            return 0
+
+        changed = set()
+        for region_file, data in ChunkSelector.combine(selectors).to_index().items():
+            input_path = os.path.join(input_region_dir, region_file)
+            if not os.path.exists(input_path):
+                continue
+            if cls._region_changed(input_path, cls._index_chunks(data), fingerprints.get(input_path)):
+                changed.add(region_file)
+
+        if changed:
+            cls.export_grouped_regions(input_region_dir, output_dir, selectors, interrupt_event=interrupt_event, only_regions=changed)
+        return len(changed)
+
+    @classmethod
+    def _read_region_chunks(cls, input_path, chunks_needed, live=False):
+        """
+        读取区域文件中选中的区块，返回 ({(局部 x, 局部 z): 区块数据}, 文件头)。
+        live 为 True 时按服务器仍在写入处理，文件头为读取稳定时的文件头（重试用尽仍不稳定时为 None），否则为 None。
+        """
+        chunks_data = {}
+        fingerprint = None
+        with open(input_path, 'rb') as src_f:
+            if live:
+                fingerprint = cls._read_chunks_stable(input_path, src_f, chunks_needed, chunks_data)
+            else:
+                cls._read_chunks(input_path, src_f, chunks_needed, chunks_data)
+            if io_utils.background_io():
+                io_utils.drop_cache(src_f)
+        return chunks_data, fingerprint
+
+    @classmethod
+    def _external_chunks(cls, region_file, chunks_data):
+        """读取到的区块中存放在外部文件的区块的全局坐标"""
+        rx, rz = cls._parse_region_filename(region_file)
+        return [
+            (rx * 32 + local_x, rz * 32 + local_z)
+            for (local_x, local_z), data in chunks_data.items()
+            if isinstance(data, dict) and data.get("actual_compression")
+        ]
+
+    @classmethod
+    def _export_partial_region(cls, input_path, output_path, chunks_needed, live=False):
+        """
+        按区块导出单个区域文件（读取、组装、写出三步依次执行），返回 (外部区块坐标, 写出的字节数, 文件校验和, 区块校验和, 文件头)。
+        只通过参数与返回值交换数据，可以在进程池中执行。
+        """
+        chunks_data, fingerprint = cls._read_region_chunks(input_path, chunks_needed, live=live)
+        image = cls._build_region_file(output_path, chunks_data)
+        region_size, external_size = cls._write_region_file(output_path, image)
+        return cls._external_chunks(output_path, chunks_data), region_size + external_size, image.files, image.chunks, fingerprint
+
+    @staticmethod
+    def _init_process_worker(workers, server_running):
+        io_utils.IoLimiter.init_worker(workers, server_running)
+        io_utils.lower_thread_priority()
 
     @classmethod
-    def export_grouped_regions(cls, input_region_dir, output_dir, selector):
+    def _create_process_pool(cls, region_count, max_workers):
+        """
+        按 Config.region_workers 决定按区块导出是否使用进程池，返回进程池，使用线程池时返回 None：
+        - thread：始终使用线程池
+        - process：有按区块导出的区域时使用进程池
+        - auto：按区块导出需要逐个区块解析并计算校验和，受 GIL 限制，区域文件较多、有多个 CPU 且没有读取限速（此时瓶颈在磁盘）时使用进程池
+        只支持 fork 启动方式：插件不一定能在新的解释器中导入（如打包的 .mcdr 插件），fork 的子进程直接继承已加载的模块与配置。
+        fork 多线程的 MCDR 进程时，子进程可能继承其他线程（包括其他插件的线程）正持有的锁而死锁，因此默认为 thread，进程池需手动开启
+        """
+        mode = Config.get().region_workers
+        if mode not in ('process', 'auto') or region_count <= 0 or 'fork' not in multiprocessing.get_all_start_methods():
+            return None
+        workers = min(max_workers, region_count, os.cpu_count() or 1)
+        if mode == 'auto' and (region_count < cls.PROCESS_POOL_MIN_REGIONS or workers < 2 or io_utils.IoLimiter.get().current_rate() is not None):
+            return None
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=cls._init_process_worker,
+            initargs=(workers, io_utils.IoLimiter.get().server_running())
+        )
+
+    @classmethod
+    def estimate_region_dir(cls, region_dir, selector):
+        """
+        只读取区域文件头，估算选区在该目录下的数据量。
+        返回 (字节数, 非空区块数, 外部区块文件数, 区域文件数)
+        """
+        region_dir = Path(region_dir)
+        if not region_dir.is_dir():
+            return 0, 0, 0, 0
+
+        selectors = selector if isinstance(selector, list) else [selector]
+        whole = "all" in selectors
+
+        mcc_sizes = {}
+        region_sizes = {}
+        other_size = 0
+        with os.scandir(region_dir) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                name = entry.name
+                try:
+                    if name.startswith('c.') and name.endswith('.mcc'):
+                        x, z = map(int, name[2:-4].split('.'))
+                        mcc_sizes[(x, z)] = entry.stat().st_size
+                        continue
+                    key = cls._parse_region_filename(name)
+                    if key is not None:
+                        region_sizes[key] = entry.stat().st_size
+                        continue
+                except ValueError:
+                    pass
+                other_size += entry.stat().st_size
+
+        if whole:
+            masks = {key: ChunkSelector.FULL_REGION_MASK for key in region_sizes}
+        else:
+            masks = ChunkSelector.combine(selectors).to_region_masks()
+
+        total_bytes = other_size if whole else 0
+        chunk_count = 0
+        region_count = 0
+        for (rx, rz), mask in masks.items():
+            if (rx, rz) not in region_sizes:
+                continue
+            table = cls._read_location_table(region_dir / f"r.{rx}.{rz}.mca")
+            if table is None:
+                continue
+            region_bytes = 0
+            for x, z in ChunkSelector.iter_mask_chunks(rx, rz, mask):
+                location = table[(x & 31) + (z & 31) * 32]
+                if location:
+                    chunk_count += 1
+                    region_bytes += (location & 0xFF) * cls.SECTOR_SIZE
+            if whole:
+                # 整区域复制，按实际文件大小计
+                total_bytes += region_sizes[(rx, rz)]
+                region_count += 1
+            elif region_bytes:
+                # 导出的区域文件包含 8 KiB 文件头
+                total_bytes += region_bytes + 2 * cls.SECTOR_SIZE
+                region_count += 1
+
+        mcc_count = 0
+        for (x, z), size in mcc_sizes.items():
+            if whole or (masks.get((x >> 5, z >> 5), 0) >> ((x & 31) + (z & 31) * 32)) & 1:
+                mcc_count += 1
+                total_bytes += size
+
+        return total_bytes, chunk_count, mcc_count, region_count
+
+    @classmethod
+    def export_grouped_regions(cls, input_region_dir, output_dir, selector, interrupt_event=None, progress=None,
+                               fingerprints=None, only_regions=None):
         """
         按区域分组导出区块数据，并生成索引文件（明确指示是否有外部区块）。
+        interrupt_event 被设置后，尚未开始的区域不再处理，正在处理的区域完成后抛出 BackupInterrupted。
+        progress 为 ProgressReporter，每完成一个区域上报一次。
+        fingerprints 不为 None 时按服务器仍在写入处理：读取到稳定的区块数据，并以源文件路径为键记录读取时的文件头。
+        only_regions 不为 None 时只重新导出其中的区域文件，索引文件中其余区域的外部区块信息与校验和保持不变。
+        索引文件同时记录复制/写出时计算的文件校验和（files）与按区块导出的区域的区块校验和（chunks）。
+        区域文件经过 读取 → 组装（计算校验和）→ 写入 三个阶段的流水线（见 Pipeline），不同区域的读取与写入相互重叠，队列有界以限制内存占用；
+        按区块导出的区域文件较多时可按 Config.region_workers 改由进程池处理（见 _create_process_pool）。
         """
         if not isinstance(selector, list):
             selectors = [selector]
         else:
             selectors = selector
 
-        all_rects = []
-        for sel in selectors:
-            all_rects.extend(sel._rectangles)
-        if not all_rects:
+        if not any(sel._rectangles for sel in selectors):
             return 0
 
-        first_sel = selectors[0]
-        combined_sel = ChunkSelector._from_rectangles(
-            all_rects, first_sel.max_chunk_size, first_sel.ignore_size_limit
-        )
+        # 合并后的矩形互不重叠，每个区块只会被读写一次
+        combined_sel = ChunkSelector.combine(selectors)
         rect_index = combined_sel.to_index()  # 用于内部处理
+        if only_regions is not None:
+            rect_index = {k: v for k, v in rect_index.items() if k in only_regions}
 
         region_externals = defaultdict(list)
+        file_checksums = {}
+        chunk_checksums = {}
         total_size = 0
 
-        def process_region(region_file, data):
-            local_externals = []
-            local_total = 0
-
-            rectangles = data["rectangles"]
-            rect_list = []
-            if isinstance(rectangles, str):
-                rx, rz = cls._parse_region_filename(rectangles)
-                rect_list.append((rx * 32, rz * 32, rx * 32 + 31, rz * 32 + 31))
-            else:
-                for r in rectangles:
-                    rect_list.append(r)
-
-            input_path = os.path.join(input_region_dir, region_file)
-            output_path = os.path.join(output_dir, region_file)
-
-            chunks_needed = []
-            for (min_x, min_z, max_x, max_z) in rect_list:
-                for x in range(min_x, max_x + 1):
-                    for z in range(min_z, max_z + 1):
-                        chunks_needed.append((x, z))
+        def read_region(job: _ExportJob) -> _ExportJob:
+            """读取阶段：读取选中的区块；整个区域被选中时直接复制区域文件及其外部文件"""
+            if interrupt_event is not None and interrupt_event.is_set():
+                raise BackupInterrupted()
+            input_path = os.path.join(input_region_dir, job.region_file)
+            output_path = os.path.join(output_dir, job.region_file)
 
             if not os.path.exists(input_path):
                 # 源区域不存在，不创建任何文件，直接返回空数据
-                return region_file, local_externals, 0
-
-            if isinstance(rectangles, str) and len(rectangles) == len(rect_list):
-                # 整个区域被选中，直接复制区域文件
-                local_total += os.path.getsize(input_path)
-                shutil.copy2(input_path, output_path)
+                return job
+
+            if not cls._is_whole_region(job.data):
+                # 部分区域，逐个读取区块，交给转换阶段
+                job.chunks_data, job.fingerprint = cls._read_region_chunks(input_path, cls._index_chunks(job.data), live=fingerprints is not None)
+                return job
+
+            # 整个区域被选中，直接复制区域文件
+            src_region_x, src_region_z = cls._parse_region_filename(job.region_file)
+            _input, _output = Path(input_region_dir), Path(output_dir)
+
+            for _ in range(cls.LIVE_COPY_MAX_RETRY if fingerprints is not None else 1):
+                job.externals, job.size, job.files = [], 0, {}
+                before = None
+                if fingerprints is not None:
+                    with open(input_path, 'rb') as f:
+                        before = cls._read_header(f)
+                hasher = Checksum.hasher()
+                written = cls.trim_region_file(input_path, output_path, hasher=hasher) if Config.get().backup.trim_regions else None
+                if written is None:
+                    io_utils.copy_file(input_path, output_path, hasher=hasher, block_size=Checksum.BLOCK_SIZE)
+                    written = os.path.getsize(output_path)
+                job.size += written
+                job.files[job.region_file] = hasher.hexdigest()
 
                 # 复制该区域的所有外部文件
-                src_region_x, src_region_z = cls._parse_region_filename(region_file)
-                _input, _output = Path(input_region_dir), Path(output_dir)
-
                 for x, z in ChunkSelector.get_all_chunks_in_region(src_region_x, src_region_z):
                     input_mcc = _input / f"c.{x}.{z}.mcc"
                     if not input_mcc.exists():
                         continue
-                    local_total += os.path.getsize(input_mcc)
+                    job.size += os.path.getsize(input_mcc)
                     output_mcc = _output / f"c.{x}.{z}.mcc"
-                    shutil.copy2(input_mcc, output_mcc)
-                    local_externals.append((x, z))
-                return region_file, local_externals, local_total
-            else:
-                # 部分区域，逐个处理区块
-                chunks_data = {}
-                with open(input_path, 'rb') as src_f:
-                    for chunk_x, chunk_z in chunks_needed:
-                        data_chunk = cls._read_chunk_data(input_path, chunk_x, chunk_z, file_obj=src_f)
-                        if isinstance(data_chunk, dict) and data_chunk.get("actual_compression"):
-                            local_externals.append((chunk_x, chunk_z))
-                        chunks_data[(chunk_x % 32, chunk_z % 32)] = data_chunk
-
-                region_size, external_size = cls._create_region_file(output_path, chunks_data)
-                local_total += region_size + external_size
-                return region_file, local_externals, local_total
+                    job.files[output_mcc.name] = Checksum.copy_file(input_mcc, output_mcc)
+                    job.externals.append((x, z))
+
+                if fingerprints is None:
+                    break
+                with open(input_path, 'rb') as f:
+                    after = cls._read_header(f)
+                if before == after:
+                    job.fingerprint = after
+                    break
+                job.fingerprint = None
+            return job
+
+        def build_region(job: _ExportJob) -> _ExportJob:
+            """转换阶段：组装区域文件内容并计算校验和"""
+            if job.chunks_data is not None:
+                job.externals = cls._external_chunks(job.region_file, job.chunks_data)
+                job.image = cls._build_region_file(job.region_file, job.chunks_data)
+                job.chunks_data = None
+            return job
+
+        def write_region(job: _ExportJob) -> _ExportJob:
+            """写入阶段：写出区域文件与外部区块文件"""
+            if job.image is not None:
+                region_size, external_size = cls._write_region_file(os.path.join(output_dir, job.region_file), job.image)
+                job.size = region_size + external_size
+                job.files, job.chunks = job.image.files, job.image.chunks
+                job.image = None
+            return job
 
         try:
             max_workers = Config.max_workers if Config.max_workers > 0 else 4
         except Exception:
             max_workers = 4
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for region_file, data in rect_index.items():
-                future = executor.submit(process_region, region_file, data)
-                futures.append(future)
+        # 按区块导出的区域数较多且需要计算校验和时交给进程池，其余区域由线程流水线处理
+        partial_regions = {
+            region_file for region_file, data in rect_index.items()
+            if not cls._is_whole_region(data) and os.path.exists(os.path.join(input_region_dir, region_file))
+        }
+        process_pool = cls._create_process_pool(len(partial_regions), max_workers)
+
+        pipeline = Pipeline('export', initializer=io_utils.lower_thread_priority) \
+            .add_stage('read', read_region, workers=max_workers) \
+            .add_stage('build', build_region, workers=max(max_workers // 2, 1)) \
+            .add_stage('write', write_region, workers=max(max_workers // 2, 1))
+
+        def collect(region_file, ext_list, size, files, chunk_digests, fingerprint):
+            nonlocal total_size
+            if interrupt_event is not None and interrupt_event.is_set():
+                raise BackupInterrupted()
+            region_externals[region_file].extend(ext_list)
+            file_checksums.update(files)
+            if chunk_digests:
+                chunk_checksums[region_file] = chunk_digests
+            if fingerprints is not None:
+                fingerprints[os.path.join(input_region_dir, region_file)] = fingerprint
+            total_size += size
+            if progress is not None:
+                progress.advance(regions=1, size=size)
+
+        def log_failure(region_file):
+            server.logger.error(tr("other.error.chunk.create_backup.process_region",
+                                   region=region_file,
+                                   path=os.path.join(input_region_dir, region_file),
+                                   error=traceback.format_exc()))
+
+        with (process_pool or contextlib.nullcontext()):
+            future_to_region = {}
+            if process_pool is not None:
+                for region_file in partial_regions:
+                    future = process_pool.submit(
+                        cls._export_partial_region,
+                        os.path.join(input_region_dir, region_file),
+                        os.path.join(output_dir, region_file),
+                        cls._index_chunks(rect_index[region_file]),
+                        fingerprints is not None
+                    )
+                    future_to_region[future] = region_file
+            jobs = [
+                _ExportJob(region_file, data) for region_file, data in rect_index.items()
+                if process_pool is None or region_file not in partial_regions
+            ]
 
-            for future in concurrent.futures.as_completed(futures):
+            try:
                 try:
-                    region_file, ext_list, size = future.result()
-                    region_externals[region_file].extend(ext_list)
-                    total_size += size
+                    for job in pipeline.run(jobs):
+                        collect(job.region_file, job.externals, job.size, job.files, job.chunks, job.fingerprint)
+                except BackupInterrupted:
+                    raise
                 except Exception:
-                    server.logger.error(tr("other.error.chunk.create_backup.process_region",
-                                           region=region_file,
-                                           path=os.path.join(input_region_dir, region_file),
-                                           error=traceback.format_exc()))
+                    log_failure(pipeline.failed_item.region_file if pipeline.failed_item is not None else "?")
                     raise FatalError
 
+                for future in concurrent.futures.as_completed(future_to_region):
+                    region_file = future_to_region[future]
+                    try:
+                        result = future.result()
+                    except Exception:
+                        log_failure(region_file)
+                        raise FatalError
+                    collect(region_file, *result)
+            except BaseException:
+                for future in future_to_region:
+                    future.cancel()
+                raise
+
         # 构建索引文件：只包含外部区块信息，并明确指示是否有外部区块
         external_index = {}
+        files_index = {}
+        chunks_index = {}
+        index_path = os.path.join(output_dir, "index.json")
+        if only_regions is not None:
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    old_index = json.load(f)
+                external_index = old_index.get("external", {})
+                files_index = old_index.get("files", {})
+                chunks_index = old_index.get("chunks", {})
+            except (OSError, ValueError):
+                external_index, files_index, chunks_index = {}, {}, {}
+            regions = {cls._parse_region_filename(region) for region in rect_index}
+            for region in rect_index:
+                external_index.pop(region, None)
+                chunks_index.pop(region, None)
+            for name in list(files_index):
+                if cls._parse_region_filename(name) in regions or cls._parse_external_region(name) in regions:
+                    del files_index[name]
         for region, coords in region_externals.items():
             if coords:
                 external_index[region] = [f"{x},{z}" for x, z in coords]
+        files_index.update(file_checksums)
+        chunks_index.update(chunk_checksums)
 
         index_content = {
             "external_present": bool(external_index),
-            "external": external_index
+            "external": external_index,
+            "checksum": Checksum.ALGORITHM,
+            "files": dict(sorted(files_index.items())),
+            "chunks": dict(sorted(chunks_index.items()))
         }
 
-        index_path = os.path.join(output_dir, "index.json")
         try:
             with open(index_path, 'w', encoding='utf-8') as f:
                 json.dump(index_content, f, indent=2, ensure_ascii=False)
@@ -144,9 +528,11 @@ class Chunk:
         return total_size
 
     @classmethod
-    def merge_region_file(cls, source_region_dir, target_region_dir, selector):
+    def merge_region_file(cls, source_region_dir, target_region_dir, selector, progress=None):
         """
         从备份恢复区域文件，要求备份文件夹必须包含索引文件。
+        progress 为 ProgressReporter，每完成一个区域上报一次读取的数据量。
+        区域文件经过 读取 → 打包 → 写入 三个阶段的流水线，每个区域文件只由写入阶段的一个线程修改。
         """
         src_path = Path(source_region_dir)
         tgt_path = Path(target_region_dir)
@@ -195,55 +581,110 @@ class Chunk:
 
         region_to_chunks = ChunkSelector.combine_and_group(selectors)
 
-        def process_region(region_file, chunk_list):
-            src_folder = src_path
-            tgt_folder = tgt_path
-            src_region = src_folder / region_file
-            tgt_region = tgt_folder / region_file
-
-            # ---------- 全区域选中 ----------
-            if region_file == chunk_list:
-                if src_region.exists():
-                    # 备份区域文件存在，直接复制
-                    shutil.copy2(src_region, tgt_region)
-                    # 根据索引复制外部文件
-                    if index_has_external and region_file in external_map:
-                        for coord_str in external_map[region_file]:
-                            x, z = map(int, coord_str.split(','))
-                            input_mcc = src_folder / f"c.{x}.{z}.mcc"
-                            if not input_mcc.exists():
-                                server.logger.error(
-                                    tr("other.error.chunk.restore_backup.no_mcc",
-                                       x=x, z=z, mcc=f"c.{x}.{z}.mcc", path=input_mcc))
-                                raise FatalError(restore=True)
-                            output_mcc = tgt_folder / f"c.{x}.{z}.mcc"
-                            shutil.copy2(input_mcc, output_mcc)
-                else:
-                    # 备份中无此区域文件 → 整个区域为空
-                    if tgt_region.exists():
-                        tgt_region.unlink()
-                    # 删除该区域所有外部文件
-                    rx, rz = cls._parse_region_filename(region_file)
-                    for x, z in ChunkSelector.get_all_chunks_in_region(rx, rz):
-                        mcc_path = tgt_folder / f"c.{x}.{z}.mcc"
-                        if mcc_path.exists():
-                            mcc_path.unlink()
-                return
-
-            # ---------- 部分区域选中 ----------
+        def copy_whole_region(job: _MergeJob):
+            """整个区域被选中：直接复制备份中的区域文件及其外部文件，备份中没有该区域时删除目标区域"""
+            region_file = job.region_file
+            src_region = src_path / region_file
+            tgt_region = tgt_path / region_file
+            if src_region.exists():
+                # 备份区域文件存在，直接复制
+                job.size += os.path.getsize(src_region)
+                io_utils.copy_file(src_region, tgt_region)
+                # 根据索引复制外部文件
+                if index_has_external and region_file in external_map:
+                    for coord_str in external_map[region_file]:
+                        x, z = map(int, coord_str.split(','))
+                        input_mcc = src_path / f"c.{x}.{z}.mcc"
+                        if not input_mcc.exists():
+                            server.logger.error(
+                                tr("other.error.chunk.restore_backup.no_mcc",
+                                   x=x, z=z, mcc=f"c.{x}.{z}.mcc", path=input_mcc))
+                            raise FatalError(restore=True)
+                        output_mcc = tgt_path / f"c.{x}.{z}.mcc"
+                        job.size += os.path.getsize(input_mcc)
+                        io_utils.copy_file(input_mcc, output_mcc)
+            else:
+                # 备份中无此区域文件 → 整个区域为空
+                if tgt_region.exists():
+                    tgt_region.unlink()
+                # 删除该区域所有外部文件
+                rx, rz = cls._parse_region_filename(region_file)
+                for x, z in ChunkSelector.get_all_chunks_in_region(rx, rz):
+                    mcc_path = tgt_path / f"c.{x}.{z}.mcc"
+                    if mcc_path.exists():
+                        mcc_path.unlink()
+
+        def guarded(func):
+            """部分区域的处理出错时记录日志并抛出 FatalError"""
+            def wrapper(job: _MergeJob) -> _MergeJob:
+                try:
+                    return func(job)
+                except FatalError:
+                    raise
+                except Exception:
+                    server.logger.error(
+                        tr("other.error.chunk.restore_backup.process_region", region=job.region_file, path=tgt_path / job.region_file,
+                           error=traceback.format_exc()))
+                    raise FatalError(restore=True)
+            return wrapper
+
+        @guarded
+        def read_region(job: _MergeJob) -> _MergeJob:
+            """读取阶段：读取备份中需要恢复的区块（备份中没有的区块视为空区块），整个区域被选中时直接复制"""
+            if job.chunk_list == job.region_file:
+                copy_whole_region(job)
+                return job
             # 生成所有需要恢复的区块坐标
             coords = []
-            for (min_x, min_z, max_x, max_z) in chunk_list:
+            for (min_x, min_z, max_x, max_z) in job.chunk_list:
                 for x in range(min_x, max_x + 1):
                     for z in range(min_z, max_z + 1):
                         coords.append((x, z))
-            if not coords:
-                return
-
-            # 打开源文件（如果存在）
-            src_f = None
-            if src_region.exists():
-                src_f = open(src_region, 'rb')
+            src_region = src_path / job.region_file
+            job.chunks = []
+            if not src_region.exists():
+                job.chunks = [(x, z, "empty") for x, z in coords]
+                return job
+            with open(src_region, 'rb') as src_f:
+                for x, z in coords:
+                    src_data = cls._read_chunk_data(src_region, x, z, file_obj=src_f)
+                    job.chunks.append((x, z, "empty" if src_data is None else src_data))
+            return job
+
+        @guarded
+        def pack_region(job: _MergeJob) -> _MergeJob:
+            """转换阶段：将区块打包为要写入区域文件的扇区数据，超大区块的数据另存为外部文件内容"""
+            if job.chunks is None:
+                return job
+            packed = []
+            for x, z, src_data in job.chunks:
+                if src_data == "empty":
+                    packed.append((x, z, None))
+                    continue
+                if src_data.get("actual_compression"):
+                    # 外部区块：区域文件中只写入标记
+                    external = src_data['data']
+                    data_to_write = struct.pack('>I', 1) + bytes([src_data['compression_type']])
+                else:
+                    # 普通区块
+                    external = None
+                    data_to_write = (
+                            struct.pack('>I', src_data["length"]) +
+                            bytes([src_data['compression_type']]) +
+                            src_data['data']
+                    )
+                required_sectors = (len(data_to_write) + 4095) // 4096
+                packed.append((x, z, (data_to_write.ljust(required_sectors * 4096, b'\x00'), required_sectors, src_data.get('timestamp', 1), external)))
+            job.chunks = packed
+            return job
+
+        @guarded
+        def write_region(job: _MergeJob) -> _MergeJob:
+            """写入阶段：将打包好的区块写入目标区域文件，复用空闲扇区"""
+            if job.chunks is None:
+                return job
+            tgt_region = tgt_path / job.region_file
+            limiter = io_utils.IoLimiter.get()
             tgt_f = None
             free_sectors = []
             try:
@@ -252,21 +693,13 @@ class Chunk:
                     tgt_f = open(tgt_region, 'r+b')
                     free_sectors = cls._scan_free_sectors(tgt_region, file_obj=tgt_f)
 
-                for x, z in coords:
-                    # 从备份读取数据
-                    if src_f is not None:
-                        src_data = cls._read_chunk_data(src_region, x, z, file_obj=src_f)
-                    else:
-                        src_data = "empty"
-                    if src_data is None:
-                        src_data = "empty"
-
+                for x, z, packed in job.chunks:
                     local_x = x % 32
                     local_z = z % 32
                     offset_index = local_x + local_z * 32
 
                     # 如果目标文件未打开且当前区块非空，则创建目标文件
-                    if tgt_f is None and src_data != "empty":
+                    if tgt_f is None and packed is not None:
                         if not tgt_region.exists():
                             cls.init_region_file(tgt_region)
                         tgt_f = open(tgt_region, 'r+b')
@@ -286,7 +719,7 @@ class Chunk:
                     else:
                         tgt_sector_start = tgt_sector_count = 0
 
-                    if src_data == "empty":
+                    if packed is None:
                         # 置空区块
                         if tgt_sector_start != 0:
                             cls._free_sectors(free_sectors, tgt_sector_start, tgt_sector_count)
@@ -295,30 +728,19 @@ class Chunk:
                         tgt_f.seek(4096 + 4 * offset_index)
                         tgt_f.write(struct.pack('>I', 1))
                         # 删除可能的外部文件
-                        mcc_path = tgt_folder / f"c.{x}.{z}.mcc"
+                        mcc_path = tgt_path / f"c.{x}.{z}.mcc"
                         if mcc_path.exists():
                             mcc_path.unlink()
                         continue
 
-                    # 处理非空区块
-                    if src_data.get("actual_compression"):
+                    padded_data, required_sectors, timestamp, external = packed
+                    if external is not None:
                         # 外部区块：写入 .mcc 文件
-                        mcc_filename = f"c.{x}.{z}.mcc"
-                        mcc_path = tgt_folder / mcc_filename
-                        with open(mcc_path, 'wb') as mcc_f:
-                            mcc_f.write(src_data['data'])
-                        marker_data = struct.pack('>I', 1) + bytes([src_data['compression_type']])
-                        required_sectors = (len(marker_data) + 4095) // 4096
-                        data_to_write = marker_data
-                    else:
-                        # 普通区块
-                        raw_data = (
-                                struct.pack('>I', src_data["length"]) +
-                                bytes([src_data['compression_type']]) +
-                                src_data['data']
-                        )
-                        required_sectors = (len(raw_data) + 4095) // 4096
-                        data_to_write = raw_data
+                        limiter.consume(len(external))
+                        with open(tgt_path / f"c.{x}.{z}.mcc", 'wb') as mcc_f:
+                            mcc_f.write(external)
+                        job.size += len(external)
+                    job.size += required_sectors * 4096
 
                     # 写入数据到区域文件（分配逻辑与原代码相同）
                     if tgt_sector_start != 0 and required_sectors <= tgt_sector_count:
@@ -326,63 +748,50 @@ class Chunk:
                             release_start = tgt_sector_start + required_sectors
                             release_count = tgt_sector_count - required_sectors
                             cls._free_sectors(free_sectors, release_start, release_count)
-                        write_pos = tgt_sector_start * 4096
-                        tgt_f.seek(write_pos)
-                        tgt_f.write(data_to_write.ljust(required_sectors * 4096, b'\x00'))
-                        new_offset = (tgt_sector_start << 8) | required_sectors
-                        tgt_f.seek(4 * offset_index)
-                        tgt_f.write(struct.pack('>I', new_offset))
-                        tgt_f.seek(4096 + 4 * offset_index)
-                        tgt_f.write(struct.pack('>I', src_data.get('timestamp', 1)))
+                        sector_start = tgt_sector_start
                     else:
                         if tgt_sector_start != 0:
                             cls._free_sectors(free_sectors, tgt_sector_start, tgt_sector_count)
-                        write_pos = cls._allocate_space(free_sectors, required_sectors, tgt_f)
-                        sector_start = write_pos // 4096
-                        tgt_f.seek(write_pos)
-                        tgt_f.write(data_to_write.ljust(required_sectors * 4096, b'\x00'))
-                        new_offset = (sector_start << 8) | required_sectors
-                        tgt_f.seek(4 * offset_index)
-                        tgt_f.write(struct.pack('>I', new_offset))
-                        tgt_f.seek(4096 + 4 * offset_index)
-                        tgt_f.write(struct.pack('>I', src_data.get('timestamp', 1)))
-
-            except Exception:
-                server.logger.error(
-                    tr("other.error.chunk.restore_backup.process_region", region=region_file, path=tgt_region,
-                       error=traceback.format_exc()))
-                raise FatalError(restore=True)
+                        sector_start = cls._allocate_space(free_sectors, required_sectors, tgt_f) // 4096
+                    tgt_f.seek(sector_start * 4096)
+                    limiter.consume(len(padded_data))
+                    tgt_f.write(padded_data)
+                    new_offset = (sector_start << 8) | required_sectors
+                    tgt_f.seek(4 * offset_index)
+                    tgt_f.write(struct.pack('>I', new_offset))
+                    tgt_f.seek(4096 + 4 * offset_index)
+                    tgt_f.write(struct.pack('>I', timestamp))
             finally:
-                if src_f is not None:
-                    src_f.close()
                 if tgt_f is not None:
                     tgt_f.close()
+            job.chunks = None
+            return job
 
         try:
             max_workers = Config.max_workers if Config.max_workers > 0 else 4
         except Exception:
             max_workers = 4
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for region_file, chunk_list in region_to_chunks.items():
-                future = executor.submit(process_region, region_file, chunk_list)
-                futures.append(future)
+        pipeline = Pipeline('merge', initializer=io_utils.lower_thread_priority) \
+            .add_stage('read', read_region, workers=max_workers) \
+            .add_stage('pack', pack_region, workers=1) \
+            .add_stage('write', write_region, workers=max(max_workers // 2, 1))
+        for job in pipeline.run(_MergeJob(region_file, chunk_list) for region_file, chunk_list in region_to_chunks.items()):
+            if progress is not None:
+                progress.advance(regions=1, size=job.size)
 
-            for future in concurrent.futures.as_completed(futures):
-                future.result()
-
-    # ---------- 以下为原有辅助方法，未涉及空间优化，保持不变 ----------
     @classmethod
-    def _create_region_file(cls, output_path, chunks_data):
-        """通用创建方法，处理超大区块，返回 (区域文件大小, 外部文件总大小)"""
+    def _build_region_file(cls, region_path, chunks_data) -> RegionImage:
+        """在内存中组装区域文件（处理超大区块）并计算校验和，不写入文件"""
         # 解析区域坐标
-        region_x, region_z = cls._parse_region_filename(output_path)
+        region_x, region_z = cls._parse_region_filename(region_path)
 
         header = bytearray(8192)
         data_sectors = bytearray()
         current_sector = 2
-        external_total = 0  # 累计外部文件大小
+        external_files = {}
+        files = {}
+        chunks = {}
 
         for (local_x, local_z), data in chunks_data.items():
             offset_index = 4 * (local_x + local_z * 32)
@@ -394,14 +803,12 @@ class Chunk:
                 compression_type = data['compression_type']
                 chunk_data = data['data']
                 if data.get("actual_compression"):
-                    # 超大区块，创建外部文件
+                    # 超大区块，数据写入外部文件
                     global_x = region_x * 32 + local_x
                     global_z = region_z * 32 + local_z
                     mcc_filename = f"c.{global_x}.{global_z}.mcc"
-                    mcc_path = os.path.join(os.path.dirname(output_path), mcc_filename)
-                    with open(mcc_path, 'wb') as mcc_f:
-                        mcc_f.write(chunk_data)
-                    external_total += len(chunk_data)  # 累加外部文件大小
+                    external_files[mcc_filename] = chunk_data
+                    files[mcc_filename] = chunks[f"{global_x},{global_z}"] = Checksum.digest(chunk_data)
 
                     marker_data = struct.pack('>I', 1) + bytes([data['compression_type']])
                     sectors_needed = (len(marker_data) + 4095) // 4096
@@ -431,14 +838,89 @@ class Chunk:
 
                     data_sectors += padded_data
                     current_sector += sectors_needed
+                    chunks[f"{region_x * 32 + local_x},{region_z * 32 + local_z}"] = Checksum.digest(chunk_data)
 
+        hasher = Checksum.hasher()
+        hasher.update(header)
+        hasher.update(data_sectors)
+        files[os.path.basename(region_path)] = hasher.hexdigest()
+        return RegionImage(bytes(header), bytes(data_sectors), external_files, files, chunks)
+
+    @classmethod
+    def _write_region_file(cls, output_path, image: RegionImage):
+        """写出 _build_region_file 组装的区域文件与外部区块文件，返回 (区域文件大小, 外部文件总大小)"""
+        background = io_utils.background_io()
+        limiter = io_utils.IoLimiter.get()
+        external_total = 0  # 累计外部文件大小
+        for mcc_filename, chunk_data in image.external_files.items():
+            limiter.consume(len(chunk_data))
+            with open(os.path.join(os.path.dirname(output_path), mcc_filename), 'wb') as mcc_f:
+                mcc_f.write(chunk_data)
+                if background:
+                    io_utils.drop_cache(mcc_f, written=True)
+            external_total += len(chunk_data)
+
+        limiter.consume(len(image.header) + len(image.data_sectors))
         with open(output_path, 'wb') as f:
-            f.write(header)
-            f.write(data_sectors)
+            f.write(image.header)
+            f.write(image.data_sectors)
+            if background:
+                io_utils.drop_cache(f, written=True)
 
-        region_size = len(header) + len(data_sectors)
+        region_size = len(image.header) + len(image.data_sectors)
         return region_size, external_total
 
+    @classmethod
+    def trim_region_file(cls, src, dst, hasher=None) -> Optional[int]:
+        """
+        精简复制区域文件：只写入位置表仍引用的区块数据，按位置表顺序紧凑排列，
+        丢弃服务器重新分配区块后留下的空闲扇区与区块末尾多余的扇区，返回写入的字节数。
+        区块数据原样复制（外部区块只复制区域文件中的标记，.mcc 文件由调用方另行复制），时间戳表不变。
+        文件名不是区域文件、文件头不完整或位置表条目越界/长度不合法时不写入 dst 并返回 None，由调用方按普通文件复制。
+        hasher 不为 None 时以写出的内容更新。
+        """
+        if cls._parse_region_filename(src) is None:
+            return None
+        limiter = io_utils.IoLimiter.get()
+        with open(src, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            header = f.read(cls.HEADER_SIZE)
+            if len(header) < cls.HEADER_SIZE:
+                return None
+            new_header = bytearray(header)
+            body = bytearray()
+            current_sector = 2
+            for index, location in enumerate(struct.unpack('>1024I', header[:cls.SECTOR_SIZE])):
+                if location == 0:
+                    continue
+                sector_start, sector_count = location >> 8, location & 0xFF
+                if sector_start < 2 or sector_count == 0 or sector_start * cls.SECTOR_SIZE + 5 > file_size:
+                    return None
+                f.seek(sector_start * cls.SECTOR_SIZE)
+                limiter.consume(sector_count * cls.SECTOR_SIZE)
+                data = f.read(sector_count * cls.SECTOR_SIZE)
+                length = struct.unpack('>I', data[:4])[0]
+                if length < 1 or 4 + length > len(data):
+                    return None
+                sectors_needed = (4 + length + cls.SECTOR_SIZE - 1) // cls.SECTOR_SIZE
+                body += data[:4 + length].ljust(sectors_needed * cls.SECTOR_SIZE, b'\x00')
+                new_header[4 * index:4 * index + 4] = struct.pack('>I', (current_sector << 8) | sectors_needed)
+                current_sector += sectors_needed
+            if io_utils.background_io():
+                io_utils.drop_cache(f)
+
+        limiter.consume(len(new_header) + len(body))
+        with open(dst, 'wb') as f:
+            f.write(new_header)
+            f.write(body)
+            if io_utils.background_io():
+                io_utils.drop_cache(f, written=True)
+        shutil.copystat(src, dst)
+        if hasher is not None:
+            hasher.update(new_header)
+            hasher.update(body)
+        return len(new_header) + len(body)
+
     @classmethod
     def _parse_region_filename(cls, region_filename):
         base = os.path.basename(region_filename)
@@ -448,11 +930,37 @@ class Chunk:
             region_z = int(parts[2])
             return region_x, region_z
 
+    @classmethod
+    def find_damaged_chunks(cls, region_path, digests):
+        """
+        按索引中记录的区块校验和（"x,z" → 摘要）逐个读取区块，返回数据缺失、截断或与校验和不符的区块坐标
+        """
+        damaged = []
+        with open(region_path, 'rb') as f:
+            for coord, digest in digests.items():
+                x, z = map(int, coord.split(','))
+                data = cls._read_chunk_data(region_path, x, z, file_obj=f)
+                if not isinstance(data, dict) or Checksum.digest(data['data']) != digest:
+                    damaged.append(coord)
+        return damaged
+
+    @classmethod
+    def _parse_external_region(cls, mcc_filename):
+        """外部区块文件 c.x.z.mcc 所属区域的坐标，不是外部区块文件时返回 None"""
+        parts = os.path.basename(mcc_filename).split('.')
+        if len(parts) == 4 and parts[0] == "c" and parts[3] == "mcc":
+            try:
+                return int(parts[1]) >> 5, int(parts[2]) >> 5
+            except ValueError:
+                return None
+        return None
+
     @classmethod
     def _read_chunk_data(cls, region_file_path, chunk_x, chunk_z, file_obj=None):
         """
         读取区块的原始压缩数据及时间戳，自动处理外部超大区块。
         如果提供了 file_obj，则使用该已打开的文件对象进行读取（不会关闭）。
+        读取区块数据前经过 IoLimiter 限速。
         """
         local_x = chunk_x % 32
         local_z = chunk_z % 32
@@ -493,6 +1001,7 @@ class Chunk:
             mcc_path = os.path.join(os.path.dirname(region_file_path), mcc_filename)
             if not os.path.exists(mcc_path):
                 return None
+            io_utils.IoLimiter.get().consume(os.path.getsize(mcc_path))
             with open(mcc_path, 'rb') as mcc_f:
                 compressed_data = mcc_f.read()
             # 读取时间戳
@@ -510,6 +1019,7 @@ class Chunk:
             # 普通区块，继续读取数据
             if length < 1:
                 return None
+            io_utils.IoLimiter.get().consume(min(length - 1, num_sectors * 4096))  # 损坏的长度字段不应导致长时间等待
             compressed_data = f.read(length - 1)
             if len(compressed_data) != length - 1:
                 return None
@@ -10,20 +10,28 @@ class ChunkSelector:
     创建方式：
     1. 两点坐标模式：传入 Points 对象（包含 p1, p2 两个 Point2D 对象）
     2. 中心点+半径模式：传入 Point2D 对象，并指定 radius 参数
-    3. 通过加法合并多个选择器
-    4. 通过 from_index 从索引文件创建
+    3. 通过加法合并多个选择器（合并结果的矩形互不重叠）
+    4. 通过 from_circle / from_polygon 创建圆形或多边形选区（按行拆分为矩形，流程与矩形选区一致）
+    5. 通过 from_shape 从 info.json 中记录的形状还原
 
     参数：
     point : Point2D 或 Points 对象
     radius : int，当 point 为 Point2D 时必须提供，表示半径（区块个数）
     max_chunk_size : 最大允许区块边长（默认51，即51x51的区域）
     ignore_size_limit : 是否跳过尺寸检查（默认False）
+
+    区域内的选区以 1024 位整数掩码表示，第 local_x + local_z * 32 位对应区域内的一个区块，
+    覆盖、并集与计数均为少量大整数运算。
     """
+    REGION_SIZE = 32
+    FULL_REGION_MASK = (1 << 1024) - 1  # 整个区域被选中时的掩码
+    _ROW_MASK = (1 << 32) - 1  # 单行（32 个区块）全选的掩码
 
     def __init__(self, point, radius=None, max_chunk_size=51, ignore_size_limit=False):
         self.max_chunk_size = max_chunk_size
         self.ignore_size_limit = ignore_size_limit
         self.radius = radius
+        self.shape = None  # 非矩形选区的形状描述，见 to_shape()
         self._rectangles = []  # 存储矩形列表，每个矩形为 (min_x, min_z, max_x, max_z)
         self._validate_input(point)
         self._update_bounds()
@@ -97,11 +105,162 @@ class ChunkSelector:
         obj.max_chunk_size = max_chunk_size
         obj.ignore_size_limit = ignore_size_limit
         obj.radius = None
+        obj.shape = None
         obj.mode = 'multi'
-        obj._rectangles = rectangles
+        obj._rectangles = cls.normalize_rectangles(rectangles)
         obj._update_bounds()
         return obj
 
+    @classmethod
+    def combine(cls, selectors):
+        """合并多个选区为一个选区，重叠部分只保留一次"""
+        rects = []
+        for sel in selectors:
+            rects.extend(sel._rectangles)
+        first_sel = selectors[0]
+        return cls._from_rectangles(rects, first_sel.max_chunk_size, first_sel.ignore_size_limit)
+
+    @classmethod
+    def count_chunks(cls, selectors):
+        """统计多个选区合并后的区块总数（重叠部分只计一次），可用于规划与界面展示"""
+        masks = cls.union_masks(*(sel.to_region_masks() for sel in selectors if isinstance(sel, cls)))
+        return sum(cls.count_mask_chunks(mask) for mask in masks.values())
+
+    @staticmethod
+    def normalize_rectangles(rectangles):
+        """
+        扫描线求矩形并集，返回互不重叠的矩形列表 [(min_x, min_z, max_x, max_z), ...]。
+        沿 x 轴在所有矩形边界处切分竖条，每个竖条内合并 z 区间，
+        相邻且 z 区间完全相同的竖条再合并为同一个矩形。
+        """
+        if not rectangles:
+            return []
+
+        # 所有竖条的分界点（左边界与右边界+1）
+        xs = sorted({r[0] for r in rectangles} | {r[2] + 1 for r in rectangles})
+        by_min_x = sorted(rectangles, key=lambda r: r[0])
+        next_idx = 0
+        active = []
+
+        result = []
+        open_rects = {}  # (min_z, max_z) -> 当前仍在延伸的矩形起始 x
+        for i in range(len(xs) - 1):
+            slab_start = xs[i]
+
+            # 更新活动矩形：加入从该竖条开始的，移除已在左侧结束的
+            while next_idx < len(by_min_x) and by_min_x[next_idx][0] <= slab_start:
+                active.append(by_min_x[next_idx])
+                next_idx += 1
+            active = [r for r in active if r[2] >= slab_start]
+
+            # 合并竖条内的 z 区间（相邻区间也合并）
+            intervals = []
+            for _, min_z, _, max_z in sorted(active, key=lambda r: r[1]):
+                if intervals and min_z <= intervals[-1][1] + 1:
+                    if max_z > intervals[-1][1]:
+                        intervals[-1][1] = max_z
+                else:
+                    intervals.append([min_z, max_z])
+            current = {(a, b) for a, b in intervals}
+
+            # 与上一竖条不同的区间结束延伸，新出现的区间开始延伸
+            for key in list(open_rects):
+                if key not in current:
+                    result.append((open_rects.pop(key), key[0], slab_start - 1, key[1]))
+            for key in current:
+                if key not in open_rects:
+                    open_rects[key] = slab_start
+
+        last_x = xs[-1] - 1
+        for (min_z, max_z), start_x in open_rects.items():
+            result.append((start_x, min_z, last_x, max_z))
+        result.sort()
+        return result
+
+    @classmethod
+    def from_circle(cls, point, radius, max_chunk_size=51, ignore_size_limit=False):
+        """
+        以 point 所在区块为圆心创建圆形选区。
+        区块中心到圆心区块中心的距离不超过 radius + 0.5 个区块时被选中，即 dx² + dz² <= radius² + radius。
+        """
+        actual_size = 2 * radius + 1
+        if not ignore_size_limit and actual_size > max_chunk_size:
+            raise MaxChunkRadius(radius, actual_size, max_chunk_size)
+        center_x, center_z = math.floor(point.x / 16), math.floor(point.z / 16)
+        return cls._circle_from_chunk(center_x, center_z, radius, max_chunk_size, ignore_size_limit)
+
+    @classmethod
+    def _circle_from_chunk(cls, center_x, center_z, radius, max_chunk_size, ignore_size_limit):
+        limit = radius * radius + radius
+        rects = []
+        for dz in range(-radius, radius + 1):
+            half = math.isqrt(limit - dz * dz)
+            rects.append((center_x - half, center_z + dz, center_x + half, center_z + dz))
+        obj = cls._from_rectangles(rects, max_chunk_size, ignore_size_limit)
+        obj.mode = 'circle'
+        obj.radius = radius
+        obj.shape = {"type": "circle", "center": [center_x, center_z], "radius": radius}
+        return obj
+
+    @classmethod
+    def from_polygon(cls, points, max_chunk_size=51, ignore_size_limit=False):
+        """
+        通过多边形顶点（世界坐标 [(x, z), ...]，至少 3 个）创建多边形选区。
+        区块中心点落在多边形内（奇偶规则）的区块被选中。
+        """
+        points = [(float(x), float(z)) for x, z in points]
+        if len(points) < 3:
+            raise ValueError("多边形至少需要 3 个顶点")
+
+        min_x = math.floor(min(p[0] for p in points) / 16)
+        max_x = math.floor(max(p[0] for p in points) / 16)
+        min_z = math.floor(min(p[1] for p in points) / 16)
+        max_z = math.floor(max(p[1] for p in points) / 16)
+        width = max_x - min_x + 1
+        height = max_z - min_z + 1
+        if not ignore_size_limit and (width > max_chunk_size or height > max_chunk_size):
+            raise MaxChunkLength(max_chunk_size, width, height)
+
+        rects = []
+        edges = list(zip(points, points[1:] + points[:1]))
+        for chunk_z in range(min_z, max_z + 1):
+            # 扫描线经过该行区块的中心
+            line_z = chunk_z * 16 + 8
+            crossings = []
+            for (x1, z1), (x2, z2) in edges:
+                if (z1 <= line_z) != (z2 <= line_z):
+                    crossings.append(x1 + (line_z - z1) * (x2 - x1) / (z2 - z1))
+            crossings.sort()
+            for left, right in zip(crossings[::2], crossings[1::2]):
+                # 中心点 x*16+8 位于 [left, right] 内的区块列
+                first = math.ceil((left - 8) / 16)
+                last = math.floor((right - 8) / 16)
+                if first <= last:
+                    rects.append((first, chunk_z, last, chunk_z))
+
+        obj = cls._from_rectangles(rects, max_chunk_size, ignore_size_limit)
+        obj.mode = 'polygon'
+        obj.shape = {"type": "polygon", "points": [[x, z] for x, z in points]}
+        return obj
+
+    @classmethod
+    def from_shape(cls, shape, max_chunk_size=51, ignore_size_limit=False):
+        """根据 to_shape() 的结果还原圆形或多边形选区"""
+        if shape["type"] == "circle":
+            center_x, center_z = shape["center"]
+            return cls._circle_from_chunk(center_x, center_z, shape["radius"], max_chunk_size, ignore_size_limit)
+        elif shape["type"] == "polygon":
+            return cls.from_polygon(shape["points"], max_chunk_size, ignore_size_limit)
+        raise ValueError(f"未知的选区形状: {shape['type']}")
+
+    def to_shape(self):
+        """
+        返回用于写入 info.json 的紧凑形状描述，矩形选区返回 None（由四角坐标描述）。
+        圆形：{"type": "circle", "center": [区块x, 区块z], "radius": r}
+        多边形：{"type": "polygon", "points": [[x, z], ...]}（世界坐标）
+        """
+        return self.shape
+
     def _iter_chunks(self):
         """生成器，依次产生选区内的所有区块坐标 (x, z)"""
         for min_x, min_z, max_x, max_z in self._rectangles:
@@ -131,36 +290,22 @@ class ChunkSelector:
     def to_index(self):
         """将当前选区转换为按区域分组的索引字典"""
 
-        # 按区域收集子矩形
+        # 按区域收集子矩形，同时累积区域掩码
         region_rects = defaultdict(list)  # 键: 区域文件名, 值: 子矩形列表
+        region_masks = defaultdict(int)  # 键: 区域文件名, 值: 区域掩码
 
-        for (min_x, min_z, max_x, max_z) in self._rectangles:
-            # 计算矩形覆盖的区域范围
-            r_min_x = min_x // 32
-            r_max_x = max_x // 32
-            r_min_z = min_z // 32
-            r_max_z = max_z // 32
-
-            for rx in range(r_min_x, r_max_x + 1):
-                for rz in range(r_min_z, r_max_z + 1):
-                    # 计算该矩形在当前区域内的子矩形
-                    sub_min_x = max(min_x, rx * 32)
-                    sub_max_x = min(max_x, rx * 32 + 31)
-                    sub_min_z = max(min_z, rz * 32)
-                    sub_max_z = min(max_z, rz * 32 + 31)
-
-                    if sub_min_x <= sub_max_x and sub_min_z <= sub_max_z:
-                        region_key = f"r.{rx}.{rz}.mca"
-                        region_rects[region_key].append((sub_min_x, sub_min_z, sub_max_x, sub_max_z))
+        for rect in self._rectangles:
+            for region_key, sub_rect in self._split_rectangle_to_regions(rect):
+                region_rects[region_key].append(sub_rect)
+                region_masks[region_key] |= self._rect_mask(sub_rect)
 
         result = {}
         for region_key, rects in region_rects.items():
             # 检查该区域是否被完全覆盖（即所有区块都被选中）
-            if self._is_region_fully_covered(rects):
+            if region_masks[region_key] == self.FULL_REGION_MASK:
                 result[region_key] = {"rectangles": region_key}
             else:
-                rect_list = [(sx, sz, ex, ez) for (sx, sz, ex, ez) in rects]  # 直接使用元组列表
-                result[region_key] = {"rectangles": rect_list}
+                result[region_key] = {"rectangles": rects}
 
         return result
 
@@ -193,17 +338,22 @@ class ChunkSelector:
         合并多个选区，返回按区域分组的矩形信息。
         返回值格式：{区域文件名: 矩形列表 或 区域文件名}
         """
-        region_rects = defaultdict(list)  # 区域 -> 矩形列表
+        all_rects = []
         for sel in selectors:
-            for rect in sel._rectangles:
-                for region_key, sub_rect in cls._split_rectangle_to_regions(rect):
-                    region_rects[region_key].append(sub_rect)
+            all_rects.extend(sel._rectangles)
+
+        # 先求并集得到互不重叠的矩形，保证每个区块只被处理一次
+        region_rects = defaultdict(list)  # 区域 -> 矩形列表
+        for rect in cls.normalize_rectangles(all_rects):
+            for region_key, sub_rect in cls._split_rectangle_to_regions(rect):
+                region_rects[region_key].append(sub_rect)
 
-        # 合并每个区域内的矩形并判断是否全覆盖
+        # 各选区（如 custom 备份的多个子备份）的区域掩码求并集，按掩码判断每个区域是否全覆盖
+        region_masks = cls.union_masks(*(sel.to_region_masks() for sel in selectors))
         result = {}
         for region_key, rects in region_rects.items():
-            # 计算该区域内所有被覆盖的区块总数
-            if cls._is_region_fully_covered(rects):
+            rx, rz = rects[0][0] // cls.REGION_SIZE, rects[0][1] // cls.REGION_SIZE
+            if region_masks.get((rx, rz)) == cls.FULL_REGION_MASK:
                 result[region_key] = region_key
             else:
                 result[region_key] = rects  # 保持原样（矩形列表）
@@ -269,64 +419,72 @@ class ChunkSelector:
                 }]
                 continue
 
-            # 收集所有选择器的矩形（转换为方块坐标）
-            block_rects = []
+            # 在区块坐标下求所有选择器矩形的精确并集（互不重叠、不包含选区外的区块），再转换为方块坐标
+            chunk_rects = []
             for sel in selectors:
                 if not isinstance(sel, cls):
                     continue  # 忽略非选择器对象
-                for min_x, min_z, max_x, max_z in sel._rectangles:
-                    x1 = min_x * 16
-                    x2 = max_x * 16 + 15
-                    z1 = min_z * 16
-                    z2 = max_z * 16 + 15
-                    block_rects.append((x1, x2, z1, z2))
+                chunk_rects.extend(sel._rectangles)
 
-            # 合并矩形
-            merged = cls._merge_block_rectangles(block_rects)
-            result[dim_name] = merged
+            result[dim_name] = [
+                {'x1': min_x * 16, 'x2': max_x * 16 + 15, 'z1': min_z * 16, 'z2': max_z * 16 + 15}
+                for min_x, min_z, max_x, max_z in cls.normalize_rectangles(chunk_rects)
+            ]
 
         return result
 
+    # ---------- 区域掩码 ----------
+    @classmethod
+    def _rect_mask(cls, rect):
+        """
+        将位于同一区域内的子矩形 (min_x, min_z, max_x, max_z)（全局区块坐标）转换为区域掩码。
+        先构造单行掩码，再乘以行重复因子一次性铺满所有行，行之间互不进位。
+        """
+        min_x, min_z, max_x, max_z = rect
+        local_x = min_x % cls.REGION_SIZE
+        local_z = min_z % cls.REGION_SIZE
+        width = max_x - min_x + 1
+        height = max_z - min_z + 1
+        row = ((1 << width) - 1) << local_x
+        repeat = ((1 << (32 * height)) - 1) // cls._ROW_MASK  # 每行最低位为 1 的重复因子
+        return (row * repeat) << (32 * local_z)
+
+    @classmethod
+    def _build_region_masks(cls, rectangles):
+        """将任意矩形列表转换为 {(区域X, 区域Z): 区域掩码} 字典"""
+        masks = defaultdict(int)
+        for rect in rectangles:
+            for region_key, sub_rect in cls._split_rectangle_to_regions(rect):
+                rx, rz = sub_rect[0] // cls.REGION_SIZE, sub_rect[1] // cls.REGION_SIZE
+                masks[(rx, rz)] |= cls._rect_mask(sub_rect)
+        return dict(masks)
+
+    def to_region_masks(self):
+        """返回当前选区的 {(区域X, 区域Z): 区域掩码} 字典"""
+        return self._build_region_masks(self._rectangles)
+
     @staticmethod
-    def _merge_block_rectangles(rects):
-        """合并重叠或相邻的轴对齐矩形（方块坐标）。一次扫描合并，无需多次迭代。"""
-        if not rects:
-            return []
-        # 按 x1 排序
-        rects.sort(key=lambda r: (r[0], r[1]))
-        merged = []
-        cur = list(rects[0])  # 当前合并中的矩形
-        for r in rects[1:]:
-            # 检查是否可合并：x 方向重叠或相邻，且 z 方向重叠或相邻
-            if (cur[1] >= r[0] - 1 and cur[0] <= r[1] + 1) and (max(cur[2], r[2]) <= min(cur[3], r[3]) + 1):
-                # 合并
-                cur[0] = min(cur[0], r[0])
-                cur[1] = max(cur[1], r[1])
-                cur[2] = min(cur[2], r[2])
-                cur[3] = max(cur[3], r[3])
-            else:
-                merged.append(tuple(cur))
-                cur = list(r)
-        merged.append(tuple(cur))
-        # 转换为字典格式
-        return [{'x1': x1, 'x2': x2, 'z1': z1, 'z2': z2} for x1, x2, z1, z2 in merged]
+    def union_masks(*mask_dicts):
+        """求多个 {(区域X, 区域Z): 区域掩码} 字典的并集"""
+        result = defaultdict(int)
+        for masks in mask_dicts:
+            for key, mask in masks.items():
+                result[key] |= mask
+        return dict(result)
 
     @staticmethod
-    def _is_region_fully_covered(rects):
-        """
-        判断给定的矩形列表（均为该区域内的子矩形，坐标范围为全局区块坐标）是否完全覆盖整个 32x32 区域。
-        返回 bool。
-        """
-        bitmap = bytearray(128)  # 1024 bits
-        for sx, sz, ex, ez in rects:
-            # 遍历矩形内的每个区块
-            for x in range(sx, ex + 1):
-                for z in range(sz, ez + 1):
-                    local_x = x % 32
-                    local_z = z % 32
-                    idx = local_x + local_z * 32
-                    byte_idx = idx >> 3
-                    bit_idx = idx & 7
-                    bitmap[byte_idx] |= (1 << bit_idx)
-        # 检查所有位是否都为 1
-        return all(b == 0xFF for b in bitmap)
+    def count_mask_chunks(mask):
+        """统计掩码中被选中的区块数"""
+        return bin(mask).count('1')
+
+    @classmethod
+    def iter_mask_chunks(cls, region_x, region_z, mask):
+        """按 (x, z) 全局区块坐标依次产生掩码中被选中的区块"""
+        base_x = region_x * cls.REGION_SIZE
+        base_z = region_z * cls.REGION_SIZE
+        for local_z in range(cls.REGION_SIZE):
+            row = (mask >> (32 * local_z)) & cls._ROW_MASK
+            while row:
+                low = row & -row
+                yield base_x + low.bit_length() - 1, base_z + local_z
+                row ^= low
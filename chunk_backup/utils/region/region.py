@@ -1,13 +1,19 @@
 import os
 import json
 import shutil
+from pathlib import Path
+from typing import List
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from chunk_backup.exceptions import FatalError
+from chunk_backup.exceptions import FatalError, BackupInterrupted
 from chunk_backup.mcdr_globals import server
 from chunk_backup.utils.mcdr_utils import tr
 from chunk_backup.types.backup_info import BackupInfo
+from chunk_backup.types.cost_estimate import CostEstimate
 from chunk_backup.utils.backup_utils import BackupFolderManager as Manager
+from chunk_backup.utils import io_utils
+from chunk_backup.utils.integrity import Checksum
 from chunk_backup.utils.region.chunk import Chunk as chunk
+from chunk_backup.utils.region.chunk_selector import ChunkSelector
 from chunk_backup.config.config import Config
 
 
@@ -18,12 +24,13 @@ class Region:
     """
 
     @staticmethod
-    def restore_regions(manager: Manager, backup_info: BackupInfo):
+    def restore_regions(manager: Manager, backup_info: BackupInfo, progress=None):
         """
         从备份槽位恢复区域文件到服务器世界目录。
 
         :param manager: BackupFolderManager 实例，提供路径配置信息
         :param backup_info: BackupInfo 对象，包含要恢复的备份元数据（如维度、选择器等）
+        :param progress: 可选，ProgressReporter，用于上报已处理的区域数与数据量
         :return: 始终返回 True（若过程中发生异常，由上层捕获）
         """
         tasks = []  # 任务列表，每个元素为 (source, target, selector)
@@ -46,7 +53,7 @@ class Region:
                 tasks.append((source, target, selector))
 
         # 使用线程池并发处理恢复任务，最大并发数设为2（可调整）
-        with ThreadPoolExecutor(max_workers=2) as executor:
+        with ThreadPoolExecutor(max_workers=2, initializer=io_utils.lower_thread_priority) as executor:
             futures = []
             for source, target, selector in tasks:
                 # 确保目标目录存在（主线程中预先创建）
@@ -68,7 +75,8 @@ class Region:
                             Region.safe_copytree,
                             source,
                             target,
-                            exclude=['index.json']  # 恢复时排除索引文件
+                            exclude=['index.json'],  # 恢复时排除索引文件
+                            progress=progress
                         )
                     )
                 else:
@@ -78,7 +86,8 @@ class Region:
                             chunk.merge_region_file,
                             source,
                             target,
-                            selector
+                            selector,
+                            progress=progress
                         )
                     )
 
@@ -89,14 +98,65 @@ class Region:
         return True
 
     @staticmethod
-    def export_regions(manager: Manager, backup_info: BackupInfo, is_overwrite=False):
+    def estimate_regions(manager: Manager, backup_info: BackupInfo, from_backup=False) -> CostEstimate:
+        """
+        只读取区域文件头，预估备份（或回档）需要处理的数据量。
+
+        :param manager: BackupFolderManager 实例
+        :param backup_info: BackupInfo 对象，需已设置 dimension 与 selector
+        :param from_backup: 为 True 时统计备份槽位中的数据（回档），否则统计世界目录中的数据（备份）
+        :return: CostEstimate，不含预计耗时
+        """
+        estimate = CostEstimate()
+
+        if from_backup:
+            root = manager.storage_root / (Config.get().overwrite_storage if manager.backup_slot == Config.get().overwrite_storage else manager.region_storage / manager.backup_slot)
+        else:
+            root = manager.server_root
+
+        for dimension in backup_info.dimension:
+            world_name = manager.config.backup.dimension[dimension]["world_name"]
+            region_folder = manager.config.backup.dimension[dimension]["region_folder"]
+            selector = backup_info.selector[dimension]
+
+            for folder in region_folder:
+                estimate.add(*chunk.estimate_region_dir(root / world_name / folder, selector))
+
+        return estimate
+
+    @staticmethod
+    def get_watch_paths(manager: Manager, backup_info: BackupInfo) -> List[Path]:
+        """
+        返回备份需要读取的世界文件，用于判断保存是否完成：整维度备份返回区域文件夹，按区块备份只返回涉及的区域文件。
+        """
+        paths = []
+        for dimension in backup_info.dimension:
+            world_name = manager.config.backup.dimension[dimension]["world_name"]
+            region_folder = manager.config.backup.dimension[dimension]["region_folder"]
+            selector = backup_info.selector[dimension]
+
+            for folder in region_folder:
+                source = manager.server_root / world_name / folder
+                if selector[0] == "all":
+                    paths.append(source)
+                else:
+                    for rx, rz in ChunkSelector.combine(selector).to_region_masks():
+                        paths.append(source / f"r.{rx}.{rz}.mca")
+        return paths
+
+    @staticmethod
+    def export_regions(manager: Manager, backup_info: BackupInfo, is_overwrite=False, interrupt_event=None, progress=None, fingerprints=None):
         """
         将世界区域文件导出到备份槽位。
 
         :param manager: BackupFolderManager 实例
         :param backup_info: 可以是字典（包含 'dimension', 'selector' 等键）或 BackupInfo 对象
         :param is_overwrite: 是否为覆盖备份（即写入 "overwrite" 目录，而非常规槽位）
+        :param interrupt_event: 可选，被设置后在处理完当前区域文件/文件后抛出 BackupInterrupted
+        :param progress: 可选，ProgressReporter，用于上报已处理的区域数与数据量
+        :param fingerprints: 可选，不为 None 时视为服务器仍在写入（边运行边复制），记录每个源文件复制时的状态供 verify_regions 校验
         :return: 无返回值，但会修改 info 对象，添加 'total_size' 字段（如果是字典）或设置 total_size 属性（如果是 BackupInfo）
+        每个区域文件夹的 index.json 会记录复制时计算的文件（及区块）校验和，供后台校验使用。
         """
         tasks = []
         total_size = 0
@@ -122,7 +182,7 @@ class Region:
                 tasks.append((source, target, _selector))
 
         # 使用线程池并发导出，最大并发数2
-        with ThreadPoolExecutor(max_workers=2) as executor:
+        with ThreadPoolExecutor(max_workers=2, initializer=io_utils.lower_thread_priority) as executor:
             futures = []
             for source, target, selector in tasks:
                 # 确保目标目录存在
@@ -132,14 +192,20 @@ class Region:
                 if selector[0] == "all":
                     # 全量复制目录（备份时包含所有文件，不需要排除）
                     os.makedirs(source, exist_ok=True)
+                    checksums = {}
                     future = executor.submit(
                         Region.safe_copytree,
                         source,
                         target,
-                        exclude=None  # 备份时复制所有文件，包括之后要创建的索引
+                        exclude=None,  # 备份时复制所有文件，包括之后要创建的索引
+                        interrupt_event=interrupt_event,
+                        progress=progress,
+                        fingerprints=fingerprints,
+                        checksums=checksums,
+                        trim=manager.config.backup.trim_regions
                     )
                     # 在 future 完成后，需要在目标目录创建索引文件
-                    futures.append((future, target))
+                    futures.append((future, target, checksums))
                 else:
                     # 按选择器分组导出区块（内部会生成 index.json）
                     futures.append(
@@ -147,25 +213,147 @@ class Region:
                             chunk.export_grouped_regions,
                             source,
                             target,
-                            selector
-                        ), None)
+                            selector,
+                            interrupt_event=interrupt_event,
+                            progress=progress,
+                            fingerprints=fingerprints
+                        ), target, None)
                     )
 
             # 收集各任务返回的大小，累加到 total_size，并创建索引
-            for future, target_dir in futures:
-                size = future.result()
-                total_size += size
-                if target_dir is not None:
-                    # 全量复制任务：在目标目录创建 index.json
-                    index_path = target_dir / "index.json"
-                    with open(index_path, 'w', encoding='utf-8') as f:
-                        json.dump({"type": "region"}, f)
+            try:
+                for future, target_dir, checksums in futures:
+                    size = future.result()
+                    total_size += size
+                    if checksums is not None:
+                        # 全量复制任务：在目标目录创建 index.json，记录各文件的校验和
+                        index_path = target_dir / "index.json"
+                        files = {Checksum.relative(path, target_dir): digest for path, digest in sorted(checksums.items())}
+                        with open(index_path, 'w', encoding='utf-8') as f:
+                            json.dump({"type": "region", "checksum": Checksum.ALGORITHM, "files": files}, f)
+                    # 每个区域文件夹写完后统一写回一次并移出页缓存
+                    io_utils.drop_tree_cache(target_dir)
+            except BackupInterrupted:
+                for future, _, _ in futures:
+                    future.cancel()
+                raise
 
         # 将总大小写回 info 对象
         backup_info.total_size = total_size
 
     @staticmethod
-    def safe_copytree(source, target, exclude=None):
+    def verify_regions(manager: Manager, backup_info: BackupInfo, fingerprints, is_overwrite=False, interrupt_event=None) -> int:
+        """
+        边运行边复制的最终校验，应在关闭自动保存并完成保存后调用。
+        与 export_regions 记录的状态比较，只重新复制之后有变化的文件/区域，并重新统计备份大小。
+
+        :param fingerprints: export_regions 记录的源文件状态
+        :return: 重新复制的文件与区域文件数
+        """
+        backup_slot = Config.get().overwrite_storage if is_overwrite else manager.region_storage / manager.backup_slot
+        recopied = 0
+
+        for dimension in backup_info.dimension:
+            world_name = manager.config.backup.dimension[dimension]["world_name"]
+            region_folder = manager.config.backup.dimension[dimension]["region_folder"]
+            selector = backup_info.selector[dimension]
+
+            for folder in region_folder:
+                source = manager.server_root / world_name / folder
+                target = manager.storage_root / backup_slot / world_name / folder
+                if selector[0] == "all":
+                    changes = {}
+                    recopied += Region.sync_changed_files(
+                        source, target, fingerprints, keep=['index.json'], checksums=changes,
+                        trim=manager.config.backup.trim_regions
+                    )
+                    Checksum.update_index(target, changes)
+                else:
+                    recopied += chunk.reexport_changed_regions(source, target, selector, fingerprints, interrupt_event=interrupt_event)
+                io_utils.drop_tree_cache(target)
+
+        total_size = 0
+        for root, _, files in os.walk(manager.storage_root / backup_slot):
+            for name in files:
+                total_size += os.path.getsize(os.path.join(root, name))
+        backup_info.total_size = total_size
+        return recopied
+
+    @staticmethod
+    def _stat_fingerprint(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    @staticmethod
+    def sync_changed_files(source, target, fingerprints, keep=None, checksums=None, trim=False) -> int:
+        """
+        重新复制与 fingerprints 中记录不一致（或之后新出现）的文件，并删除源目录中已不存在的文件。
+
+        :param keep: 可选，目标根目录中不在源目录里但需要保留的文件名（如 ['index.json']）
+        :param checksums: 可选，记录重新复制的文件（目标路径 → 校验和）与被删除的文件（目标路径 → None）
+        :param trim: 是否精简复制区域文件，应与首次复制时一致，使重新复制的文件与其余文件布局相同
+        :return: 重新复制的文件数
+        """
+        source, target = os.fspath(source), os.fspath(target)
+        recopied = 0
+        for root, _, files in os.walk(source):
+            dst_root = os.path.normpath(os.path.join(target, os.path.relpath(root, source)))
+            os.makedirs(dst_root, exist_ok=True)
+            for name in files:
+                src = os.path.join(root, name)
+                fingerprint = Region._stat_fingerprint(src)
+                if fingerprint is None or fingerprints.get(os.path.normpath(src)) == fingerprint:
+                    continue
+                Region._copy_file(src, os.path.join(dst_root, name), 0, checksums=checksums, trim=trim)
+                recopied += 1
+
+        for root, _, files in os.walk(target):
+            src_root = os.path.normpath(os.path.join(source, os.path.relpath(root, target)))
+            for name in files:
+                if keep and name in keep and os.path.normpath(root) == os.path.normpath(target):
+                    continue
+                if not os.path.exists(os.path.join(src_root, name)):
+                    os.remove(os.path.join(root, name))
+                    if checksums is not None:
+                        checksums[os.path.normpath(os.path.join(root, name))] = None
+        return recopied
+
+    @staticmethod
+    def _copy_file(src, dst, size, interrupt_event=None, progress=None, fingerprints=None, checksums=None, trim=False):
+        """复制单个文件，trim 为 True 时精简复制区域文件（见 Chunk.trim_region_file），返回写入的字节数"""
+        if interrupt_event is not None and interrupt_event.is_set():
+            raise BackupInterrupted()
+
+        def copy() -> int:
+            hasher = Checksum.hasher() if checksums is not None else None
+            written = chunk.trim_region_file(src, dst, hasher=hasher) if trim and src.endswith('.mca') else None
+            if written is None:
+                io_utils.copy_file(src, dst, hasher=hasher, block_size=Checksum.BLOCK_SIZE)
+                written = os.path.getsize(dst)
+            if hasher is not None:
+                checksums[os.path.normpath(dst)] = hasher.hexdigest()
+            return written
+
+        if fingerprints is None:
+            written = copy()
+        else:
+            # 服务器可能正在写入该文件，复制前后文件状态一致才记录，否则留给最终校验重新复制
+            fingerprints[os.path.normpath(src)] = None
+            for _ in range(chunk.LIVE_COPY_MAX_RETRY):
+                before = Region._stat_fingerprint(src)
+                written = copy()
+                if before is not None and before == Region._stat_fingerprint(src):
+                    fingerprints[os.path.normpath(src)] = before
+                    break
+        if progress is not None:
+            progress.advance(regions=1 if src.endswith('.mca') else 0, size=size)
+        return written
+
+    @staticmethod
+    def safe_copytree(source, target, exclude=None, interrupt_event=None, progress=None, fingerprints=None, checksums=None, trim=False):
         """
         使用线程池并发复制目录树，并统计总大小。
         若源目录为空，则删除目标目录并重新创建空目录。
@@ -173,7 +361,12 @@ class Region:
         :param source: 源目录路径
         :param target: 目标目录路径
         :param exclude: 可选，需要排除的文件名列表（如 ['index.json']）
-        :return: 复制的总字节数
+        :param interrupt_event: 可选，被设置后不再复制新的文件，取消未开始的任务并抛出 BackupInterrupted
+        :param progress: 可选，ProgressReporter，每复制完一个文件上报一次
+        :param fingerprints: 可选，不为 None 时按服务器仍在写入处理，复制到文件状态稳定并记录，供 sync_changed_files 校验
+        :param checksums: 可选，不为 None 时在复制的同时计算校验和，以目标文件路径为键记录
+        :param trim: 为 True 时区域文件只写入仍在使用的扇区（见 Chunk.trim_region_file），其余文件保持稀疏复制
+        :return: 写入的总字节数
         """
         # 确保目标目录存在
         os.makedirs(target, exist_ok=True)
@@ -210,27 +403,31 @@ class Region:
             return 0
 
         total_size = 0
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        with ThreadPoolExecutor(max_workers=max_workers, initializer=io_utils.lower_thread_priority) as executor:
             future_to_task = {}
             for task in copy_tasks:
                 if task[2]:  # 目录任务
                     src, dst, _ = task
                     # 递归调用时传递相同的 exclude 参数
-                    future = executor.submit(Region.safe_copytree, src, dst, exclude)
+                    future = executor.submit(Region.safe_copytree, src, dst, exclude, interrupt_event, progress, fingerprints, checksums, trim)
                 else:         # 文件任务
                     src, dst, _, size = task
-                    future = executor.submit(shutil.copy2, src, dst)
+                    future = executor.submit(Region._copy_file, src, dst, size, interrupt_event, progress, fingerprints, checksums, trim)
                 # 将 future 映射到 (src, dst, size)，便于在完成后获取信息
                 future_to_task[future] = (src, dst, size if not task[2] else None)
 
             # 处理完成的任务，累加大小
             for future in as_completed(future_to_task):
+                if interrupt_event is not None and interrupt_event.is_set():
+                    for f in future_to_task:
+                        f.cancel()
+                    raise BackupInterrupted()
                 src, dst, size = future_to_task[future]
                 if size is None:
                     # 目录任务：递归返回的大小
                     total_size += future.result()
                 else:
-                    # 文件任务：累加记录的文件大小
-                    total_size += size
+                    # 文件任务：累加实际写入的大小（精简复制的区域文件小于源文件）
+                    total_size += future.result()
 
         return total_size
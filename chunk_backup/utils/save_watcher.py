@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class WorldSaveWatcher:
+    """
+    轮询选中区域文件的大小与修改时间，保存指令发出后这些文件发生过变化、且之后持续 quiet_period 秒没有变化即视为保存完成。
+    作为 saved_world_regex 之外的第二个保存完成信号，两者先到者生效。
+    start() 时记录的状态作为基准，应在发出保存指令之前调用；在看到第一次变化之前不会开始计时，
+    此时保存完成只能由 saved_world_regex 或 save_world_max_wait 决定（服务端可能还没开始写入选中的区域文件）。
+    paths 中的目录会监视其中所有文件，文件不存在时视为状态 None。
+    """
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, paths: List[Path], on_quiescent: Callable[[], None], quiet_period: float):
+        self.paths = paths
+        self.on_quiescent = on_quiescent
+        self.quiet_period = quiet_period
+        self.__stop_event = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        self.__baseline: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def start(self):
+        self.__baseline = self.__snapshot()
+        self.__thread = threading.Thread(target=self.__run, name='ChunkBackup-SaveWatcher', daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+
+    def __snapshot(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        result = {}
+        for path in self.paths:
+            if path.is_dir():
+                try:
+                    with os.scandir(path) as entries:
+                        for entry in entries:
+                            if entry.is_file(follow_symlinks=False):
+                                st = entry.stat()
+                                result[entry.path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    pass
+                continue
+            try:
+                st = path.stat()
+                result[str(path)] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                result[str(path)] = None
+        return result
+
+    def __run(self):
+        last = self.__baseline
+        last_change: Optional[float] = None  # 看到第一次变化之前不计时
+        while not self.__stop_event.wait(self.POLL_INTERVAL):
+            current = self.__snapshot()
+            if current != last:
+                last = current
+                last_change = time.monotonic()
+            elif last_change is not None and time.monotonic() - last_change >= self.quiet_period:
+                self.on_quiescent()
+                return
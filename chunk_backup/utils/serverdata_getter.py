@@ -1,46 +1,138 @@
+import json
 import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 import candy_tools as ct
 from chunk_backup.types.point import Point3D
 from chunk_backup.config.config import Config
+from chunk_backup.utils import misc_utils
 
 
 class ServerDataGetter:
+    """
+    服务端数据查询层，所有实例共享一个小线程池：
+    - 相同的进行中查询合并为一次，调用方共享同一个 Future
+    - 成功的结果按查询键（如玩家 + 实体路径）缓存 ttl 秒，短时间内的重复查询不再向服务端发送指令
+    - 坐标与维度两个实体路径一起提交，共用同一个超时
+    """
+    POOL_SIZE = 4
+    QUERY_TIMEOUT = 5.0
+    ENTITY_DATA_TTL = 2.0
+    PLAYERS_DATA_TTL = 2.0
+    ONLINE_PLAYERS_TTL = 2.0
+    CARPET_TTL = 30.0
+
+    __lock = threading.Lock()
+    __executor: Optional[ThreadPoolExecutor] = None
+    __inflight: Dict[Hashable, Future] = {}
+    __cache: Dict[Hashable, Tuple[float, Any]] = {}  # 键 → (过期时间, 结果)
+
     def __init__(self):
         self.config = Config.get()
 
-    def get_position_data(self, name: str):
-        if cmd := self.config.server.commands.get_entity_data:
-            results = {
-                'position': None,
-                'dimension': None
-            }
+    @classmethod
+    def shutdown(cls):
+        """插件卸载时关闭线程池并清空缓存"""
+        with cls.__lock:
+            executor, cls.__executor = cls.__executor, None
+            cls.__inflight.clear()
+            cls.__cache.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def __submit(cls, key: Hashable, ttl: float, func: Callable[[], Any]) -> Future:
+        """
+        提交一个查询：命中未过期的缓存时直接返回已完成的 Future，已有相同查询在进行时返回其 Future。
+        结果为 None（查询失败）时不缓存。
+        """
+        now = time.monotonic()
+        with cls.__lock:
+            cached = cls.__cache.get(key)
+            if cached is not None and cached[0] > now:
+                future = Future()
+                future.set_result(cached[1])
+                return future
+            if (future := cls.__inflight.get(key)) is not None:
+                return future
+            if cls.__executor is None:
+                cls.__executor = ThreadPoolExecutor(max_workers=cls.POOL_SIZE, thread_name_prefix=misc_utils.make_thread_name('data-getter'))
+            for k in [k for k, (expire, _) in cls.__cache.items() if expire <= now]:
+                del cls.__cache[k]
+            future = cls.__executor.submit(func)
+            cls.__inflight[key] = future
 
-            def match_position():
-                match = ct.execute_and_wait_match(
-                    command=cmd.format(name=name, path="Pos"),
-                    pattern=self.config.server.data_getter_regex.get("crood_getter").pattern.format(name=name)
-                )
-                results["position"] = match if match is not None else None
+        def on_done(f: Future):
+            with cls.__lock:
+                if cls.__inflight.get(key) is f:
+                    del cls.__inflight[key]
+                    if not f.cancelled() and f.exception() is None and f.result() is not None:
+                        cls.__cache[key] = (time.monotonic() + ttl, f.result())
 
-            def match_dimension():
-                match = ct.execute_and_wait_match(
-                    command=cmd.format(name=name, path="Dimension"),
-                    pattern=self.config.server.data_getter_regex.get("dimension_getter").pattern.format(name=name)
-                )
-                results["dimension"] = match if match is not None else None
+        future.add_done_callback(on_done)
+        return future
 
-            thread_1 = threading.Thread(target=match_position, daemon=True)
-            thread_2 = threading.Thread(target=match_dimension, daemon=True)
+    @staticmethod
+    def __wait(future: Future, timeout: Optional[float] = None) -> Any:
+        """等待查询结果，超时、查询出错或线程池已关闭（Future 被取消）时返回 None"""
+        try:
+            return future.result(timeout=timeout)
+        except Exception:  # 包括 FutureTimeoutError 与 CancelledError
+            return None
 
-            thread_1.start()
-            thread_2.start()
+    # ================================== 实体数据 ==================================
 
-            thread_1.join(timeout=5)
-            thread_2.join(timeout=5)
+    def __query_entity(self, cmd: str, name: str, path: str, regex_key: str) -> Future:
+        pattern = self.config.server.data_getter_regex.get(regex_key).pattern.format(name=name)
+        command = cmd.format(name=name, path=path)
+        return self.__submit(
+            ("entity", name, path), self.ENTITY_DATA_TTL,
+            lambda: ct.execute_and_wait_match(command=command, pattern=pattern)
+        )
 
-            if None in results.values():
-                return
+    def get_position_data(self, name: str):
+        if cmd := self.config.server.commands.get_entity_data:
+            futures = {
+                'position': self.__query_entity(cmd, name, "Pos", "crood_getter"),
+                'dimension': self.__query_entity(cmd, name, "Dimension", "dimension_getter")
+            }
+            deadline = time.monotonic() + self.QUERY_TIMEOUT
+            results = {}
+            for key, future in futures.items():
+                results[key] = self.__wait(future, timeout=max(0.0, deadline - time.monotonic()))
+                if results[key] is None:
+                    return
             # noinspection PyUnresolvedReferences
             return \
                 {"position": Point3D(results["position"].group("x"), results["position"].group("y"), results["position"].group("z")),
                  "dimension": results["dimension"].group("dimension")}
+
+    # ================================== candy_tools ==================================
+
+    def query_carpet(self) -> bool:
+        return bool(self.__wait(self.__submit(("carpet",), self.CARPET_TTL, ct.query_carpet)))
+
+    def get_online_player_count(self) -> Optional[int]:
+        """服务端 list 指令报告的在线玩家数，未配置指令/正则或查询失败时返回 None"""
+        cmd = self.config.server.commands.list_players
+        regex = self.config.server.data_getter_regex.get("online_players_getter")
+        if not cmd or regex is None:
+            return None
+        future = self.__submit(
+            ("online",), self.ONLINE_PLAYERS_TTL,
+            lambda: ct.execute_and_wait_match(command=cmd, pattern=regex.pattern)
+        )
+        match = self.__wait(future, timeout=self.QUERY_TIMEOUT)
+        return int(match.group("count")) if match is not None else None
+
+    def get_players_data_in_regions(self, region_dict: dict, dimensions: List[str]) -> Optional[dict]:
+        """
+        同 ct.get_players_data_in_regions，相同选区的并发或短时间内重复查询只执行一次。
+        服务端没有在线玩家时选区内必然没有玩家，直接返回空字典而不发起查询；
+        原版指令无法在不逐个查询玩家的情况下得知各维度的在线人数，因此只按总人数判断。
+        """
+        if self.get_online_player_count() == 0:
+            return {}
+        key = ("players", json.dumps(region_dict, sort_keys=True, default=str), tuple(dimensions))
+        return self.__wait(self.__submit(key, self.PLAYERS_DATA_TTL, lambda: ct.get_players_data_in_regions(region_dict, dimensions)))
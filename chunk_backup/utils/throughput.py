@@ -0,0 +1,53 @@
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+from chunk_backup.config.config import Config
+
+
+class ThroughputHistory:
+    """
+    记录历史备份/回档速度（字节/秒），用于预估耗时。
+    速度使用指数加权移动平均，越新的记录权重越大。
+    """
+    FILE_NAME = "throughput.json"
+    ALPHA = 0.3
+    MIN_BYTES = 1024 * 1024  # 数据量过小时耗时主要是固定开销，不计入统计
+
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.path = Path(Config.get().storage_root) / self.FILE_NAME
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get_speed(self, kind: str) -> Optional[float]:
+        with self._lock:
+            speed = self._load().get(kind)
+        return speed if isinstance(speed, (int, float)) and speed > 0 else None
+
+    def estimate_duration(self, kind: str, total_bytes: int) -> Optional[float]:
+        speed = self.get_speed(kind)
+        if speed is None:
+            return None
+        return total_bytes / speed
+
+    def record(self, kind: str, total_bytes: int, seconds: float):
+        if total_bytes < self.MIN_BYTES or seconds <= 0:
+            return
+        speed = total_bytes / seconds
+        with self._lock:
+            data = self._load()
+            old = data.get(kind)
+            if isinstance(old, (int, float)) and old > 0:
+                speed = self.ALPHA * speed + (1 - self.ALPHA) * old
+            data[kind] = speed
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
@@ -0,0 +1,56 @@
+import logging
+from unittest import mock
+
+import pytest
+
+try:
+    from mcdreforged.api.types import PluginServerInterface, ServerInterface
+except ImportError:  # 未安装 MCDR 时依赖它的测试模块各自跳过
+    PluginServerInterface = ServerInterface = None
+
+_patches = []
+
+
+def make_server() -> mock.MagicMock:
+    """测试用的 PluginServerInterface 替身：服务端未运行，翻译返回键名"""
+    server = mock.MagicMock()
+    server.logger = logging.getLogger('chunk_backup.test')
+    server.get_self_metadata.return_value.name = 'Chunk Backup'
+    server.get_self_metadata.return_value.version = '0.0.0'
+    server.get_server_information.return_value.version = None
+    server.is_server_running.return_value = False
+    server.rtr.side_effect = lambda key, *args, **kwargs: key
+    return server
+
+
+def pytest_configure(config):
+    # mcdr_globals 在导入时获取 PluginServerInterface 实例，需在测试模块导入插件代码之前替换
+    if PluginServerInterface is None:
+        return
+    server = make_server()
+    _patches.extend([
+        mock.patch.object(PluginServerInterface, 'si_opt', classmethod(lambda cls: server), create=True),
+        mock.patch.object(PluginServerInterface, 'psi', classmethod(lambda cls: server), create=True),
+        mock.patch.object(ServerInterface, 'si', classmethod(lambda cls: server), create=True),
+    ])
+    for patch in _patches:
+        patch.start()
+
+
+def pytest_unconfigure(config):
+    while _patches:
+        _patches.pop().stop()
+
+
+@pytest.fixture
+def plugin_config():
+    """以默认配置作为当前配置，关闭读取限速与后台优先级（两者需要查询服务端状态）"""
+    from chunk_backup.config import config as config_module
+    from chunk_backup.config.config import Config
+    cfg = Config.get_default()
+    cfg.io_limit.mode = 'off'
+    cfg.io_limit.background = False
+    previous = config_module._config
+    config_module.set_config_instance(cfg)
+    yield cfg
+    config_module.set_config_instance(previous)
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+pytest.importorskip('mcdreforged')
+
+from chunk_backup.utils.region.chunk_selector import ChunkSelector
+
+
+def _select(chunk1, chunk2):
+    return ChunkSelector.from_chunk_coords(chunk1, chunk2, ignore_size_limit=True)
+
+
+def test_combine_and_group_whole_region_from_sub_backups():
+    # custom 备份的两个子备份各覆盖区域的一半，合并后整个区域被选中
+    left, right = _select((0, 0), (15, 31)), _select((16, 0), (40, 31))
+    grouped = ChunkSelector.combine_and_group([left, right])
+    assert grouped['r.0.0.mca'] == 'r.0.0.mca'
+    assert grouped['r.1.0.mca'] == [(32, 0, 40, 31)]
+
+
+def test_count_chunks_counts_overlap_once():
+    a, b = _select((0, 0), (9, 9)), _select((5, 5), (14, 14))
+    assert ChunkSelector.count_chunks([a, b, 'all']) == 100 + 100 - 25
+
+
+def _chunks(rectangles) -> set:
+    return {(x, z) for min_x, min_z, max_x, max_z in rectangles for x in range(min_x, max_x + 1) for z in range(min_z, max_z + 1)}
+
+
+def _overlaps(a, b) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_normalize_rectangles_random(seed):
+    rnd = random.Random(seed)
+    rectangles = []
+    for _ in range(rnd.randint(1, 12)):
+        x, z = rnd.randint(-40, 40), rnd.randint(-40, 40)
+        rectangles.append((x, z, x + rnd.randint(0, 20), z + rnd.randint(0, 20)))
+
+    result = ChunkSelector.normalize_rectangles(rectangles)
+    for i, a in enumerate(result):
+        assert a[0] <= a[2] and a[1] <= a[3]
+        for b in result[i + 1:]:
+            assert not _overlaps(a, b), (a, b)
+    assert _chunks(result) == _chunks(rectangles)
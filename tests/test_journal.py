@@ -0,0 +1,78 @@
+import json
+
+from chunk_backup.log.journal import LogJournal
+
+DATE = "2026-01-01 00:00:00"
+
+
+def _begin(journal: LogJournal, name: str, **data):
+    return journal.begin(name, {"task": "backup_create", "date": DATE, "operator": "console", **data})
+
+
+def _segments(path) -> list:
+    return sorted(p.name for p in path.glob("journal.*.jsonl"))
+
+
+def test_append_after_torn_line(tmp_path):
+    journal = LogJournal(tmp_path, 0, 0)
+    _begin(journal, "a_1")
+    journal.end("a_1", {"task_done": True})
+    # 写入中途崩溃留下的不完整行
+    with open(tmp_path / "journal.1.jsonl", "ab") as f:
+        f.write(b'{"op": "begin", "name": "b_1", "ta')
+
+    journal = LogJournal(tmp_path, 0, 0)
+    _begin(journal, "c_1")
+    journal.end("c_1", {"task_done": True})
+
+    journal = LogJournal(tmp_path, 0, 0)
+    assert journal.get_entry("a_1").success
+    assert journal.get_entry("b_1") is None
+    assert journal.get_entry("c_1").success
+    assert journal.read("c_1")["task"] == "backup_create"
+
+
+def test_rotation_keeps_old_entries_readable(tmp_path, monkeypatch):
+    monkeypatch.setattr(LogJournal, "MAX_SEGMENT_SIZE", 512)
+    journal = LogJournal(tmp_path, 0, 0)
+    for i in range(20):
+        _begin(journal, f"t_{i}", comment="x" * 50)
+        journal.end(f"t_{i}", {"task_done": i % 2 == 0})
+    assert len(_segments(tmp_path)) > 1
+    assert all((tmp_path / name).stat().st_size <= 512 for name in _segments(tmp_path))
+
+    journal = LogJournal(tmp_path, 0, 0)
+    assert journal.count() == 20
+    first = journal.read("t_0")
+    assert first["comment"] == "x" * 50 and first["task_done"] is True
+    assert journal.read("t_1")["task_done"] is False
+    assert [e.name for e in journal.page(1, 2)] == ["t_19", "t_18"]
+
+
+def test_max_count_deletes_old_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(LogJournal, "MAX_SEGMENT_SIZE", 512)
+    journal = LogJournal(tmp_path, 0, 0)
+    for i in range(20):
+        _begin(journal, f"t_{i}", comment="x" * 50)
+    segments = _segments(tmp_path)
+
+    journal = LogJournal(tmp_path, 3, 0)
+    assert [e.name for e in journal.entries()] == ["t_17", "t_18", "t_19"]
+    assert journal.get_entry("t_0") is None
+    remaining = _segments(tmp_path)
+    assert segments[0] not in remaining and remaining[-1] == segments[-1]
+    assert journal.read("t_17")["comment"] == "x" * 50
+
+
+def test_migrate_legacy_files(tmp_path):
+    for name, date in (("backup_create_20260101_000000_000001", "2026-01-01 00:00:00"),
+                       ("restore_backup_20260102_000000_000001", "2026-01-02 00:00:00")):
+        with open(tmp_path / f"{name}.json", "w", encoding="utf-8") as f:
+            json.dump({"task": name.rsplit("_", 3)[0], "date": date, "task_done": True}, f)
+
+    journal = LogJournal(tmp_path, 0, 0)
+    assert [e.name for e in journal.entries()] == [
+        "backup_create_20260101_000000_000001", "restore_backup_20260102_000000_000001"
+    ]
+    assert journal.get_entry("restore_backup_20260102_000000_000001.json").success
+    assert not list(tmp_path.glob("*.json"))
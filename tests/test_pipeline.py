@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('mcdreforged')
+
+from chunk_backup.exceptions import BackupInterrupted
+from chunk_backup.utils.pipeline import Pipeline
+
+
+def _pipeline_threads():
+    return [t for t in threading.enumerate() if '-test-' in t.name]
+
+
+def _run_in_thread(func, timeout=10):
+    """在另一线程中执行 func，超时未结束视为流水线卡死"""
+    result = {}
+
+    def target():
+        try:
+            result['value'] = func()
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'pipeline hung'
+    return result
+
+
+def test_single_worker_stages_keep_order():
+    pipeline = Pipeline('test') \
+        .add_stage('double', lambda x: x * 2) \
+        .add_stage('inc', lambda x: x + 1)
+    assert list(pipeline.run(range(50))) == [x * 2 + 1 for x in range(50)]
+    assert _pipeline_threads() == []
+
+
+def test_multi_worker_stages_process_every_item():
+    pipeline = Pipeline('test', queue_size=1) \
+        .add_stage('a', lambda x: x * 2, workers=4) \
+        .add_stage('b', lambda x: x + 1, workers=3)
+    assert sorted(pipeline.run(range(100))) == [x * 2 + 1 for x in range(100)]
+
+
+def test_failing_stage_raises_to_caller():
+    def fail_on_seven(x):
+        if x == 7:
+            raise ValueError('bad item')
+        return x
+
+    pipeline = Pipeline('test').add_stage('check', fail_on_seven, workers=2).add_stage('pass', lambda x: x)
+    result = _run_in_thread(lambda: list(pipeline.run(range(100))))
+    assert isinstance(result.get('error'), ValueError)
+    assert pipeline.failed_item == 7
+    assert _pipeline_threads() == []
+
+
+def test_interrupt_stops_all_stages():
+    interrupt = threading.Event()
+    started = []
+
+    def read(x):
+        if interrupt.is_set():
+            raise BackupInterrupted()
+        started.append(x)
+        return x
+
+    def write(x):
+        # 下游较慢，上游因队列已满而阻塞
+        time.sleep(0.05)
+        return x
+
+    pipeline = Pipeline('test', queue_size=1).add_stage('read', read, workers=2).add_stage('write', write)
+
+    def consume():
+        done = []
+        for item in pipeline.run(range(1000)):
+            done.append(item)
+            if len(done) == 3:
+                interrupt.set()
+        return done
+
+    result = _run_in_thread(consume)
+    assert isinstance(result.get('error'), BackupInterrupted)
+    assert len(started) < 1000
+    assert _pipeline_threads() == []
+
+
+def test_caller_stopping_early_joins_threads():
+    pipeline = Pipeline('test', queue_size=1).add_stage('a', lambda x: x, workers=3).add_stage('b', lambda x: x)
+
+    def consume():
+        results = pipeline.run(range(1000))
+        first = next(results)
+        results.close()
+        return first
+
+    result = _run_in_thread(consume)
+    assert 'error' not in result
+    assert _pipeline_threads() == []
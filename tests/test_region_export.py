@@ -0,0 +1,72 @@
+import os
+import random
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('mcdreforged')
+
+from chunk_backup.utils.integrity import Checksum
+from chunk_backup.utils.region.chunk import Chunk
+from chunk_backup.utils.region.chunk_selector import ChunkSelector
+
+
+def _write_region(path, seed):
+    """写入每个区块都有数据的区域文件，并在末尾追加服务器重新分配区块后留下的空闲扇区"""
+    rnd = random.Random(seed)
+    chunks_data = {}
+    for local_x in range(32):
+        for local_z in range(32):
+            data = rnd.randbytes(rnd.randint(100, 3000))
+            chunks_data[(local_x, local_z)] = {'compression_type': 2, 'data': data, 'timestamp': 7, 'length': len(data) + 1}
+    Chunk._write_region_file(str(path), Chunk._build_region_file(str(path), chunks_data))
+    with open(path, 'ab') as f:
+        f.write(bytes(16 * Chunk.SECTOR_SIZE))
+
+
+def test_is_whole_region():
+    # 两个矩形拼成整个区域也算整区域
+    halves = {"rectangles": [(32, 0, 47, 31), (48, 0, 63, 31)]}
+    assert Chunk._is_whole_region(halves)
+    assert Chunk._is_whole_region({"rectangles": "r.1.0.mca"})
+    assert not Chunk._is_whole_region({"rectangles": [(32, 0, 63, 30)]})
+
+
+def test_trim_only_whole_regions(tmp_path, plugin_config):
+    plugin_config.backup.trim_regions = True
+    world, out = tmp_path / 'world', tmp_path / 'out'
+    world.mkdir()
+    out.mkdir()
+    _write_region(world / 'r.0.0.mca', 1)
+    _write_region(world / 'r.1.0.mca', 2)
+
+    whole = ChunkSelector.from_chunk_coords((0, 0), (31, 31), ignore_size_limit=True)
+    partial = ChunkSelector.from_chunk_coords((32, 0), (40, 5), ignore_size_limit=True)
+    with mock.patch.object(Chunk, 'trim_region_file', wraps=Chunk.trim_region_file) as trim:
+        Chunk.export_grouped_regions(str(world), str(out), [whole, partial])
+
+    trimmed = [os.path.basename(call.args[0]) for call in trim.call_args_list]
+    assert trimmed == ['r.0.0.mca']
+
+    # 整区域：去掉了末尾的空闲扇区，区块数据不变
+    assert os.path.getsize(out / 'r.0.0.mca') == os.path.getsize(world / 'r.0.0.mca') - 16 * Chunk.SECTOR_SIZE
+    for x in range(32):
+        for z in range(32):
+            assert Chunk._read_chunk_data(str(out / 'r.0.0.mca'), x, z) == Chunk._read_chunk_data(str(world / 'r.0.0.mca'), x, z)
+
+    # 部分区域：按区块导出，只包含选中的区块
+    assert Chunk._read_chunk_data(str(out / 'r.1.0.mca'), 40, 5) == Chunk._read_chunk_data(str(world / 'r.1.0.mca'), 40, 5)
+    assert Chunk._read_chunk_data(str(out / 'r.1.0.mca'), 41, 5) != Chunk._read_chunk_data(str(world / 'r.1.0.mca'), 41, 5)
+
+
+def test_sync_changed_files_keeps_trimmed_layout(tmp_path, plugin_config):
+    from chunk_backup.utils.region.region import Region
+    world, out = tmp_path / 'world', tmp_path / 'out'
+    world.mkdir()
+    _write_region(world / 'r.0.0.mca', 3)
+
+    # 没有记录任何文件状态，所有文件都按有变化重新复制
+    changes = {}
+    assert Region.sync_changed_files(world, out, {}, checksums=changes, trim=True) == 1
+    assert os.path.getsize(out / 'r.0.0.mca') == os.path.getsize(world / 'r.0.0.mca') - 16 * Chunk.SECTOR_SIZE
+    assert changes == {os.path.normpath(out / 'r.0.0.mca'): Checksum.file_digest(out / 'r.0.0.mca')}
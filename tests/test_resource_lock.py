@@ -0,0 +1,62 @@
+from chunk_backup.resource_lock import ResourceLockManager, ResourceRequest
+
+REGION = ResourceLockManager.region_key('world', 'region')
+NETHER = ResourceLockManager.region_key('world', 'DIM-1/region')
+DYNAMIC = ResourceLockManager.storage_key('dynamic_storage')
+STATIC = ResourceLockManager.storage_key('static_storage')
+
+
+def _backup(storage=DYNAMIC, region=REGION) -> ResourceRequest:
+    return ResourceRequest.of(shared=[region], exclusive=[storage])
+
+
+def test_shared_requests_run_together():
+    manager = ResourceLockManager()
+    assert manager.try_acquire(_backup(DYNAMIC))
+    assert manager.try_acquire(_backup(STATIC))
+
+
+def test_shared_exclusive_conflict():
+    manager = ResourceLockManager()
+    assert manager.try_acquire(_backup(DYNAMIC))
+    # 同一槽位存储只能由一个任务写入
+    assert not manager.try_acquire(_backup(DYNAMIC, NETHER))
+    # 独占正被共享的区域文件夹
+    assert not manager.try_acquire(ResourceRequest.of(exclusive=[REGION]))
+    assert not manager.try_acquire(ResourceRequest.world())
+    manager.release(_backup(DYNAMIC))
+    assert manager.try_acquire(ResourceRequest.world())
+    assert not manager.try_acquire(_backup(STATIC))
+
+
+def test_pick_returns_first_available():
+    manager = ResourceLockManager()
+    assert manager.try_acquire(_backup(DYNAMIC))
+    assert manager.pick([_backup(DYNAMIC, NETHER), _backup(STATIC)]) == 1
+    assert manager.pick([_backup(DYNAMIC, NETHER)]) == -1
+
+
+def test_world_request_not_starved_by_shared_stream():
+    manager = ResourceLockManager()
+    running = [_backup(DYNAMIC)]
+    assert manager.try_acquire(running[0])
+    world = ResourceRequest.world()
+    queue = [world]
+
+    # 不断有新的共享请求排在独占请求之后，前面的任务完成后独占请求必须先被选出
+    for i in range(10):
+        queue.append(_backup(STATIC if i % 2 else ResourceLockManager.storage_key(f'storage-{i}')))
+        assert manager.pick(queue) == -1
+    manager.release(running.pop())
+    assert manager.pick(queue) == 0
+    queue.pop(0)
+    assert manager.pick(queue) == -1
+    manager.release(world)
+    assert manager.pick(queue) == 0
+
+
+def test_pick_respects_requests_waiting_to_reacquire():
+    manager = ResourceLockManager()
+    # 暂时释放了世界锁、等待重新获取的回档任务排在所有请求之前
+    assert manager.pick([_backup(DYNAMIC)], waiting=[ResourceRequest.world()]) == -1
+    assert manager.pick([_backup(DYNAMIC)], waiting=[_backup(STATIC)]) == 0
@@ -0,0 +1,59 @@
+import logging
+import sys
+import time
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('mcdreforged')
+
+from mcdreforged.api.types import PluginServerInterface
+
+# 插件加载时不应导入的重量级模块，只在第一次用到时导入
+DEFERRED_MODULES = (
+    'chunk_backup.utils.region.chunk',
+    'chunk_backup.log.log_manager',
+    'chunk_backup.utils.json_parser',
+)
+
+
+def _make_server():
+    """只实现 on_load 用到的接口的 PluginServerInterface 替身"""
+    server = mock.MagicMock(spec=PluginServerInterface)
+    server.logger = logging.getLogger('chunk_backup.test')
+    server.load_config_simple.side_effect = lambda target_class, **kwargs: target_class.get_default()
+    server.get_self_metadata.return_value.name = 'Chunk Backup'
+    server.get_self_metadata.return_value.version = '0.0.0'
+    server.get_server_information.return_value.version = None
+    server.is_server_running.return_value = False
+    return server
+
+
+@pytest.fixture
+def entry(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    for name in [name for name in sys.modules if name == 'chunk_backup' or name.startswith('chunk_backup.')]:
+        monkeypatch.delitem(sys.modules, name)
+
+    server = _make_server()
+    # mcdr_globals 在导入时获取 PluginServerInterface 实例
+    monkeypatch.setattr(PluginServerInterface, 'si_opt', classmethod(lambda cls: server), raising=False)
+    monkeypatch.setattr(PluginServerInterface, 'psi', classmethod(lambda cls: server), raising=False)
+
+    import chunk_backup.entry as entry
+    yield entry, server
+    entry.on_unload(server)
+
+
+def test_on_load_within_budget(entry):
+    entry, server = entry
+    from chunk_backup import constants
+
+    start = time.perf_counter()
+    entry.on_load(server, None)
+    elapsed = time.perf_counter() - start
+    assert elapsed < constants.STARTUP_BUDGET_SEC
+
+    entry.init_thread.join()
+    for name in DEFERRED_MODULES:
+        assert name not in sys.modules, f'{name} imported during plugin load'
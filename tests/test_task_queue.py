@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+pytest.importorskip('mcdreforged')
+
+from chunk_backup.task_queue import TaskQueue
+
+
+def _drain(queue: TaskQueue) -> list:
+    items = []
+    while queue.qsize() > 0:
+        item = queue.get()
+        queue.task_done(item)
+        items.append(item)
+    return items
+
+
+def test_priority_then_fifo():
+    queue = TaskQueue(10)
+    queue.put('low-1', priority=0)
+    queue.put('high-1', priority=5)
+    queue.put('low-2', priority=0)
+    queue.put('high-2', priority=5)
+    queue.put('mid', priority=2)
+    assert _drain(queue) == ['high-1', 'high-2', 'mid', 'low-1', 'low-2']
+
+
+def test_coalesce_by_key():
+    queue = TaskQueue(10)
+    first = queue.put('first', key='scheduled')
+    second = queue.put('second', key='scheduled')
+    other = queue.put('other', key='manual')
+    assert not first.coalesced and other.item == 'other'
+    assert second.coalesced and second.item == 'first'
+    assert queue.unfinished_size() == 2
+    assert _drain(queue) == ['first', 'other']
+
+
+def test_evict_lowest_priority_when_full():
+    queue = TaskQueue(2)
+    queue.put('low-1', priority=0)
+    queue.put('low-2', priority=0)
+    result = queue.put('high', priority=5)
+    assert result.evicted == 'low-2'
+    with pytest.raises(TaskQueue.TooManyOngoingTask):
+        queue.put('low-3', priority=0)
+    assert _drain(queue) == ['high', 'low-1']
+
+
+def test_expired_items_are_skipped():
+    expired = []
+    queue = TaskQueue(10, on_expired=expired.append)
+    queue.put('late', priority=5, deadline=time.time() - 1)
+    queue.put('on-time', deadline=time.time() + 60)
+    assert queue.get() == 'on-time'
+    assert expired == ['late']
+    assert queue.unfinished_size() == 1
+
+
+def test_pick_skips_unavailable_items():
+    queue = TaskQueue(10)
+    for item in ('a', 'b', 'c'):
+        queue.put(item)
+    assert queue.get(lambda items: items.index('b')) == 'b'
+    assert queue.current_items() == ['b']
+    queue.task_done('b')
+    assert _drain(queue) == ['a', 'c']